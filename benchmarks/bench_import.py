@@ -0,0 +1,83 @@
+"""
+Cold-start cost of a short-lived worker that imports msgraph, gets a token and uploads one file, against the local stub server.
+
+Run it from the repository root, after compiling the package so the runs don't also pay for that:
+
+python -m compileall -q msgraph
+python -m benchmarks.bench_import --runs 10
+
+Every run is a fresh interpreter, so the import is really cold (apart from the OS file cache). For each transport it
+reports the median import time, the time the token + upload took after that, how many modules were loaded and the
+peak resident memory of the worker process (from getrusage, where there is one).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from msgraph.msgraph import TRANSPORTS
+from msgraph.testing import StubGraphServer
+
+WORKER = """
+import sys, time
+started = time.perf_counter()
+from msgraph.msgraph import Msgraph
+imported = time.perf_counter()
+import json
+settings = json.loads(sys.argv[1])
+with Msgraph(settings["credentials"], graph_url=settings["graph_url"], login_url=settings["login_url"], transport=settings["transport"]) as graph:
+    token = graph.get_access_token("graph").unwrap()
+    assert graph.upload_to_drive(token, "drive", settings["file"], "Bench/").is_ok
+finished = time.perf_counter()
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss = rss // 1024 if sys.platform == "darwin" else rss
+except ImportError:
+    rss = None
+print(json.dumps({"import_ms": (imported - started) * 1000, "call_ms": (finished - imported) * 1000, "modules": len(sys.modules), "peak_rss_kib": rss}))
+"""
+
+
+def run(stub: StubGraphServer, transport: str, path: str, runs: int) -> dict:
+    settings = json.dumps({"credentials": stub.credentials(), "graph_url": stub.graph_url, "login_url": stub.login_url, "transport": transport, "file": path})
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", WORKER, settings], capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output))
+    row: dict = {"transport": transport, "runs": runs}
+    for figure in ("import_ms", "call_ms", "modules", "peak_rss_kib"):
+        values = [sample[figure] for sample in samples if sample[figure] is not None]
+        row[figure] = statistics.median(values) if values else None
+    return row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir, StubGraphServer() as stub:
+        path = os.path.join(workdir, "report.csv")
+        with open(path, "wb") as file:
+            file.write(os.urandom(64 * 1024))
+        rows = [run(stub, transport, path, args.runs) for transport in args.transports]
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    for row in rows:
+        rss = f"{row['peak_rss_kib'] / 1024:.1f} MiB" if row["peak_rss_kib"] is not None else "n/a"
+        print(
+            f"{row['transport']:>11}: import {row['import_ms']:.1f} ms, token + upload {row['call_ms']:.1f} ms, "
+            f"{row['modules']:.0f} modules, peak RSS {rss} (median of {row['runs']})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Per-call latency of Msgraph with and without connection pooling, against the local stub server.
+
+Run it from the repository root:
+
+python -m benchmarks.bench_pooling --calls 200 --connect-latency 0.02
+
+"connect_latency" simulates the TCP + TLS handshake a real call to graph.microsoft.com pays on every new connection.
+"""
+import argparse
+import statistics
+import time
+
+from msgraph.id_cache import IdCache
+from msgraph.testing import StubGraphServer
+
+
+def run(stub: StubGraphServer, calls: int, keep_alive: bool) -> dict:
+    connections_before = stub.connections
+    samples = []
+    # No id cache, every call has to go over the wire.
+    with stub.client(keep_alive=keep_alive, id_cache=IdCache(ttl=0)) as graph:
+        for _ in range(calls):
+            start = time.perf_counter()
+            result = graph.get_siteid("token", "bench")
+            samples.append(time.perf_counter() - start)
+            assert result.is_ok, result
+    samples.sort()
+    return {
+        "mode": "pooled" if keep_alive else "unpooled",
+        "calls": calls,
+        "connections": stub.connections - connections_before,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "p95_ms": samples[int(len(samples) * 0.95) - 1] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request.")
+    parser.add_argument("--connect-latency", type=float, default=0.02, help="Seconds added to every new connection.")
+    args = parser.parse_args()
+
+    with StubGraphServer(latency=args.latency, connect_latency=args.connect_latency) as stub:
+        for keep_alive in (False, True):
+            row = run(stub, args.calls, keep_alive)
+            print(
+                f"{row['mode']:>9}: {row['calls']} calls, {row['connections']} connections, "
+                f"mean {row['mean_ms']:.2f} ms, p50 {row['p50_ms']:.2f} ms, p95 {row['p95_ms']:.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
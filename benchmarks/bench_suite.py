@@ -0,0 +1,278 @@
+"""
+Throughput, latency percentiles and peak memory of the main Msgraph operations, against the local stub server.
+
+Run it from the repository root:
+
+python -m benchmarks.bench_suite --iterations 50 --output results.json
+python -m benchmarks.bench_suite --iterations 50 --compare results.json --fail-on-regression
+
+Scenarios: token (forced refresh), list (every page of a folder), upload, download, email (with a small attachment).
+Each scenario is timed "--repeat" times and the median of every figure is kept, so one noisy run doesn't decide.
+Peak memory is measured in a separate, shorter pass with tracemalloc on, since tracing slows everything down.
+The stub runs in the same process, so its own allocations are included. Compare runs made with the same settings.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from msgraph.msgraph import Msgraph, MsgraphError, MsgraphResponse
+from msgraph.testing import StubGraphServer
+
+SCENARIOS = ("token", "list", "upload", "download", "email")
+# For each figure, whether bigger is better. Used by compare().
+FIGURES = {"throughput_ops": True, "mb_per_s": True, "p50_ms": False, "p90_ms": False, "p99_ms": False, "peak_memory_kib": False}
+
+
+class Context:
+    __slots__ = ("attachment", "file_size", "graph", "items", "local_file", "stub", "workdir")
+
+    def __init__(self, graph: Msgraph, stub: StubGraphServer, workdir: str, file_size: int, items: int):
+        self.graph = graph
+        self.stub = stub
+        self.workdir = workdir
+        self.file_size = file_size
+        self.items = items
+        self.local_file = os.path.join(workdir, "upload.bin")
+        self.attachment = os.path.join(workdir, "attachment.txt")
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def _checked(result: MsgraphResponse | MsgraphError) -> MsgraphResponse:
+    if isinstance(result, MsgraphError):
+        raise BenchmarkError(f"Benchmark operation failed: {result}")
+    return result
+
+
+# One operation per scenario. Each returns the payload bytes it moved, for MB/s.
+
+def _token(ctx: Context, index: int) -> int:
+    _checked(ctx.graph.get_access_token("graph", force_refresh=True))
+    return 0
+
+
+def _list(ctx: Context, index: int) -> int:
+    count = 0
+    for item in ctx.graph.iter_files_sharepoint("token", "site", "drive", "bench/list"):
+        if isinstance(item, MsgraphError):
+            _checked(item)
+        count += 1
+    if count != ctx.items:
+        raise BenchmarkError(f"Listed {count} items, expected {ctx.items}.")
+    return 0
+
+
+def _upload(ctx: Context, index: int) -> int:
+    _checked(ctx.graph.upload_to_drive("token", "drive", ctx.local_file, f"bench/upload/{index % 8}/"))
+    return ctx.file_size
+
+
+def _download(ctx: Context, index: int) -> int:
+    target = os.path.join(ctx.workdir, f"download-{index % 8}")
+    os.makedirs(target, exist_ok=True)
+    _checked(ctx.graph.download_file_sharepoint("token", "site", "drive", "bench/download/", "file.bin", target))
+    return ctx.file_size
+
+
+def _email(ctx: Context, index: int) -> int:
+    _checked(ctx.graph.send_email("token", f"Benchmark {index}", "Body", ["bench@example.com"], [ctx.attachment]))
+    ctx.stub.sent_mail.clear()  # Otherwise every message stays in memory and shows up in the peak.
+    return os.path.getsize(ctx.attachment)
+
+
+OPERATIONS: dict[str, Callable[[Context, int], int]] = {
+    "token": _token,
+    "list": _list,
+    "upload": _upload,
+    "download": _download,
+    "email": _email,
+}
+
+
+def _prepare(ctx: Context) -> None:
+    ctx.stub.files.update({f"bench/list/file{n:06}.txt": b"x" for n in range(ctx.items)})
+    ctx.stub.files["bench/download/file.bin"] = os.urandom(ctx.file_size)
+    with open(ctx.local_file, "wb") as file:
+        file.write(os.urandom(ctx.file_size))
+    with open(ctx.attachment, "wb") as file:
+        file.write(b"attachment\n" * 1000)
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    # Nearest rank, on sorted samples.
+    return samples[min(len(samples) - 1, max(0, round(q * len(samples)) - 1))]
+
+
+def _timed_pass(operation: Callable[[Context, int], int], ctx: Context, iterations: int, concurrency: int) -> dict:
+    def timed(index: int) -> tuple[float, int]:
+        started = time.perf_counter()
+        moved = operation(ctx, index)
+        return time.perf_counter() - started, moved
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(timed, range(iterations)))
+    else:
+        results = [timed(index) for index in range(iterations)]
+    wall = time.perf_counter() - started
+    samples = sorted(seconds for seconds, _ in results)
+    return {
+        "throughput_ops": iterations / wall,
+        "mb_per_s": sum(moved for _, moved in results) / wall / 1_000_000,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": _percentile(samples, 0.5) * 1000,
+        "p90_ms": _percentile(samples, 0.9) * 1000,
+        "p99_ms": _percentile(samples, 0.99) * 1000,
+    }
+
+
+def _peak_memory(operation: Callable[[Context, int], int], ctx: Context, iterations: int) -> float:
+    tracemalloc.start()
+    try:
+        for index in range(iterations):
+            operation(ctx, index)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run_suite(
+    scenarios: tuple[str, ...] | list[str] = SCENARIOS,
+    iterations: int = 50,
+    warmup: int = 3,
+    repeat: int = 3,
+    concurrency: int = 1,
+    memory_iterations: int = 5,
+    file_size: int = 1024 * 1024,
+    items: int = 1000,
+    stub_options: dict | None = None,
+) -> dict:
+    """
+    Runs the scenarios and returns {"meta": ..., "results": {scenario: figures}}, ready for json.dump and compare().
+    """
+    results = {}
+    with (
+        tempfile.TemporaryDirectory() as workdir,
+        StubGraphServer(**(stub_options or {})) as stub,
+        stub.client(pool_maxsize=max(10, concurrency)) as graph,
+    ):
+        ctx = Context(graph, stub, workdir, file_size, items)
+        _prepare(ctx)
+        for name in scenarios:
+            operation = OPERATIONS[name]
+            for index in range(warmup):
+                operation(ctx, index)
+            passes = [_timed_pass(operation, ctx, iterations, concurrency) for _ in range(repeat)]
+            figures = {key: statistics.median(run[key] for run in passes) for key in passes[0]}
+            figures["peak_memory_kib"] = _peak_memory(operation, ctx, memory_iterations)
+            figures["iterations"] = iterations
+            results[name] = figures
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {
+                "iterations": iterations, "warmup": warmup, "repeat": repeat, "concurrency": concurrency,
+                "file_size": file_size, "items": items, "stub": stub_options or {},
+            },
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = 10.0) -> list[dict]:
+    """
+    One row per scenario and figure found in both runs, with the change in percent. "regression" is set when a figure
+    got worse by more than "threshold" percent.
+    """
+    rows = []
+    for name, figures in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        for figure, higher_is_better in FIGURES.items():
+            if figure not in figures or not before.get(figure):
+                continue
+            change = (figures[figure] - before[figure]) / before[figure] * 100
+            worse = -change if higher_is_better else change
+            rows.append({
+                "scenario": name,
+                "figure": figure,
+                "before": before[figure],
+                "after": figures[figure],
+                "change_pct": change,
+                "regression": worse > threshold,
+            })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per scenario. The median is kept.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Threads sharing one client.")
+    parser.add_argument("--memory-iterations", type=int, default=5)
+    parser.add_argument("--file-size", type=int, default=1024 * 1024, help="Bytes per uploaded and downloaded file.")
+    parser.add_argument("--items", type=int, default=1000, help="Items in the listed folder.")
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--item-padding", type=int, default=0, help="Extra bytes of metadata per listed item.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request.")
+    parser.add_argument("--connect-latency", type=float, default=0.0, help="Seconds added to every new connection.")
+    parser.add_argument("--throttle-rate", type=float, default=None, help="Requests per second before the stub answers 429.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare against.")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent a figure may get worse before it counts as a regression.")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    stub_options = {
+        "latency": args.latency,
+        "connect_latency": args.connect_latency,
+        "page_size": args.page_size,
+        "item_padding": args.item_padding,
+        "throttle_rate": args.throttle_rate,
+        "throttle_retry_after": 0.1,
+    }
+    report = run_suite(
+        args.scenarios, args.iterations, args.warmup, args.repeat, args.concurrency,
+        args.memory_iterations, args.file_size, args.items, stub_options,
+    )
+    for name, figures in report["results"].items():
+        print(
+            f"{name:>9}: {figures['throughput_ops']:8.1f} ops/s {figures['mb_per_s']:8.2f} MB/s  "
+            f"p50 {figures['p50_ms']:7.2f} ms  p90 {figures['p90_ms']:7.2f} ms  p99 {figures['p99_ms']:7.2f} ms  "
+            f"peak {figures['peak_memory_kib']:9.1f} KiB"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        rows = compare(baseline, report, args.threshold)
+        print()
+        for row in rows:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['scenario']:>9} {row['figure']:>16}: {row['before']:10.2f} -> {row['after']:10.2f} ({row['change_pct']:+6.1f}%){flag}")
+        if args.fail_on_regression and any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
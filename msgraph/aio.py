@@ -0,0 +1,625 @@
+import asyncio
+import os
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+
+try:
+    import httpx
+except ImportError as e:  # pragma: no cover
+    raise ImportError("AsyncMsgraph needs httpx. Install it with: pip install msgraph-pywrap[async]") from e
+
+from msgraph.hash_index import HashIndex
+from msgraph.hashes import QuickXorHash
+from msgraph.id_cache import IdCache
+from msgraph.instrumentation import Instrumentation
+from msgraph.items import DriveListing
+from msgraph.msgraph import (
+    ATTACHMENT_CHUNK_SIZE,
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_RANGE_SIZE,
+    GRAPH_URL,
+    INLINE_ATTACHMENT_LIMIT,
+    LOGIN_URL,
+    SIMPLE_UPLOAD_LIMIT,
+    UPLOAD_CHUNK_MULTIPLE,
+    UPLOAD_CHUNK_SIZE,
+    GraphCall,
+    MsgraphError,
+    MsgraphResponse,
+    _finish_download,
+    _is_ok,
+    _MsgraphBase,
+    _preallocate,
+    _ranges,
+    _read_chunk,
+    _remove_quietly,
+    _write_upload_state,
+)
+from msgraph.retry import (
+    RateLimiter,
+    RetryPolicy,
+    current_operation,
+    record_retry,
+    reports_retries,
+)
+from msgraph.token_cache import TokenCache
+
+# asyncio flavour of the Msgraph class. Same methods, same arguments, same result objects, just awaited.
+# Requests are built and read by the same code the sync class uses; only the sending differs.
+# A few things are sync-only for now: batch(), sync(), delta(), bulk_mail() and upload_many(). They run their
+# own thread pools, which gather() over the async methods does the job of here.
+#
+# Everything goes through one httpx.AsyncClient with a shared connection pool, and "concurrency" caps how many
+# requests (streamed downloads included) are in flight at once, so you can gather() thousands of calls safely.
+# Install with the "async" extra: pip install msgraph-pywrap[async]
+
+
+def _httpx_timeout(timeout: float | tuple[float, float] | None) -> httpx.Timeout:
+    # Msgraph takes requests-style timeouts: one number, or (connect, read).
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+class AsyncMsgraph(_MsgraphBase):
+    def __init__(
+        self,
+        credentials: dict,
+        *,
+        client: httpx.AsyncClient | None = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        concurrency: int = 100,
+        timeout: float | tuple[float, float] | None = (10, 300),
+        graph_url: str = GRAPH_URL,
+        login_url: str = LOGIN_URL,
+        token_cache: TokenCache | None = None,
+        token_cache_path: str | None = None,
+        retry_policy: RetryPolicy | None = None,
+        retry_policies: dict[str, RetryPolicy] | None = None,
+        rate_limiter: RateLimiter | None = None,
+        id_cache: IdCache | None = None,
+        id_cache_path: str | None = None,
+        instrumentation: Instrumentation | None = None,
+        hash_index: HashIndex | None = None,
+        hash_index_path: str | None = None,
+    ):
+        super().__init__(
+            credentials, timeout, graph_url, login_url, token_cache, token_cache_path,
+            retry_policy, retry_policies, rate_limiter, id_cache, id_cache_path, instrumentation,
+            hash_index, hash_index_path,
+        )
+        # A client handed in from outside belongs to the caller, so we don't close it.
+        self._owns_client = client is None
+        self.client = client if client is not None else httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections),
+            timeout=_httpx_timeout(timeout),
+        )
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._token_locks: dict[str, asyncio.Lock] = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """
+        Closes the pooled connections. Clients passed in through the constructor are left open.
+        """
+        if self._owns_client:
+            await self.client.aclose()
+        if self._owns_id_cache:
+            self.id_cache.close()
+        if self._owns_hash_index:
+            self.hash_index.close()
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        send: Callable[[], Awaitable[httpx.Response]],
+        before_retry: Callable[[], None] | None = None,
+    ) -> httpx.Response | MsgraphError:
+        # Single exit point to the network, like Msgraph._request: "send" makes one attempt, this retries it per the retry policy.
+        # "before_retry" runs after a failed attempt is closed, before waiting to try again.
+        policy = self._retry_policy()
+        key = self._rate_limit_key(url)
+        instrumentation = self.instrumentation
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(key)
+            attempt_started = time.monotonic()
+            if instrumentation is not None:
+                event = instrumentation.start(method, url, current_operation(), attempt, (self.graph_url, self.login_url))
+            try:
+                response: httpx.Response | MsgraphError = await send()
+            except httpx.HTTPError as e:
+                response = MsgraphError(f"Request to {url} failed: {e}", None, None)
+
+            if isinstance(response, MsgraphError):
+                delay = policy.next_delay(attempt, method, None, None, time.monotonic() - started)
+            else:
+                delay = policy.next_delay(attempt, method, response.status_code, response.headers, time.monotonic() - started)
+            if instrumentation is not None:
+                if isinstance(response, MsgraphError):
+                    instrumentation.finish(event, None, response.message, delay is not None)
+                else:
+                    instrumentation.finish(event, response, None, delay is not None)
+            if delay is None:
+                return response
+
+            if not isinstance(response, MsgraphError):
+                await response.aclose()
+                if self.rate_limiter is not None and response.status_code in (429, 503):
+                    self.rate_limiter.penalize(key, delay)
+            if before_retry is not None:
+                before_retry()
+            await asyncio.sleep(delay)
+            record_retry(time.monotonic() - attempt_started)
+            attempt += 1
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response | MsgraphError:
+        # The concurrency slot is only held while a request is in flight, not while waiting to retry it.
+        async def send() -> httpx.Response:
+            async with self._semaphore:
+                return await self.client.request(method, url, **kwargs)
+
+        return await self._send(method, url, send)
+
+    @asynccontextmanager
+    async def _stream(self, method: str, url: str, follow_redirects: bool = False, **kwargs) -> AsyncIterator[httpx.Response | MsgraphError]:
+        # Holds a concurrency slot until the body has been read, not just until the headers arrive. Like _request, it
+        # gives the slot back while waiting to retry.
+        held = False
+
+        async def send() -> httpx.Response:
+            nonlocal held
+            await self._semaphore.acquire()
+            held = True
+            return await self.client.send(self.client.build_request(method, url, **kwargs), stream=True, follow_redirects=follow_redirects)
+
+        def release() -> None:
+            nonlocal held
+            if held:
+                held = False
+                self._semaphore.release()
+
+        try:
+            response = await self._send(method, url, send, release)
+            if isinstance(response, MsgraphError):
+                yield response
+                return
+            try:
+                yield response
+            finally:
+                await response.aclose()
+        finally:
+            release()
+
+    async def _execute(self, call: GraphCall) -> MsgraphResponse | MsgraphError:
+        response = await self._request(
+            call.method,
+            call.url,
+            headers=call.headers,
+            params=call.params,
+            json=call.json,
+            data=call.data,
+            content=call.content,
+        )
+        if isinstance(response, MsgraphError):
+            return response
+        return call.parse(response)
+
+    @reports_retries
+    async def get_access_token(self, mode: str, force_refresh: bool = False) -> MsgraphResponse | MsgraphError:
+        """
+        Gets the access token, see Msgraph.get_access_token.
+        Concurrent callers in one event loop share a single refresh. With a token_cache_path, other processes'
+        tokens are picked up from the file, but refreshes aren't locked across processes like the sync class does.
+        """
+        scope = self._token_scope(mode)
+        if isinstance(scope, MsgraphError):
+            return scope
+
+        key = self._token_cache_key(scope)
+        cached = self._cached_token(key, force_refresh)
+        if cached:
+            return cached
+
+        lock = self._token_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            cached = self._cached_token(key, force_refresh)
+            if cached:
+                return cached
+            return await self._execute(self._token_call(key, scope))
+
+    @reports_retries
+    async def get_siteid(self, token: str, site: str) -> MsgraphResponse | MsgraphError:
+        """
+        Gets the id of the target site within your audience, see Msgraph.get_siteid.
+        """
+        key = self._siteid_key(site)
+        cached = self._cached_id(key)
+        if cached:
+            return cached
+        result = await self._execute(self._siteid_call(token, site))
+        self._remember_id(key, result)
+        return result
+
+    @reports_retries
+    async def get_driveid(self, token: str, siteid: str) -> MsgraphResponse | MsgraphError:
+        """
+        Gets the id of the target site id's root drive, see Msgraph.get_driveid.
+        """
+        key = self._driveid_key(siteid)
+        cached = self._cached_id(key)
+        if cached:
+            return cached
+        result = await self._execute(self._driveid_call(token, siteid))
+        self._remember_id(key, result)
+        return result
+
+    @reports_retries
+    async def upload_to_drive(
+        self,
+        token: str,
+        driveid: str,
+        filepath: str,
+        destination: str = "",
+        mimetype: str = "",
+        large_file_threshold: int = SIMPLE_UPLOAD_LIMIT,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+        resume_path: str | None = None,
+        skip_unchanged: bool = False,
+        progress: Callable[[int], None] | None = None,
+    ) -> MsgraphResponse | MsgraphError:
+        """
+        Uploads a file to Sharepoint, see Msgraph.upload_to_drive. File reads and hashing happen off the event loop.
+        """
+        try:
+            size = os.path.getsize(filepath)
+        except OSError as e:
+            return MsgraphError(f"Failed to read file: {e}", None, None)
+
+        if skip_unchanged:
+            remote = await self._execute(self._remote_item_call(token, driveid, filepath, destination))
+            if isinstance(remote, MsgraphResponse) and await asyncio.to_thread(self._is_unchanged, remote, filepath, size):
+                if progress is not None:
+                    progress(size)
+                return self._unchanged_result(remote)
+
+        if size > large_file_threshold:
+            return await self.upload_large_file(token, driveid, filepath, destination, chunk_size, resume_path, progress=progress)
+
+        try:
+            content = await asyncio.to_thread(_read_chunk, filepath, 0, size)
+        except OSError as e:
+            return MsgraphError(f"Failed to read file: {e}", None, None)
+
+        result = await self._execute(self._upload_call(token, driveid, filepath, destination, mimetype, content))
+        if result.is_ok and progress is not None:
+            progress(size)
+        return result
+
+    @reports_retries
+    async def upload_large_file(
+        self,
+        token: str,
+        driveid: str,
+        filepath: str,
+        destination: str = "",
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+        resume_path: str | None = None,
+        max_chunk_retries: int = 3,
+        progress: Callable[[int], None] | None = None,
+    ) -> MsgraphResponse | MsgraphError:
+        """
+        Uploads a file of any size through a Graph upload session, see Msgraph.upload_large_file.
+        """
+        if chunk_size <= 0 or chunk_size % UPLOAD_CHUNK_MULTIPLE:
+            return MsgraphError(f"Chunk size must be a positive multiple of {UPLOAD_CHUNK_MULTIPLE} bytes.", None, None)
+        fingerprint = self._upload_fingerprint(driveid, filepath, destination)
+        if isinstance(fingerprint, MsgraphError):
+            return fingerprint
+
+        upload_url = self._recorded_upload_url(resume_path, fingerprint)
+        status = await self._execute(self._upload_status_call(upload_url)) if upload_url else None
+        if upload_url and isinstance(status, MsgraphResponse):
+            offset = status.data
+        else:
+            session = await self._execute(self._create_upload_session_call(token, driveid, filepath, destination))
+            if isinstance(session, MsgraphError):
+                return session
+            upload_url, offset = session.data, 0
+            if resume_path:
+                _write_upload_state(resume_path, {**fingerprint, "upload_url": upload_url})
+
+        result = await self._upload_session_chunks(upload_url, filepath, fingerprint["size"], offset, chunk_size, max_chunk_retries, progress)
+        if resume_path and (result.is_ok or result.status_code == 404):
+            _remove_quietly(resume_path)  # Done, or the session expired and there's nothing left to resume.
+        return result
+
+    async def _upload_session_chunks(
+        self,
+        upload_url: str,
+        filepath: str,
+        size: int,
+        offset: int,
+        chunk_size: int,
+        max_chunk_retries: int,
+        progress: Callable[[int], None] | None = None,
+    ) -> MsgraphResponse | MsgraphError:
+        failures = 0
+        while True:
+            try:
+                chunk = await asyncio.to_thread(_read_chunk, filepath, offset, chunk_size)
+            except OSError as e:
+                return MsgraphError(f"Failed to read file: {e}", None, None)
+            result = await self._execute(self._upload_chunk_call(upload_url, offset, chunk, size))
+            del chunk
+            if isinstance(result, MsgraphResponse) and result.status_code == 202:
+                failures = 0
+                offset = result.data
+                if progress is not None:
+                    progress(offset)
+                continue
+            if result.is_ok or result.status_code == 404:
+                if result.is_ok and progress is not None:
+                    progress(size)
+                return result
+
+            # Retried by _send already. Carry on from whatever the session has, like the sync version.
+            failures += 1
+            if failures > max_chunk_retries:
+                return result
+            status = await self._execute(self._upload_status_call(upload_url))
+            if isinstance(status, MsgraphError):
+                return result
+            offset = status.data
+
+    @reports_retries
+    async def send_email(
+        self,
+        token: str,
+        subject: str,
+        body: str,
+        target_emails: list[str],
+        attachments: list[str] | None = None,
+        inline_limit: int = INLINE_ATTACHMENT_LIMIT,
+    ) -> MsgraphResponse | MsgraphError:
+        """
+        Sends an email to the target user(s), with attachments if specified, see Msgraph.send_email.
+        """
+        if self._too_big_to_inline(attachments, inline_limit):
+            return await self.send_large_email(token, subject, body, target_emails, attachments or [], inline_limit=inline_limit)
+        call = self._send_email_call(token, subject, body, target_emails, attachments)
+        if isinstance(call, MsgraphError):
+            return call
+        return await self._execute(call)
+
+    @reports_retries
+    async def send_large_email(
+        self,
+        token: str,
+        subject: str,
+        body: str,
+        target_emails: list[str],
+        attachments: list[str],
+        inline_limit: int = INLINE_ATTACHMENT_LIMIT,
+        chunk_size: int = ATTACHMENT_CHUNK_SIZE,
+        max_chunk_retries: int = 3,
+    ) -> MsgraphResponse | MsgraphError:
+        """
+        Sends an email with attachments of any size through a draft and upload sessions, see Msgraph.send_large_email.
+        """
+        if chunk_size <= 0 or chunk_size % UPLOAD_CHUNK_MULTIPLE:
+            return MsgraphError(f"Chunk size must be a positive multiple of {UPLOAD_CHUNK_MULTIPLE} bytes.", None, None)
+        sizes = self._attachment_sizes(attachments)
+        if isinstance(sizes, MsgraphError):
+            return sizes
+
+        draft = await self._execute(self._create_draft_call(token, subject, body, target_emails))
+        if isinstance(draft, MsgraphError):
+            return draft
+        message_id = draft.data
+
+        for path, size in sizes:
+            result: MsgraphResponse | MsgraphError
+            if size <= inline_limit:
+                call = await asyncio.to_thread(self._add_attachment_call, token, message_id, path)
+                result = call if isinstance(call, MsgraphError) else await self._execute(call)
+            else:
+                session = await self._execute(self._create_attachment_session_call(token, message_id, path, size))
+                result = session if isinstance(session, MsgraphError) else await self._upload_session_chunks(session.data, path, size, 0, chunk_size, max_chunk_retries)
+            if isinstance(result, MsgraphError):
+                await self._execute(self._delete_draft_call(token, message_id))
+                return result
+
+        return await self._execute(self._send_draft_call(token, message_id))
+
+    @reports_retries
+    async def list_files_sharepoint(self, token: str, siteid: str, driveid: str, path: str = "") -> MsgraphResponse | MsgraphError:
+        """
+        Lists all files in a chosen Sharepoint folder, see Msgraph.list_files_sharepoint.
+        """
+        return await self._execute(self._list_files_call(token, siteid, driveid, path))
+
+    @reports_retries
+    async def list_items_sharepoint(
+        self,
+        token: str,
+        siteid: str,
+        driveid: str,
+        path: str = "",
+        select: list[str] | None = None,
+        top: int | None = None,
+        keep_raw: bool = False,
+    ) -> MsgraphResponse | MsgraphError:
+        """
+        Lists every item in a folder into a compact DriveListing, see Msgraph.list_items_sharepoint.
+        """
+        listing = DriveListing(keep_raw=keep_raw)
+        call = self._item_page_call(self._list_files_call(token, siteid, driveid, path, select, top), keep_raw)
+        while True:
+            page = await self._execute(call)
+            if isinstance(page, MsgraphError):
+                return page
+            items, next_link = page.data
+            listing.extend(items)
+            if not next_link:
+                return MsgraphResponse(f"Listed {len(listing)} items.", page.status_code, listing)
+            call = self._item_page_call(self._next_page_call(token, next_link), keep_raw)
+
+    async def iter_files_sharepoint(
+        self,
+        token: str,
+        siteid: str,
+        driveid: str,
+        path: str = "",
+        select: list[str] | None = None,
+        top: int | None = None,
+        prefetch: bool = True,
+    ) -> AsyncIterator[dict | MsgraphError]:
+        """
+        Lists every item in a Sharepoint folder across all pages, see Msgraph.iter_files_sharepoint. Use with "async for".
+        """
+        next_page: asyncio.Task[MsgraphResponse | MsgraphError] | None = None
+        page = await self._execute(self._list_files_call(token, siteid, driveid, path, select, top))
+        try:
+            while True:
+                if isinstance(page, MsgraphError):
+                    yield page
+                    return
+                next_link = page.data.get("@odata.nextLink")
+                if next_link and prefetch:
+                    next_page = asyncio.ensure_future(self._execute(self._next_page_call(token, next_link)))
+                for item in page.data.get("value", []):
+                    yield item
+                if not next_link:
+                    return
+                page = await next_page if next_page is not None else await self._execute(self._next_page_call(token, next_link))
+                next_page = None
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    @reports_retries
+    async def download_file_sharepoint(
+        self,
+        token: str,
+        siteid: str,
+        driveid: str,
+        path: str,
+        filename: str,
+        localpath: str,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+        workers: int = 1,
+        range_size: int = DOWNLOAD_RANGE_SIZE,
+        max_range_retries: int = 3,
+    ) -> MsgraphResponse | MsgraphError:
+        """
+        Downloads a file from Sharepoint, see Msgraph.download_file_sharepoint.
+        Each range counts against the concurrency limit while it's being downloaded.
+        """
+        target = os.path.join(localpath, filename)
+
+        if workers > 1:
+            metadata = await self._execute(self._download_item_call(token, siteid, driveid, path, filename))
+            if isinstance(metadata, MsgraphError):
+                return metadata
+            item = metadata.data
+            if item.get("size", 0) > range_size and item.get("@microsoft.graph.downloadUrl"):
+                return await self._download_ranges(item, target, chunk_size, workers, range_size, max_range_retries)
+
+        # Uncompressed, so the bytes written can be checked against Content-Length (and the hash, for ranges).
+        headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "identity"}
+        # The /content endpoint answers with a redirect to the actual file.
+        async with self._stream("GET", self._download_content_url(siteid, driveid, path, filename), headers=headers, follow_redirects=True) as response:
+            if isinstance(response, MsgraphError):
+                return response
+            if not _is_ok(response):
+                await response.aread()
+                return MsgraphError.from_response("Failed to download file.", response)
+            expected = response.headers.get("Content-Length")
+            status_code = response.status_code
+            try:
+                with open(f"{target}.part", "wb") as file:  # noqa: ASYNC230 : Opening is cheap, the writes are what goes off the loop.
+                    async for block in response.aiter_bytes(chunk_size):
+                        await asyncio.to_thread(file.write, block)
+                    written = file.tell()
+            except (OSError, httpx.HTTPError) as e:
+                _remove_quietly(f"{target}.part")
+                return MsgraphError(f"Failed to download file: {e}", status_code, None)
+
+        if expected is not None and int(expected) != written:
+            _remove_quietly(f"{target}.part")
+            return MsgraphError(f"Download incomplete: got {written} of {expected} bytes.", status_code, None)
+        return _finish_download(target, status_code)
+
+    async def _download_ranges(self, item: dict, target: str, chunk_size: int, workers: int, range_size: int, max_range_retries: int) -> MsgraphResponse | MsgraphError:
+        part = f"{target}.part"
+        preallocated = _preallocate(part, item["size"])
+        if isinstance(preallocated, MsgraphError):
+            return preallocated
+
+        url = item["@microsoft.graph.downloadUrl"]
+        limit = asyncio.Semaphore(workers)
+
+        async def download(start: int, end: int) -> QuickXorHash | MsgraphError:
+            async with limit:
+                return await self._download_range(url, part, start, end, chunk_size, max_range_retries)
+
+        results = await asyncio.gather(*(download(start, end) for start, end in _ranges(item["size"], range_size)))
+        hasher = QuickXorHash()
+        for result in results:
+            if isinstance(result, MsgraphError):
+                _remove_quietly(part)
+                return result
+            hasher.combine(result)
+
+        mismatch = self._check_download(item, part, hasher)
+        return mismatch or _finish_download(target, 206)
+
+    async def _download_range(self, url: str, part: str, start: int, end: int, chunk_size: int, max_range_retries: int) -> QuickXorHash | MsgraphError:
+        hasher = QuickXorHash(offset=start)
+        position = start
+        failures = 0
+        error = MsgraphError(f"Failed to download bytes {start}-{end}.", None, None)
+        try:
+            with open(part, "r+b") as file:  # noqa: ASYNC230 : Opening is cheap, the writes are what goes off the loop.
+                while position <= end:
+                    async with self._stream("GET", url, headers={"Range": f"bytes={position}-{end}", "Accept-Encoding": "identity"}) as response:
+                        if isinstance(response, MsgraphError):
+                            error = response
+                        elif response.status_code == 206:
+                            file.seek(position)
+                            try:
+                                async for block in response.aiter_bytes(chunk_size):
+                                    block = block[:end - position + 1]
+                                    await asyncio.to_thread(file.write, block)
+                                    hasher.update(block)
+                                    position += len(block)
+                            except httpx.HTTPError as e:
+                                error = MsgraphError(f"Failed to download bytes {position}-{end}: {e}", None, None)
+                        elif response.status_code == 200:
+                            return MsgraphError("Server ignored the Range header, use workers=1 for this file.", response.status_code, None)
+                        else:
+                            await response.aread()
+                            error = MsgraphError.from_response(f"Failed to download bytes {position}-{end}.", response)
+                    if position > end:
+                        break
+                    failures += 1
+                    if failures > max_range_retries:
+                        return error
+                    delay = min(2 ** failures * 0.5, 30)
+                    await asyncio.sleep(delay)
+                    record_retry(delay)
+        except OSError as e:
+            return MsgraphError(f"Failed to write bytes {position}-{end}: {e}", None, None)
+        return hasher
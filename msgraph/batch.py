@@ -0,0 +1,178 @@
+import contextvars
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlencode
+
+from msgraph.msgraph import GraphCall, MsgraphError, MsgraphResponse
+from msgraph.retry import NO_RETRY, RetryPolicy, record_retry
+from msgraph.transport import Headers
+
+if TYPE_CHECKING:
+    from msgraph.msgraph import Msgraph
+
+# Graph JSON batching: up to 20 requests in one POST to /$batch.
+#
+# GraphBatch collects calls, splits them into batches of 20, sends the batches concurrently and hands back one
+# MsgraphResponse/MsgraphError per call, in the order they were added. Each item keeps its own status code.
+# Failed items are sent again on their own when a RetryPolicy says so for the item's method and status: throttled
+# ones (429, or 503 with a Retry-After) after the Retry-After they came with, other server errors only for calls that
+# are safe to repeat. Everything that already went through isn't repeated. The /$batch POST itself isn't retried
+# by Msgraph, so a throttled batch isn't waited on twice: its items get its status and go through the same rule.
+#
+# Site and drive id lookups go through the client's id cache: cached ids come back without being sent, and what
+# the batch looks up is cached like a single lookup would be.
+#
+# Get one from Msgraph.batch(token).
+
+BATCH_LIMIT = 20
+
+
+class _BatchItemResponse:
+    # Looks enough like an HTTP response for the call parsers: status_code, headers, content, text and json().
+
+    def __init__(self, item: dict):
+        self.status_code = int(item.get("status", 0))
+        self.headers = Headers((item.get("headers") or {}).items())
+        self._body = item.get("body")
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        if self._body is None:
+            return ""
+        return self._body if isinstance(self._body, str) else json.dumps(self._body)
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode()
+
+    def json(self) -> Any:
+        return json.loads(self._body) if isinstance(self._body, str) else self._body
+
+
+class GraphBatch:
+    def __init__(self, graph: "Msgraph", token: str, max_workers: int = 4, max_retries: int = 3, max_retry_after: float = 60):
+        self.graph = graph
+        self.token = token
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self._calls: list[GraphCall | MsgraphResponse | MsgraphError] = []
+        self._id_keys: dict[int, str] = {}  # Position -> id cache key, for the site and drive id lookups.
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def add(self, call: GraphCall) -> int:
+        """
+        Queues any Graph call. Returns its position in the results.
+        """
+        if not call.url.startswith(f"{self.graph.graph_url}/"):
+            self._calls.append(MsgraphError(f"Only Graph calls can be batched, got {call.url}.", None, None))
+        elif call.content is not None or call.data is not None:
+            self._calls.append(MsgraphError("Calls with a binary or form body can't be batched.", None, None))
+        else:
+            self._calls.append(call)
+        return len(self._calls) - 1
+
+    def get_siteid(self, site: str) -> int:
+        return self._add_id_lookup(self.graph._siteid_key(site), self.graph._siteid_call(self.token, site))
+
+    def get_driveid(self, siteid: str) -> int:
+        return self._add_id_lookup(self.graph._driveid_key(siteid), self.graph._driveid_call(self.token, siteid))
+
+    def list_files_sharepoint(self, siteid: str, driveid: str, path: str = "") -> int:
+        return self.add(self.graph._list_files_call(self.token, siteid, driveid, path))
+
+    def execute(self) -> list[MsgraphResponse | MsgraphError]:
+        """
+        Sends everything queued and returns the results, in the order the calls were added.
+        The batch is emptied, so it can be reused.
+        """
+        calls, self._calls = self._calls, []
+        id_keys, self._id_keys = self._id_keys, {}
+        results: list[MsgraphResponse | MsgraphError | None] = [None if isinstance(call, GraphCall) else call for call in calls]
+        pending = [index for index, call in enumerate(calls) if isinstance(call, GraphCall)]
+        policy = RetryPolicy(max_retries=self.max_retries, max_retry_after=self.max_retry_after)
+        started = time.monotonic()
+
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            groups = [pending[start:start + BATCH_LIMIT] for start in range(0, len(pending), BATCH_LIMIT)]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [pool.submit(contextvars.copy_context().run, self._send, calls, group) for group in groups]
+                outcomes = [future.result() for future in futures]
+
+            pending, wait = [], 0.0
+            for group, outcome in zip(groups, outcomes):
+                for index in group:
+                    item = outcome.get(index)
+                    if item is None:
+                        item = MsgraphError("No response for this call in the batch.", None, None)
+                    method = calls[index].method  # type: ignore[union-attr]
+                    delay = policy.next_delay(attempt, method, item.status_code, item.headers, time.monotonic() - started)
+                    if delay is not None:
+                        pending.append(index)
+                        wait = max(wait, delay)
+                    elif isinstance(item, MsgraphError):
+                        results[index] = item
+                    else:
+                        results[index] = calls[index].parse(item)  # type: ignore[union-attr]
+            if pending:
+                time.sleep(wait)
+                record_retry(wait)
+
+        for index, key in id_keys.items():
+            result = results[index]
+            if result is not None and isinstance(calls[index], GraphCall):
+                self.graph._remember_id(key, result)
+        return [result if result is not None else MsgraphError("Batch item was never sent.", None, None) for result in results]
+
+    def _add_id_lookup(self, key: str, call: GraphCall) -> int:
+        cached = self.graph._cached_id(key)
+        if cached:
+            self._calls.append(cached)
+            return len(self._calls) - 1
+        index = self.add(call)
+        self._id_keys[index] = key
+        return index
+
+    def _send(self, calls: list, group: list[int]) -> dict[int, _BatchItemResponse | MsgraphError]:
+        # One POST to /$batch. When the batch as a whole fails, every item in it gets that status.
+        body = {"requests": [self._item(str(index), calls[index]) for index in group]}
+        response = self.graph._request(
+            "POST",
+            f"{self.graph.graph_url}/$batch",
+            headers={"Authorization": f"Bearer {self.token}", "Content-Type": "application/json"},
+            json=body,
+            retry_policy=NO_RETRY,
+        )
+        if isinstance(response, MsgraphError):
+            return dict.fromkeys(group, response)
+        if not response.ok:
+            failed = _BatchItemResponse({"status": response.status_code, "headers": response.headers, "body": response.text})
+            return dict.fromkeys(group, failed)
+        items: dict[int, _BatchItemResponse | MsgraphError] = {}
+        for item in response.json().get("responses", []):
+            items[int(item["id"])] = _BatchItemResponse(item)
+        return items
+
+    def _item(self, item_id: str, call: GraphCall) -> dict:
+        # The batch carries the token, so the per-call Authorization header goes.
+        headers = {key: value for key, value in call.headers.items() if key.lower() != "authorization"}
+        url = call.url[len(self.graph.graph_url):]
+        if call.params:
+            url = f"{url}?{urlencode(call.params, safe='$,@:')}"
+        item: dict = {"id": item_id, "method": call.method, "url": url}
+        if call.json is not None:
+            item["body"] = call.json
+            headers["Content-Type"] = "application/json"
+        if headers:
+            item["headers"] = headers
+        return item
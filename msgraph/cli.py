@@ -0,0 +1,479 @@
+import argparse
+import fnmatch
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+from msgraph.msgraph import Msgraph, MsgraphError
+
+# The "msgraph" command: runs job files, so uploads, downloads and mailings don't each need a script.
+#
+# A job file is JSON. Credentials (inline, or the path of a JSON file holding them), some settings, and a list of tasks:
+#
+# {
+#     "credentials": "credentials.json",
+#     "workers": 8,
+#     "pool": "thread",
+#     "tasks": [
+#         {"type": "upload", "driveid": "b!...", "files": ["exports/*.csv"], "destination": "Reports/"},
+#         {"type": "download", "site": "Finance", "folder": "Statements", "target": "statements", "pattern": "*.pdf"},
+#         {"type": "mail", "to": ["team@example.com"], "subject": "Done", "body": "Uploaded.", "attachments": ["summary.txt"]}
+#     ]
+# }
+#
+# Tasks are expanded into units, one per file or message, which run on a pool of "workers" threads, or processes with
+# "pool": "process". Each worker keeps one client, so tokens and connections are reused across its units (threads share
+# one). Relative paths are relative to the job file.
+#
+# Every unit that succeeds is appended to a checkpoint file (the job file's name plus ".checkpoint", or "checkpoint").
+# Run a job that failed or crashed again and the units already done are skipped. Once everything went through, the
+# checkpoint is deleted, so the next run starts from scratch.
+#
+# "client" in the job file holds keyword arguments for Msgraph, e.g. {"timeout": [5, 120], "token_cache_path": "..."}.
+# A token cache file is worth it with process pools, so the workers don't each fetch their own tokens. Upload tasks
+# with "skip_unchanged": true leave out files that are already there, and a "hash_index_path" keeps local hashes
+# between runs.
+
+TASK_TYPES = ("upload", "download", "mail")
+# The token scope each kind of unit needs.
+SCOPES = {"upload": "graph", "download": "graph", "mail": "outlook"}
+
+_worker_client: Msgraph | None = None
+_worker_lock = threading.Lock()
+
+
+class JobError(ValueError):
+    pass
+
+
+# ---------------------------------------------------------------------------------
+# Job files
+
+def load_job(path: str) -> dict:
+    """
+    Reads and checks a job file. Raises JobError when something's off.
+    """
+    try:
+        with open(path, encoding="utf-8") as file:
+            job = json.load(file)
+    except (OSError, ValueError) as e:
+        raise JobError(f"Can't read job file {path}: {e}") from None
+    if not isinstance(job, dict) or not isinstance(job.get("tasks"), list):
+        raise JobError("A job file is a JSON object with a list of \"tasks\".")
+    for index, task in enumerate(job["tasks"]):
+        if not isinstance(task, dict) or task.get("type") not in TASK_TYPES:
+            raise JobError(f"Task {index} needs a \"type\", one of: {', '.join(TASK_TYPES)}.")
+    if job.get("pool", "thread") not in ("thread", "process"):
+        raise JobError("\"pool\" is either \"thread\" or \"process\".")
+    job["base"] = os.path.dirname(os.path.abspath(path))
+    job.setdefault("checkpoint", f"{os.path.abspath(path)}.checkpoint")
+    return job
+
+
+def _path(job: dict, path: str) -> str:
+    return os.path.join(job["base"], os.path.expanduser(path))
+
+
+def _credentials(job: dict) -> dict:
+    credentials = job.get("credentials")
+    if isinstance(credentials, str):
+        try:
+            with open(_path(job, credentials), encoding="utf-8") as file:
+                credentials = json.load(file)
+        except (OSError, ValueError) as e:
+            raise JobError(f"Can't read credentials file {credentials}: {e}") from None
+    missing = {"tenantid", "clientid", "clientsecret", "audience", "refresh_token"} - set(credentials or {})
+    if missing:
+        raise JobError(f"Credentials are missing: {', '.join(sorted(missing))}.")
+    return credentials  # type: ignore[return-value]
+
+
+def _client_options(job: dict) -> dict:
+    options = dict(job.get("client") or {})
+    if isinstance(options.get("timeout"), list):
+        options["timeout"] = tuple(options["timeout"])
+    for key in ("token_cache_path", "id_cache_path", "hash_index_path"):
+        if options.get(key):
+            options[key] = _path(job, options[key])
+    return options
+
+
+# ---------------------------------------------------------------------------------
+# Planning: tasks into units. Units are plain dicts, so they can go to other processes.
+
+def plan(job: dict, graph: Msgraph) -> Iterator[dict]:
+    """
+    The units of a job, in order. Downloads need the folder listed first, and site names need looking up,
+    so this talks to Graph. Raises JobError when it can't.
+    """
+    for index, task in enumerate(job["tasks"]):
+        match task["type"]:
+            case "upload":
+                yield from _plan_upload(job, graph, task)
+            case "download":
+                yield from _plan_download(job, graph, task)
+            case "mail":
+                yield from _plan_mail(job, index, task)
+
+
+def _token(graph: Msgraph, scope: str) -> str:
+    token = graph.get_access_token(scope)
+    if isinstance(token, MsgraphError):
+        raise JobError(f"Can't get a token: {token.message} {token.response_content or ''}".strip())
+    return token.data
+
+
+def _drive(graph: Msgraph, task: dict) -> tuple[str, str]:
+    # (siteid, driveid), from the task or looked up from "site".
+    siteid, driveid = task.get("siteid", ""), task.get("driveid", "")
+    if driveid and (siteid or task["type"] == "upload"):
+        return siteid, driveid
+    token = _token(graph, "graph")
+    if not siteid:
+        if not task.get("site"):
+            raise JobError(f"A {task['type']} task needs \"driveid\", \"siteid\" or \"site\".")
+        found = graph.get_siteid(token, task["site"])
+        if isinstance(found, MsgraphError):
+            raise JobError(f"Can't find site {task['site']}: {found.message}")
+        siteid = found.data
+    if not driveid:
+        found = graph.get_driveid(token, siteid)
+        if isinstance(found, MsgraphError):
+            raise JobError(f"Can't find the drive of site {siteid}: {found.message}")
+        driveid = found.data
+    return siteid, driveid
+
+
+def _plan_upload(job: dict, graph: Msgraph, task: dict) -> Iterator[dict]:
+    _, driveid = _drive(graph, task)
+    destination = task.get("destination", "").strip("/")
+    root = _path(job, task["root"]) if task.get("root") else None
+    patterns = task.get("files") or []
+    for pattern in [patterns] if isinstance(patterns, str) else patterns:
+        for filepath in sorted(glob.glob(_path(job, pattern), recursive=True)):
+            if not os.path.isfile(filepath):
+                continue
+            try:
+                size = os.path.getsize(filepath)
+            except OSError:
+                size = 0  # Gone since the glob. Its unit fails when it runs, the rest of the job goes on.
+            folder = destination
+            if root is not None:
+                # Keeps the folder layout under "root".
+                relative = os.path.relpath(os.path.dirname(filepath), root).replace(os.sep, "/")
+                if relative != "." and not relative.startswith(".."):
+                    folder = f"{destination}/{relative}".strip("/")
+            yield {
+                "key": f"upload|{driveid}|{folder}|{os.path.abspath(filepath)}",
+                "kind": "upload",
+                "driveid": driveid,
+                "filepath": filepath,
+                "destination": f"{folder}/" if folder else "",
+                "mimetype": task.get("mimetype", ""),
+                "large_file_threshold": task.get("large_file_threshold"),
+                "skip_unchanged": bool(task.get("skip_unchanged")),
+                "bytes": size,
+            }
+
+
+def _plan_download(job: dict, graph: Msgraph, task: dict) -> Iterator[dict]:
+    siteid, driveid = _drive(graph, task)
+    token = _token(graph, "graph")
+    target = _path(job, task.get("target", "."))
+    pattern = task.get("pattern", "*")
+    folders = [task.get("folder", "").strip("/")]
+    while folders:
+        folder = folders.pop(0)
+        for item in graph.iter_files_sharepoint(token, siteid, driveid, folder, select=["id", "name", "size", "folder", "file"]):
+            if isinstance(item, MsgraphError):
+                raise JobError(f"Can't list {folder or 'the root folder'}: {item.message}")
+            path = f"{folder}/{item['name']}".strip("/")
+            if "folder" in item:
+                if task.get("recursive"):
+                    folders.append(path)
+                continue
+            if not fnmatch.fnmatchcase(item["name"], pattern):
+                continue
+            relative = os.path.relpath(path, task.get("folder", "").strip("/") or ".")
+            localpath = os.path.join(target, os.path.dirname(relative))
+            yield {
+                "key": f"download|{driveid}|{item['id']}|{os.path.abspath(localpath)}",
+                "kind": "download",
+                "siteid": siteid,
+                "driveid": driveid,
+                "path": f"{folder}/" if folder else "",
+                "filename": item["name"],
+                "localpath": localpath,
+                "bytes": item.get("size", 0),
+            }
+
+
+def _plan_mail(job: dict, index: int, task: dict) -> Iterator[dict]:
+    # One message, or "messages" with the task's own fields as defaults.
+    for number, message in enumerate(task.get("messages") or [{}]):
+        fields = {**task, **message}
+        if not fields.get("to"):
+            raise JobError(f"Mail task {index} has a message without \"to\".")
+        attachments = [_path(job, path) for path in fields.get("attachments") or []]
+        yield {
+            "key": f"mail|{index}|{number}",
+            "kind": "mail",
+            "to": [fields["to"]] if isinstance(fields["to"], str) else fields["to"],
+            "subject": fields.get("subject", ""),
+            "body": fields.get("body", ""),
+            "attachments": attachments,
+            "bytes": sum(os.path.getsize(path) for path in attachments if os.path.isfile(path)),
+        }
+
+
+# ---------------------------------------------------------------------------------
+# Workers. Each one keeps a client in _worker_client: one per process, or one shared by all the threads.
+
+def _init_worker(credentials: dict, options: dict) -> None:
+    global _worker_client
+    with _worker_lock:
+        if _worker_client is None:
+            _worker_client = Msgraph(credentials, **options)
+
+
+def run_unit(unit: dict) -> dict:
+    """
+    Runs one unit on this worker's client. Returns what happened as a plain dict, to pickle back.
+    """
+    started = time.monotonic()
+    graph = _worker_client
+    if graph is None:
+        return {"key": unit["key"], "kind": unit["kind"], "ok": False, "message": "Worker has no client.", "elapsed": 0.0, "retries": 0}
+    result = graph.get_access_token(SCOPES[unit["kind"]])
+    if not isinstance(result, MsgraphError):
+        token = result.data
+        match unit["kind"]:
+            case "upload":
+                options = {"large_file_threshold": unit["large_file_threshold"]} if unit.get("large_file_threshold") else {}
+                result = graph.upload_to_drive(
+                    token, unit["driveid"], unit["filepath"], unit["destination"], unit["mimetype"],
+                    skip_unchanged=unit.get("skip_unchanged", False), **options,
+                )
+            case "download":
+                os.makedirs(unit["localpath"], exist_ok=True)
+                result = graph.download_file_sharepoint(token, unit["siteid"], unit["driveid"], unit["path"], unit["filename"], unit["localpath"])
+            case "mail":
+                result = graph.send_email(token, unit["subject"], unit["body"], unit["to"], unit["attachments"])
+    outcome = {
+        "key": unit["key"],
+        "kind": unit["kind"],
+        "ok": result.is_ok,
+        "message": result.message,
+        "elapsed": time.monotonic() - started,
+        "retries": result.retries,
+    }
+    if isinstance(result, MsgraphError):
+        outcome["status_code"] = result.status_code
+    return outcome
+
+
+# ---------------------------------------------------------------------------------
+# Checkpoints: one JSON line per unit done.
+
+def read_checkpoint(path: str) -> set[str]:
+    done: set[str] = set()
+    try:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    done.add(json.loads(line)["key"])
+                except (ValueError, KeyError, TypeError):
+                    continue  # A line cut short by a crash.
+    except FileNotFoundError:
+        pass
+    return done
+
+
+class _Stats:
+    __slots__ = ("bytes", "done", "failed", "kinds", "retries", "skipped", "started")
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.retries = 0
+        self.kinds: dict[str, dict[str, int]] = {}
+
+    def record(self, unit: dict, outcome: dict) -> None:
+        kind = self.kinds.setdefault(unit["kind"], {"done": 0, "failed": 0, "bytes": 0})
+        self.retries += outcome.get("retries", 0)
+        if outcome["ok"]:
+            self.done += 1
+            self.bytes += unit.get("bytes", 0)
+            kind["done"] += 1
+            kind["bytes"] += unit.get("bytes", 0)
+        else:
+            self.failed += 1
+            kind["failed"] += 1
+
+    def as_dict(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            "done": self.done,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "elapsed": elapsed,
+            "units_per_s": self.done / elapsed if elapsed else 0.0,
+            "mb_per_s": self.bytes / elapsed / 1_000_000 if elapsed else 0.0,
+            "kinds": self.kinds,
+        }
+
+
+def run_job(
+    job: dict,
+    workers: int | None = None,
+    pool: str | None = None,
+    fresh: bool = False,
+    log: Callable[[str], None] = print,
+) -> dict:
+    """
+    Runs a loaded job and returns its statistics (see _Stats.as_dict).
+
+    Requires:
+
+    A job, from load_job.
+
+    OPTIONAL: Workers and pool kind, instead of the job file's.
+
+    OPTIONAL: fresh, to ignore the checkpoint of an earlier run.
+
+    OPTIONAL: Where to report failures, one line each. Defaults to print.
+    """
+    global _worker_client
+    workers = workers or job.get("workers", 4)
+    pool = pool or job.get("pool", "thread")
+    credentials = _credentials(job)
+    options = _client_options(job)
+    checkpoint = job["checkpoint"]
+    if fresh and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    done = read_checkpoint(checkpoint)
+    stats = _Stats()
+
+    graph = Msgraph(credentials, **options)
+    executor: Executor
+    if pool == "process":
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(credentials, options))
+    else:
+        # Threads share the planning client, and its connections and tokens.
+        _worker_client = graph
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    in_flight: dict[Future, dict] = {}
+    try:
+        with executor, open(checkpoint, "a", encoding="utf-8") as record:
+
+            def collect() -> None:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    unit = in_flight.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as e:  # noqa: BLE001 : A dead worker process fails its unit, not the job.
+                        outcome = {"key": unit["key"], "ok": False, "message": f"Worker failed: {e}", "retries": 0}
+                    stats.record(unit, outcome)
+                    if outcome["ok"]:
+                        record.write(json.dumps({"key": unit["key"]}) + "\n")
+                        record.flush()
+                    else:
+                        log(f"FAILED {unit['kind']} {unit['key']}: {outcome['message']}")
+
+            try:
+                for unit in plan(job, graph):
+                    if unit["key"] in done:
+                        stats.skipped += 1
+                        continue
+                    in_flight[executor.submit(run_unit, unit)] = unit
+                    if len(in_flight) >= workers * 2:
+                        collect()
+            finally:
+                # Even when planning fails halfway, what was started gets checkpointed.
+                while in_flight:
+                    collect()
+    finally:
+        if pool != "process":
+            _worker_client = None
+        graph.close()
+
+    if not stats.failed:
+        os.remove(checkpoint)  # All done. The next run starts over.
+    return stats.as_dict()
+
+
+def dry_run(job: dict, fresh: bool = False) -> dict:
+    """
+    Plans a job without running it: how many units and bytes there are per kind, and how many the checkpoint skips.
+    """
+    done = set() if fresh else read_checkpoint(job["checkpoint"])
+    counts: dict[str, dict[str, int]] = {}
+    skipped = 0
+    with Msgraph(_credentials(job), **_client_options(job)) as graph:
+        for unit in plan(job, graph):
+            if unit["key"] in done:
+                skipped += 1
+                continue
+            kind = counts.setdefault(unit["kind"], {"units": 0, "bytes": 0})
+            kind["units"] += 1
+            kind["bytes"] += unit.get("bytes", 0)
+    return {"skipped": skipped, "kinds": counts}
+
+
+def format_stats(stats: dict) -> str:
+    lines = [
+        f"{stats['done']} done, {stats['failed']} failed, {stats['skipped']} skipped (already done) in {stats['elapsed']:.1f} s",
+        f"{stats['units_per_s']:.1f} units/s, {stats['bytes'] / 1_000_000:.1f} MB at {stats['mb_per_s']:.2f} MB/s, {stats['retries']} retries",
+    ]
+    for kind, figures in stats["kinds"].items():
+        lines.append(f"  {kind:>8}: {figures['done']} done, {figures['failed']} failed, {figures['bytes'] / 1_000_000:.1f} MB")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="msgraph", description="Runs msgraph job files: uploads, downloads and mailings.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run = subparsers.add_parser("run", help="Run a job file, picking up where an earlier run stopped.")
+    run.add_argument("job", help="Path of the JSON job file.")
+    run.add_argument("--workers", type=int, help="Overrides the job file's \"workers\".")
+    run.add_argument("--pool", choices=("thread", "process"), help="Overrides the job file's \"pool\".")
+    run.add_argument("--fresh", action="store_true", help="Ignore the checkpoint and start over.")
+    run.add_argument("--dry-run", action="store_true", help="Plan the job and count its units, without running them.")
+    run.add_argument("--json", action="store_true", help="Print the statistics as JSON.")
+    args = parser.parse_args(argv)
+
+    try:
+        job = load_job(args.job)
+        if args.dry_run:
+            planned = dry_run(job, args.fresh)
+            print(json.dumps(planned, indent=2))
+            return 0
+        stats = run_job(job, args.workers, args.pool, args.fresh, log=lambda line: print(line, file=sys.stderr))
+    except JobError as e:
+        print(f"msgraph: {e}", file=sys.stderr)
+        return 2
+    print(json.dumps(stats, indent=2) if args.json else format_stats(stats))
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
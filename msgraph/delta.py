@@ -0,0 +1,149 @@
+import json
+import os
+import tempfile
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+from msgraph.msgraph import GraphCall, MsgraphError, MsgraphResponse
+
+if TYPE_CHECKING:
+    from msgraph.msgraph import Msgraph
+
+# Incremental change tracking for a drive, on top of Graph's /root/delta.
+#
+# The first run goes through every item in the drive. At the end Graph hands out a delta link, which we keep (on disk,
+# with a state_path), and every later run starts from it and only gets what changed since: created, modified and
+# deleted items. Polling a big library then costs about as much as what changed, not as much as the library.
+#
+# The new delta link is only stored once the last page has been read, so a run that's interrupted halfway is simply
+# repeated next time. Expect to see an item more than once now and then, Graph doesn't promise otherwise either.
+#
+# Get one from Msgraph.delta(token, siteid, driveid, state_path).
+
+
+class DeltaTracker:
+    def __init__(self, graph: "Msgraph", token: str, siteid: str, driveid: str, state_path: str | None = None, select: list[str] | None = None):
+        self.graph = graph
+        self.token = token
+        self.siteid = siteid
+        self.driveid = driveid
+        self.state_path = state_path
+        self.select = select
+        # Set when Graph made us start over with a full listing, see changes().
+        self.resynced = False
+        self.delta_link = self._load()
+
+    def changes(self) -> Iterator[dict | MsgraphError]:
+        """
+        Goes through what changed since the last complete run, or through the whole drive on the first one.
+        Deleted items come with a "deleted" field. Use path_of() for an item's path.
+
+        If Graph no longer accepts the stored delta link (410 Gone), tracking starts over with a full listing
+        and "resynced" is set, so you know to compare against everything instead of applying changes.
+
+        Returns:
+
+        A generator of drive items (dicts, as Graph sends them).
+
+        On fail: a MsgraphError object as the last thing generated. The delta link is left as it was.
+        """
+        self.resynced = False
+        call = self._first_call()
+        while True:
+            page = self.graph._execute(call)
+            if isinstance(page, MsgraphError):
+                if page.status_code == 410 and self.delta_link and not self.resynced:
+                    self.reset()
+                    self.resynced = True
+                    call = self._first_call()
+                    continue
+                yield page
+                return
+            yield from page.data.get("value", [])
+            next_link = page.data.get("@odata.nextLink")
+            if next_link:
+                call = self.graph._next_page_call(self.token, next_link)
+                continue
+            if page.data.get("@odata.deltaLink"):
+                self.delta_link = page.data["@odata.deltaLink"]
+                self._save()
+            return
+
+    def skip_to_latest(self) -> MsgraphResponse | MsgraphError:
+        """
+        Starts tracking from now on, without going through what's already in the drive.
+
+        Returns:
+
+        On success: MsgraphResponse object, with the delta link as its data.
+
+        On fail: MsgraphError object.
+        """
+        result = self.graph._execute(self.graph._delta_call(self.token, self.siteid, self.driveid, self.select, latest=True))
+        if isinstance(result, MsgraphError):
+            return result
+        self.delta_link = result.data.get("@odata.deltaLink")
+        self._save()
+        return MsgraphResponse("Tracking changes from now on.", result.status_code, self.delta_link)
+
+    def reset(self) -> None:
+        """
+        Forgets the delta link. The next changes() goes through the whole drive again.
+        """
+        self.delta_link = None
+        self._save()
+
+    @staticmethod
+    def path_of(item: dict) -> str:
+        """
+        An item's path within the drive, e.g. "Reports/2024/q1.xlsx", from its parentReference.
+        """
+        parent = (item.get("parentReference") or {}).get("path") or ""
+        parent = parent.split("root:", 1)[1].strip("/") if "root:" in parent else ""
+        return f"{parent}/{item.get('name', '')}" if parent else item.get("name", "")
+
+    def _first_call(self) -> GraphCall:
+        if self.delta_link:
+            return self.graph._next_page_call(self.token, self.delta_link)
+        return self.graph._delta_call(self.token, self.siteid, self.driveid, self.select)
+
+    def _state_key(self) -> str:
+        return f"{self.siteid}|{self.driveid}"
+
+    def _read_state(self) -> dict:
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path, encoding="utf-8") as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def _load(self) -> str | None:
+        # One state file can hold the links of several drives.
+        return self._read_state().get(self._state_key())
+
+    def _save(self) -> None:
+        # Written to a temporary file and swapped in, so a crash never leaves half a file behind.
+        if not self.state_path:
+            return
+        state = self._read_state()
+        if self.delta_link:
+            state[self._state_key()] = self.delta_link
+        else:
+            state.pop(self._state_key(), None)
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".msgraph-delta-")
+        except OSError:
+            return  # Best effort, like the token cache. The next run just starts over.
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(state, file)
+            os.replace(tmp_path, self.state_path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+
+from msgraph.hashes import hash_file
+
+# Remembers the hashes of local files, so unchanged files aren't read again to find out they're unchanged.
+#
+# Entries are keyed by absolute path and hash algorithm, and only count while the file keeps the size and modification
+# time (to the nanosecond) it had when it was hashed. Anything that rewrites a file changes those, so a stale hash is
+# never handed out. Hashes are in the format Graph reports them in a drive item's "file.hashes": quickXorHash (what
+# SharePoint and OneDrive for Business have) as base64, sha1Hash (personal OneDrive) as upper case hex.
+#
+# With a path, entries are also kept in a SQLite file, so they survive between runs. Like IdCache's, the file is a
+# cache, nothing more: if it can't be opened or written, the in-memory index carries on by itself.
+#
+# Msgraph keeps one for upload_to_drive(skip_unchanged=True), and syncs use it too. Pass hash_index_path to the
+# constructor to keep it on disk.
+
+
+def _sha1_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha1(usedforsecurity=False)  # It's what Graph reports, nothing more.
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest().upper()
+
+
+ALGORITHMS: dict[str, Callable[[str], str]] = {
+    "quickXorHash": hash_file,
+    "sha1Hash": _sha1_file,
+}
+
+
+class HashIndex:
+    def __init__(self, path: str | None = None, max_size: int = 100_000):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[int, int, str]] = OrderedDict()  # -> (size, mtime_ns, digest)
+        self._lock = threading.Lock()
+        self._db = _open_db(path) if path else None
+
+    def digest(self, filepath: str, algorithm: str = "quickXorHash") -> str:
+        """
+        The file's hash, from the index if the file hasn't changed since it was last hashed, otherwise computed and kept.
+        Raises OSError if the file can't be read, and ValueError for algorithms other than quickXorHash and sha1Hash.
+        """
+        compute = ALGORITHMS.get(algorithm)
+        if compute is None:
+            raise ValueError(f"Unknown hash algorithm {algorithm!r}. Use one of: {', '.join(ALGORITHMS)}.")
+        key = (os.path.abspath(filepath), algorithm)
+        stat = os.stat(filepath)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                entry = self._db_get(key)
+            if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+                self._remember(key, entry)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        # Hashed outside the lock, so threads hash different files at the same time.
+        digest = compute(filepath)
+        if os.stat(filepath).st_mtime_ns != stat.st_mtime_ns:
+            return digest  # Changed while we read it. Good for now, not worth keeping.
+        self._store(key, (stat.st_size, stat.st_mtime_ns, digest))
+        return digest
+
+    def invalidate(self, *paths: str) -> None:
+        """
+        Drops the given files, or everything if none are given. Applies to the file too.
+        """
+        absolute = {os.path.abspath(path) for path in paths}
+        with self._lock:
+            if not paths:
+                self._entries.clear()
+            for key in [key for key in self._entries if key[0] in absolute]:
+                del self._entries[key]
+            if self._db is not None:
+                try:
+                    if paths:
+                        self._db.executemany("DELETE FROM hashes WHERE path = ?", [(path,) for path in absolute])
+                    else:
+                        self._db.execute("DELETE FROM hashes")
+                except sqlite3.Error:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _store(self, key: tuple[str, str], entry: tuple[int, int, str]) -> None:
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO hashes (path, algorithm, size, mtime_ns, digest) VALUES (?, ?, ?, ?, ?)",
+                        (*key, *entry),
+                    )
+                except sqlite3.Error:
+                    pass
+
+    def _remember(self, key: tuple[str, str], entry: tuple[int, int, str]) -> None:
+        # Caller holds self._lock.
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _db_get(self, key: tuple[str, str]) -> tuple[int, int, str] | None:
+        # Caller holds self._lock.
+        assert self._db is not None
+        try:
+            row = self._db.execute("SELECT size, mtime_ns, digest FROM hashes WHERE path = ? AND algorithm = ?", key).fetchone()
+        except sqlite3.Error:
+            return None
+        return tuple(row) if row is not None else None  # type: ignore[return-value]
+
+
+def _open_db(path: str) -> sqlite3.Connection | None:
+    # Same setup as the id cache's: autocommit, WAL, and no file at all rather than an error.
+    try:
+        db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "path TEXT, algorithm TEXT, size INTEGER, mtime_ns INTEGER, digest TEXT, PRIMARY KEY (path, algorithm))"
+        )
+    except sqlite3.Error:
+        return None
+    return db
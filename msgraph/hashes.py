@@ -0,0 +1,99 @@
+# Microsoft's quickXorHash, the checksum OneDrive and SharePoint report in a drive item's "file.hashes".
+#
+# Every byte gets XORed into a 160-bit register, rotated 11 bits further than the byte before it, and the total length
+# is XORed into the top 64 bits at the end. That means a byte's contribution depends only on its position in the file:
+# bytes 160 positions apart land on the same bits. We use that twice:
+#
+# - update() XOR-folds the input into 160 bytes with big integer arithmetic, then rotates those 160 bytes into place.
+#   That keeps the per-byte work in C instead of a Python loop.
+# - A file can be hashed in pieces, in any order, by starting each piece at its offset and combining the results.
+#   Parallel ranged downloads rely on this.
+
+import base64
+
+_WIDTH = 160
+_SHIFT = 11
+_MASK = (1 << _WIDTH) - 1
+_BLOCK_BITS = _WIDTH * 8  # One 160-byte block, in bits.
+
+
+class QuickXorHash:
+    """
+    hashlib-style quickXorHash. Feed it with update(), read it with digest() or base64digest().
+    The latter is the format Graph uses.
+
+    "offset" is the position in the file of the first byte you'll feed it, for hashing a piece of a file.
+    Pieces are put back together with combine().
+    """
+
+    name = "quickxorhash"
+    digest_size = _WIDTH // 8
+
+    def __init__(self, data: bytes = b"", offset: int = 0):
+        self._state = 0
+        self._position = offset
+        self._length = 0
+        if data:
+            self.update(data)
+
+    def update(self, data: bytes | bytearray | memoryview) -> None:
+        size = len(data)
+        if not size:
+            return
+        shift = (self._position * _SHIFT) % _WIDTH
+        state = self._state
+        for index, byte in enumerate(_fold(data)):
+            if byte:
+                rotated = byte << ((shift + index * _SHIFT) % _WIDTH)
+                state ^= (rotated & _MASK) | (rotated >> _WIDTH)
+        self._state = state
+        self._position += size
+        self._length += size
+
+    def combine(self, other: "QuickXorHash") -> None:
+        """
+        Merges in the hash of another piece of the same file. The pieces must not overlap.
+        """
+        self._state ^= other._state
+        self._length += other._length
+
+    def copy(self) -> "QuickXorHash":
+        clone = QuickXorHash()
+        clone._state, clone._position, clone._length = self._state, self._position, self._length
+        return clone
+
+    def digest(self) -> bytes:
+        value = self._state ^ ((self._length & 0xFFFFFFFFFFFFFFFF) << (_WIDTH - 64))
+        return value.to_bytes(self.digest_size, "little")
+
+    def hexdigest(self) -> str:
+        return self.digest().hex()
+
+    def base64digest(self) -> str:
+        return base64.b64encode(self.digest()).decode("ascii")
+
+
+def _fold(data: bytes | bytearray | memoryview) -> bytes:
+    # XORs every 160-byte block of data together. Byte k of the result is data[k] ^ data[k + 160] ^ data[k + 320] ^ ...
+    # Halving the integer each round keeps this O(n) overall.
+    if len(data) <= _WIDTH:
+        return bytes(data)
+    blocks = -(-len(data) // _WIDTH)
+    value = int.from_bytes(data, "little")
+    while blocks > 1:
+        half = blocks // 2
+        bits = half * _BLOCK_BITS
+        value = (value & ((1 << bits) - 1)) ^ (value >> bits)
+        blocks -= half
+    return value.to_bytes(_WIDTH, "little")
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    quickXorHash of a local file, in Graph's base64 format. Reads it one chunk at a time.
+    """
+    hasher = QuickXorHash()
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            hasher.update(chunk)
+    return hasher.base64digest()
@@ -0,0 +1,141 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Cache for site and drive id lookups, used by get_siteid and get_driveid.
+#
+# Ids practically never change, so they're kept for "ttl" seconds (a day by default). Lookups that came back 404 are
+# kept too, for "negative_ttl" seconds, so a job asking for a site that doesn't exist doesn't ask again every time.
+# In memory, the least recently used entries go once there are more than "max_size".
+#
+# With a path, entries are also kept in a SQLite file, so every process on the host shares the same lookups.
+# The file is a cache, nothing more: if it can't be opened or written, the in-memory cache carries on by itself.
+
+
+class CachedId:
+    __slots__ = ("content", "expires", "message", "ok", "status_code", "value")
+
+    def __init__(self, ok: bool, value: str | None, message: str, status_code: int | None, content: str | None, expires: float):
+        self.ok = ok
+        self.value = value
+        self.message = message
+        self.status_code = status_code
+        self.content = content
+        self.expires = expires
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.ok!r}, {self.value!r}, {self.status_code!r})"
+
+
+class IdCache:
+    def __init__(self, ttl: float = 86400, negative_ttl: float = 60, max_size: int = 1024, path: str | None = None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, CachedId] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = _open_db(path) if path else None
+
+    def get(self, key: str) -> CachedId | None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None and self._db is not None:
+                entry = self._db_get(key, now)
+                if entry is not None:
+                    self._remember(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: str, value: str, message: str, status_code: int | None = 200) -> None:
+        self._store(key, CachedId(True, value, message, status_code, None, time.time() + self.ttl))
+
+    def set_failure(self, key: str, message: str, status_code: int | None, content: str | None) -> None:
+        self._store(key, CachedId(False, None, message, status_code, content, time.time() + self.negative_ttl))
+
+    def invalidate(self, *keys: str) -> None:
+        """
+        Drops the given keys, or everything if none are given. Applies to the shared file too.
+        """
+        with self._lock:
+            if not keys:
+                self._entries.clear()
+            for key in keys:
+                self._entries.pop(key, None)
+            if self._db is not None:
+                try:
+                    if keys:
+                        self._db.executemany("DELETE FROM ids WHERE key = ?", [(key,) for key in keys])
+                    else:
+                        self._db.execute("DELETE FROM ids")
+                except sqlite3.Error:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _store(self, key: str, entry: CachedId) -> None:
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO ids (key, ok, value, message, status_code, content, expires) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (key, int(entry.ok), entry.value, entry.message, entry.status_code, entry.content, entry.expires),
+                    )
+                    self._db.execute("DELETE FROM ids WHERE expires <= ?", (time.time(),))
+                except sqlite3.Error:
+                    pass
+
+    def _remember(self, key: str, entry: CachedId) -> None:
+        # Caller holds self._lock.
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _db_get(self, key: str, now: float) -> CachedId | None:
+        # Caller holds self._lock.
+        assert self._db is not None
+        try:
+            row = self._db.execute(
+                "SELECT ok, value, message, status_code, content, expires FROM ids WHERE key = ? AND expires > ?", (key, now)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        ok, value, message, status_code, content, expires = row
+        return CachedId(bool(ok), value, message, status_code, content, expires)
+
+
+def _open_db(path: str) -> sqlite3.Connection | None:
+    # Autocommit, and WAL so readers in other processes don't wait on writers.
+    try:
+        db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS ids ("
+            "key TEXT PRIMARY KEY, ok INTEGER, value TEXT, message TEXT, status_code INTEGER, content TEXT, expires REAL)"
+        )
+    except sqlite3.Error:
+        return None
+    return db
@@ -0,0 +1,249 @@
+import functools
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Any
+from urllib.parse import urlsplit
+
+# Counts and times every HTTP request a client sends, when you ask it to.
+#
+# Pass an Instrumentation to Msgraph (or AsyncMsgraph) and every attempt at a request is recorded: latency into a
+# histogram, bytes both ways, the status code, and whether it was retried. All of it is kept overall, per client method
+# ("upload_to_drive", "get_access_token"...) and per endpoint ("PUT /drives/{id}/root:/{path}:/content"), so you can
+# tell token fetches from uploads and see what gets throttled. snapshot() hands it all back as plain dicts.
+#
+# Hooks get called around each attempt with a RequestEvent, which is where a tracer opens and closes its spans, or an
+# exporter feeds its own metrics. A hook is any object with request_started(event) and/or request_finished(event).
+# Hooks run on the thread (or task) making the request, so keep them quick. Exceptions in them are swallowed.
+#
+# Without an Instrumentation the clients skip all of this: one None check per request.
+#
+# Byte counts come from the Content-Length headers, so streamed downloads are counted without being read twice.
+
+# Latency bucket upper bounds, in seconds. The last bucket takes everything slower.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram. Percentiles are estimated from the buckets.
+    """
+
+    __slots__ = ("bounds", "count", "counts", "max", "min", "sum")
+
+    def __init__(self, bounds: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        if not self.count or value < self.min:
+            self.min = value
+        self.max = max(self.max, value)
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimated value below which a fraction "q" (0 to 1) of the observations fall.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                low = self.bounds[index - 1] if index else 0.0
+                high = self.bounds[index] if index < len(self.bounds) else self.max
+                # Linear within the bucket, and never outside what was actually seen.
+                estimate = low + (high - low) * (rank - seen) / count
+                return min(max(estimate, self.min), self.max)
+            seen += count
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "buckets": {str(bound): count for bound, count in zip((*self.bounds, "inf"), self.counts)},
+        }
+
+
+class RequestEvent:
+    """
+    One attempt at an HTTP request, as hooks see it. "operation" is the client method it's part of, "endpoint" the URL
+    with ids and paths taken out. The response fields are filled in before request_finished. "status_code" is None when
+    no response came back, and "error" says why. "retried" means the client is going to try again.
+    "context" is free for hooks to keep things in between the two calls, a span for instance.
+    """
+
+    __slots__ = (
+        "attempt", "context", "elapsed", "endpoint", "error", "method", "operation",
+        "request_bytes", "response_bytes", "retried", "started", "status_code", "url",
+    )
+
+    def __init__(self, method: str, url: str, endpoint: str, operation: str, attempt: int):
+        self.method = method
+        self.url = url
+        self.endpoint = endpoint
+        self.operation = operation
+        self.attempt = attempt
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+        self.status_code: int | None = None
+        self.error: str | None = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retried = False
+        self.context: dict[str, Any] = {}
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.method!r}, {self.endpoint!r}, {self.status_code!r})"
+
+
+class _Stats:
+    __slots__ = ("bytes_received", "bytes_sent", "errors", "latency", "requests", "retries", "statuses")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.latency = Histogram(bounds)
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.statuses: dict[str, int] = {}
+
+    def record(self, event: RequestEvent) -> None:
+        self.latency.observe(event.elapsed)
+        self.requests += 1
+        status = str(event.status_code) if event.status_code is not None else "error"
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if event.status_code is None or event.status_code >= 400:
+            self.errors += 1
+        if event.retried:
+            self.retries += 1
+        self.bytes_sent += event.request_bytes
+        self.bytes_received += event.response_bytes
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "throttled": self.statuses.get("429", 0) + self.statuses.get("503", 0),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "status_codes": dict(self.statuses),
+            "latency": self.latency.as_dict(),
+        }
+
+
+class Instrumentation:
+    def __init__(self, hooks: list | None = None, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.hooks = list(hooks or [])
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._reset()
+
+    def add_hook(self, hook: Any) -> None:
+        self.hooks.append(hook)
+
+    def snapshot(self) -> dict:
+        """
+        Everything recorded so far: totals under "total", and the same figures per client method under
+        "operations" and per endpoint under "endpoints".
+        """
+        with self._lock:
+            return {
+                "total": self._total.as_dict(),
+                "operations": {name: stats.as_dict() for name, stats in self._operations.items()},
+                "endpoints": {name: stats.as_dict() for name, stats in self._endpoints.items()},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def _reset(self) -> None:
+        self._total = _Stats(self.buckets)
+        self._operations: dict[str, _Stats] = {}
+        self._endpoints: dict[str, _Stats] = {}
+
+    # The clients call these two around every attempt.
+
+    def start(self, method: str, url: str, operation: str, attempt: int, base_urls: tuple[str, str]) -> RequestEvent:
+        event = RequestEvent(method, url, f"{method} {endpoint_of(url, *base_urls)}", operation or "(none)", attempt)
+        for hook in self.hooks:
+            _call_hook(hook, "request_started", event)
+        return event
+
+    def finish(self, event: RequestEvent, response: Any, error: str | None, retried: bool) -> None:
+        event.elapsed = time.monotonic() - event.started
+        event.retried = retried
+        if response is not None:
+            event.status_code = response.status_code
+            event.request_bytes = _content_length(response.request.headers)
+            event.response_bytes = _content_length(response.headers)
+        event.error = error
+        with self._lock:
+            self._total.record(event)
+            for group, key in ((self._operations, event.operation), (self._endpoints, event.endpoint)):
+                stats = group.get(key)
+                if stats is None:
+                    stats = group[key] = _Stats(self.buckets)
+                stats.record(event)
+        for hook in self.hooks:
+            _call_hook(hook, "request_finished", event)
+
+
+def _call_hook(hook: Any, name: str, event: RequestEvent) -> None:
+    method = getattr(hook, name, None)
+    if method is None:
+        return
+    try:
+        method(event)
+    except Exception:  # noqa: BLE001, S110 : A broken hook doesn't get to break requests.
+        pass
+
+
+def _content_length(headers: Any) -> int:
+    try:
+        return int(headers.get("Content-Length") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+_ROOT_PATH = re.compile(r"root:/.+?(:/|:$|$)")
+_SITE_BY_NAME = re.compile(r"^/sites/[^/]+:/sites/[^/]+")
+_IDS = re.compile(r"/(sites|drives|items|messages)/[^/:{][^/:]*")
+
+
+@functools.lru_cache(maxsize=1024)
+def _graph_endpoint(path: str) -> str:
+    path = _ROOT_PATH.sub(lambda match: "root:/{path}" + (":/" if match.group(1) == ":/" else ""), path)
+    path = _SITE_BY_NAME.sub("/sites/{host}:/sites/{site}", path)
+    return _IDS.sub(lambda match: f"/{match.group(1)}/{{id}}", path)
+
+
+def endpoint_of(url: str, graph_url: str, login_url: str) -> str:
+    """
+    A URL with the parts that change from call to call taken out, e.g. "/sites/{id}/drives".
+    Upload sessions and download links, which live on other hosts, are grouped by host.
+    """
+    url = url.split("?", 1)[0]
+    if url.startswith(graph_url):
+        return _graph_endpoint(url[len(graph_url):])
+    if url.startswith(login_url) and url.endswith("/oauth2/v2.0/token"):
+        return "/{tenant}/oauth2/v2.0/token"
+    return f"{urlsplit(url).netloc}/*"
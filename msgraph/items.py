@@ -0,0 +1,322 @@
+import json
+import math
+import re
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from datetime import datetime
+from fnmatch import fnmatchcase
+from typing import Any
+
+# Compact drive items and listings, for folders too big to keep around as Graph's JSON.
+#
+# A listed item as Graph sends it is a nest of dicts, a few kilobytes of Python objects each, and most of it is never
+# read. A DriveItem keeps the handful of fields everything here uses (id, name, size, modification time, folder or not,
+# quickXorHash) in slots. Optionally it keeps the item's JSON text too, and parses that only if some other field is
+# asked for.
+#
+# A DriveListing goes further and stores a whole listing as columns: lists of ids and names, and arrays of sizes and
+# times. Filtering, sorting and diffing work on the columns, so a million-item listing is a few dozen megabytes and
+# never a million dicts.
+#
+# parse_page() reads a listing page with the json module's own decoder, one item at a time, so only one item's dicts
+# exist at any moment. Every item is still decoded in full as the page is read: finding where an item ends without
+# decoding it would mean scanning the JSON in Python, which is slower than the C decoder doing the whole job. What's
+# lazy is the rest of the item, kept as text (keep_raw) and parsed again only if a field beyond the common ones is
+# asked for. Msgraph.list_items_sharepoint puts it all together.
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"[ \t\n\r]*")
+
+
+def parse_timestamp(value: str | None) -> float | None:
+    """
+    A Graph date-time ("2024-01-31T12:00:00Z") as a Unix timestamp, or None if it's missing or not a date.
+    """
+    # Graph's ISO 8601 times end in "Z", which fromisoformat only understands from Python 3.11 on.
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class DriveItem:
+    """
+    One drive item. The common fields are attributes, anything else is item.get("field"), parsed from the item's
+    JSON text on first use when it was kept ("raw"). "modified" is a POSIX timestamp.
+    """
+
+    __slots__ = ("_data", "hash", "id", "is_folder", "modified", "name", "raw", "size")
+
+    def __init__(
+        self,
+        id: str,
+        name: str,
+        size: int = 0,
+        modified: float | None = None,
+        is_folder: bool = False,
+        hash: str | None = None,
+        raw: str | None = None,
+    ):
+        self.id = id
+        self.name = name
+        self.size = size
+        self.modified = modified
+        self.is_folder = is_folder
+        self.hash = hash
+        self.raw = raw
+        self._data: dict | None = None
+
+    @classmethod
+    def from_dict(cls, item: dict, raw: str | None = None) -> "DriveItem":
+        return cls(
+            item.get("id", ""),
+            item.get("name", ""),
+            item.get("size", 0),
+            parse_timestamp(item.get("lastModifiedDateTime")),
+            "folder" in item,
+            ((item.get("file") or {}).get("hashes") or {}).get("quickXorHash"),
+            raw,
+        )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Any field of the item, from its JSON text. Without the text (keep_raw=False), only the common fields are known.
+        """
+        return self.as_dict().get(key, default)
+
+    def as_dict(self) -> dict:
+        if self._data is None:
+            if self.raw is None:
+                return {"id": self.id, "name": self.name, "size": self.size}
+            self._data = json.loads(self.raw)
+        return self._data
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DriveItem):
+            return NotImplemented
+        return (self.id, self.name, self.size, self.modified, self.is_folder, self.hash) == (
+            other.id, other.name, other.size, other.modified, other.is_folder, other.hash
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.name!r}, size={self.size!r}, is_folder={self.is_folder!r})"
+
+
+def parse_page(text: str, keep_raw: bool = False) -> tuple[list[DriveItem], str | None]:
+    """
+    Reads one listing (or delta) page: its items, and its @odata.nextLink if there is one.
+    Each item is decoded as it's reached and only its common fields are kept (plus its JSON text, with keep_raw).
+    Raises ValueError if the text isn't a Graph page.
+    """
+    items: list[DriveItem] = []
+    next_link = None
+    try:
+        index = _skip(text, 0)
+        if text[index] != "{":
+            raise ValueError("Expected a JSON object.")
+        index = _skip(text, index + 1)
+        while text[index] != "}":
+            key, index = _decoder.raw_decode(text, index)
+            index = _skip(text, index)
+            if text[index] != ":":
+                raise ValueError(f"Expected ':' at {index}.")
+            index = _skip(text, index + 1)
+            if key == "value" and text[index] == "[":
+                index = _skip(text, index + 1)
+                while text[index] != "]":
+                    item, end = _decoder.raw_decode(text, index)
+                    items.append(DriveItem.from_dict(item, text[index:end] if keep_raw else None))
+                    index = _comma(text, _skip(text, end))
+                index += 1
+            else:
+                value, index = _decoder.raw_decode(text, index)
+                if key == "@odata.nextLink":
+                    next_link = value
+            index = _comma(text, _skip(text, index))
+    except IndexError:
+        raise ValueError("Truncated listing page.") from None
+    return items, next_link
+
+
+def _skip(text: str, index: int) -> int:
+    match = _whitespace.match(text, index)
+    return match.end() if match else index
+
+
+def _comma(text: str, index: int) -> int:
+    return _skip(text, index + 1) if text[index] == "," else index
+
+
+class ListingDiff:
+    """
+    What changed between two listings: items only in the newer one, only in the older one, and in both but different.
+    """
+
+    __slots__ = ("added", "changed", "removed")
+
+    def __init__(self, added: "DriveListing", removed: "DriveListing", changed: "DriveListing"):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(added={len(self.added)}, removed={len(self.removed)}, changed={len(self.changed)})"
+
+
+class DriveListing:
+    """
+    A listing stored as columns. Items are looked up by name, which can be a path for listings that span folders.
+    listing[i] and iteration hand out DriveItem objects, made on the fly.
+    """
+
+    __slots__ = ("folders", "hashes", "ids", "modified", "names", "raws", "sizes")
+
+    def __init__(self, items: Iterable[DriveItem] = (), keep_raw: bool = False):
+        self.ids: list[str] = []
+        self.names: list[str] = []
+        self.sizes = array("q")
+        self.modified = array("d")  # NaN where Graph didn't say.
+        self.folders = bytearray()
+        self.hashes: list[str | None] = []
+        self.raws: list[str | None] | None = [] if keep_raw else None
+        self.extend(items)
+
+    def append(self, item: DriveItem) -> None:
+        self.ids.append(item.id)
+        self.names.append(item.name)
+        self.sizes.append(item.size)
+        self.modified.append(math.nan if item.modified is None else item.modified)
+        self.folders.append(item.is_folder)
+        self.hashes.append(item.hash)
+        if self.raws is not None:
+            self.raws.append(item.raw)
+
+    def extend(self, items: Iterable[DriveItem]) -> None:
+        for item in items:
+            self.append(item)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> DriveItem:
+        modified = self.modified[index]
+        return DriveItem(
+            self.ids[index],
+            self.names[index],
+            self.sizes[index],
+            None if math.isnan(modified) else modified,
+            bool(self.folders[index]),
+            self.hashes[index],
+            self.raws[index] if self.raws is not None else None,
+        )
+
+    def __iter__(self) -> Iterator[DriveItem]:
+        return (self[index] for index in range(len(self)))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({len(self)} items, {self.total_size} bytes)"
+
+    @property
+    def total_size(self) -> int:
+        return sum(self.sizes)
+
+    def take(self, indices: Iterable[int]) -> "DriveListing":
+        """
+        A new listing with the rows at these positions, in this order.
+        """
+        taken = DriveListing(keep_raw=self.raws is not None)
+        for index in indices:
+            taken.ids.append(self.ids[index])
+            taken.names.append(self.names[index])
+            taken.sizes.append(self.sizes[index])
+            taken.modified.append(self.modified[index])
+            taken.folders.append(self.folders[index])
+            taken.hashes.append(self.hashes[index])
+            if taken.raws is not None and self.raws is not None:
+                taken.raws.append(self.raws[index])
+        return taken
+
+    def filter(
+        self,
+        predicate: Callable[[DriveItem], bool] | None = None,
+        *,
+        name: str | None = None,
+        files_only: bool = False,
+        folders_only: bool = False,
+        min_size: int | None = None,
+        max_size: int | None = None,
+        modified_after: float | None = None,
+        modified_before: float | None = None,
+    ) -> "DriveListing":
+        """
+        The items matching every condition given. "name" is a glob pattern ("*.pdf"), times are POSIX timestamps.
+        The keyword conditions are checked on the columns. "predicate" gets a DriveItem, so it's the slow path.
+        Items without a modification time never match modified_after or modified_before.
+        """
+        keep = []
+        for index in range(len(self)):
+            if files_only and self.folders[index]:
+                continue
+            if folders_only and not self.folders[index]:
+                continue
+            if min_size is not None and self.sizes[index] < min_size:
+                continue
+            if max_size is not None and self.sizes[index] > max_size:
+                continue
+            # Comparisons with NaN are False, so unknown times drop out here.
+            if modified_after is not None and not self.modified[index] > modified_after:
+                continue
+            if modified_before is not None and not self.modified[index] < modified_before:
+                continue
+            if name is not None and not fnmatchcase(self.names[index], name):
+                continue
+            if predicate is not None and not predicate(self[index]):
+                continue
+            keep.append(index)
+        return self.take(keep)
+
+    def sort(self, by: str = "name", reverse: bool = False) -> "DriveListing":
+        """
+        A sorted copy, by "name", "size" or "modified". Items without a time sort first.
+        """
+        columns: dict[str, Any] = {"name": self.names, "size": self.sizes, "modified": self.modified}
+        if by not in columns:
+            raise ValueError(f"Can't sort by {by!r}. Use one of: {', '.join(columns)}.")
+        column = columns[by]
+        if by == "modified":
+            key: Callable[[int], Any] = lambda index: -math.inf if math.isnan(column[index]) else column[index]
+        else:
+            key = column.__getitem__
+        return self.take(sorted(range(len(self)), key=key, reverse=reverse))
+
+    def diff(self, older: "DriveListing") -> ListingDiff:
+        """
+        Compares this listing with an older one of the same place, by name. An item counts as changed when its size,
+        its quickXorHash (when both have one) or otherwise its modification time differs.
+        """
+        before = {name: index for index, name in enumerate(older.names)}
+        added, changed = [], []
+        for index, name in enumerate(self.names):
+            old = before.pop(name, None)
+            if old is None:
+                added.append(index)
+            elif self._differs(index, older, old):
+                changed.append(index)
+        return ListingDiff(self.take(added), older.take(sorted(before.values())), self.take(changed))
+
+    def _differs(self, index: int, older: "DriveListing", old: int) -> bool:
+        if self.sizes[index] != older.sizes[old] or self.folders[index] != older.folders[old]:
+            return True
+        if self.hashes[index] and older.hashes[old]:
+            return self.hashes[index] != older.hashes[old]
+        new_time, old_time = self.modified[index], older.modified[old]
+        if math.isnan(new_time) and math.isnan(old_time):
+            return False
+        return new_time != old_time
@@ -0,0 +1,209 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from string import Template
+from typing import TYPE_CHECKING
+
+from msgraph.msgraph import (
+    INLINE_ATTACHMENT_LIMIT,
+    MsgraphError,
+    MsgraphResponse,
+    _read_attachment_as_base64,
+)
+from msgraph.retry import RateLimiter, reports_retries
+
+if TYPE_CHECKING:
+    from msgraph.msgraph import Msgraph
+
+# Sends lots of personalised messages from one mailbox.
+#
+# Subject and body are string.Template templates ($name or ${name}), filled in per message from its "context".
+# $ placeholders instead of {} so HTML bodies with CSS in them don't need escaping. Placeholders a context doesn't
+# fill are left as they are.
+#
+# Attachments shared by every message are read and base64-encoded once, and every request body reuses them. If
+# they're too big to send inline, every message goes through Msgraph.send_large_email instead, which uploads them
+# per message. Graph can't share those.
+#
+# Exchange lets a mailbox send about 30 messages a minute, so that's the default pace. Results come back as
+# each message is done, not in order, so a big run can be followed (and logged) as it goes.
+#
+# Get one from Msgraph.bulk_mail(token, subject, body).
+
+MAILBOX_MESSAGES_PER_MINUTE = 30
+
+
+class MailMessage:
+    """
+    One message of a bulk send. "subject" and "body" override the mailer's templates for this message,
+    "attachments" are sent on top of the shared ones.
+    """
+
+    __slots__ = ("attachments", "body", "context", "subject", "to")
+
+    def __init__(self, to: list[str], context: dict | None = None, subject: str | None = None, body: str | None = None, attachments: list[str] | None = None):
+        self.to = to
+        self.context = context or {}
+        self.subject = subject
+        self.body = body
+        self.attachments = attachments or []
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.to!r})"
+
+
+class MailResult:
+    """
+    Outcome of one message: its position in the input, recipients, the MsgraphResponse/MsgraphError and how long it took.
+    """
+
+    __slots__ = ("elapsed", "index", "result", "to")
+
+    def __init__(self, index: int, to: list[str], result: MsgraphResponse | MsgraphError, elapsed: float):
+        self.index = index
+        self.to = to
+        self.result = result
+        self.elapsed = elapsed
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.index!r}, {self.to!r}, {self.result!r})"
+
+
+class BulkMailer:
+    def __init__(
+        self,
+        graph: "Msgraph",
+        token: str,
+        subject: str = "",
+        body: str = "",
+        attachments: list[str] | None = None,
+        workers: int = 4,
+        per_minute: float = MAILBOX_MESSAGES_PER_MINUTE,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        self.graph = graph
+        self.token = token
+        self.subject = subject
+        self.body = body
+        self.attachments = attachments or []
+        self.workers = workers
+        # Evenly spaced, no bursts. Pass a shared RateLimiter if several mailers send from the same mailbox.
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter(per_minute / 60, burst=1)
+        self.sent = 0
+        self.failed = 0
+        self.elapsed = 0.0
+        self._shared: list[dict] | MsgraphError | None = None
+        self._shared_size = 0
+        self._shared_read = False
+        self._lock = threading.Lock()
+
+    def send(self, messages: Iterable[MailMessage | dict]) -> Iterator[MailResult]:
+        """
+        Sends every message, a few at a time. "messages" can be a generator, it's consumed as sending goes on.
+
+        Requires:
+
+        MailMessage objects, or dicts with the same keys ("to", "context", "subject", "body", "attachments").
+
+        Returns:
+
+        A generator of MailResult objects, one per message, in the order they finish. See also summary().
+        """
+        started = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                in_flight: set[Future] = set()
+                for index, message in enumerate(messages):
+                    if len(in_flight) >= self.workers * 2:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        yield from (future.result() for future in done)
+                    spec = message if isinstance(message, MailMessage) else MailMessage(**message)
+                    in_flight.add(pool.submit(contextvars.copy_context().run, self._send_one, index, spec))
+                while in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    yield from (future.result() for future in done)
+        finally:
+            self.elapsed += time.monotonic() - started
+
+    def summary(self) -> dict:
+        """
+        Messages sent and failed so far, seconds spent sending, and messages per minute.
+        """
+        with self._lock:
+            sent, failed = self.sent, self.failed
+        return {
+            "sent": sent,
+            "failed": failed,
+            "elapsed": self.elapsed,
+            "per_minute": sent / self.elapsed * 60 if self.elapsed else 0.0,
+        }
+
+    def _send_one(self, index: int, message: MailMessage) -> MailResult:
+        started = time.monotonic()
+        subject = Template(message.subject if message.subject is not None else self.subject).safe_substitute(message.context)
+        body = Template(message.body if message.body is not None else self.body).safe_substitute(message.context)
+
+        self.rate_limiter.acquire("mailbox")
+        shared = self._shared_attachments()
+        own = self.graph._attachment_sizes(message.attachments)
+        result: MsgraphResponse | MsgraphError
+        if isinstance(shared, MsgraphError):
+            result = shared
+        elif isinstance(own, MsgraphError):
+            result = own
+        elif shared is None or self._shared_size + sum(size for _, size in own) > INLINE_ATTACHMENT_LIMIT:
+            # Too big for one sendMail request, shared and own attachments together.
+            result = self.graph.send_large_email(self.token, subject, body, message.to, self.attachments + message.attachments)
+        else:
+            result = self._send_inline(subject, body, message, shared)
+
+        with self._lock:
+            if result.is_ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+        return MailResult(index, message.to, result, time.monotonic() - started)
+
+    @reports_retries
+    def _send_inline(self, subject: str, body: str, message: MailMessage, shared: list[dict]) -> MsgraphResponse | MsgraphError:
+        attachments = list(shared)
+        if message.attachments:
+            own = self._encode(message.attachments)
+            if isinstance(own, MsgraphError):
+                return own
+            attachments += own
+        content = self.graph._message(subject, body, message.to)
+        if attachments:
+            content["attachments"] = attachments
+        payload = json.dumps({"message": content}).encode()
+        return self.graph._execute(self.graph._send_prepared_email_call(self.token, payload))
+
+    def _shared_attachments(self) -> list[dict] | MsgraphError | None:
+        # Read and encoded by whichever worker gets here first. None if they're too big to inline.
+        with self._lock:
+            if not self._shared_read:
+                self._shared_read = True
+                sizes = self.graph._attachment_sizes(self.attachments)
+                if isinstance(sizes, MsgraphError):
+                    self._shared = sizes
+                elif sum(size for _, size in sizes) <= INLINE_ATTACHMENT_LIMIT:
+                    self._shared_size = sum(size for _, size in sizes)
+                    self._shared = self._encode(self.attachments)
+            return self._shared
+
+    def _encode(self, attachments: list[str]) -> list[dict] | MsgraphError:
+        try:
+            return [
+                {
+                    "@odata.type": "#microsoft.graph.fileAttachment",
+                    "name": os.path.basename(attachment),
+                    "contentBytes": _read_attachment_as_base64(attachment),
+                }
+                for attachment in attachments
+            ]
+        except OSError as e:
+            return MsgraphError(f"Failed to attach files: {e}", None, None)
@@ -1,7 +1,51 @@
 import base64
+import contextvars
+import hashlib
+import json
 import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator, Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
 
-import requests
+from msgraph.hash_index import ALGORITHMS, HashIndex
+from msgraph.hashes import QuickXorHash
+from msgraph.id_cache import IdCache
+from msgraph.instrumentation import Instrumentation
+from msgraph.items import DriveListing, parse_page
+from msgraph.retry import (
+    RateLimiter,
+    RetryPolicy,
+    current_operation,
+    record_retry,
+    reports_retries,
+)
+from msgraph.token_cache import TokenCache
+
+if TYPE_CHECKING:
+    from msgraph.batch import GraphBatch
+    from msgraph.delta import DeltaTracker
+    from msgraph.mail import BulkMailer
+    from msgraph.sync import DriveSync
+    from msgraph.transport import Transport
+
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+LOGIN_URL = "https://login.microsoftonline.com"
+
+# Files above this size go through an upload session instead of a single PUT.
+SIMPLE_UPLOAD_LIMIT = 4 * 1024 * 1024
+# Upload session chunks have to be multiples of 320 KiB. This is 10 MiB.
+UPLOAD_CHUNK_MULTIPLE = 320 * 1024
+UPLOAD_CHUNK_SIZE = 32 * UPLOAD_CHUNK_MULTIPLE
+# Graph takes mail requests up to about 4 MB. Attachments above this go through upload sessions, in chunks of this size.
+INLINE_ATTACHMENT_LIMIT = 3 * 1024 * 1024
+ATTACHMENT_CHUNK_SIZE = 10 * UPLOAD_CHUNK_MULTIPLE
+# Downloads are written to disk in chunks of this size, and split into ranges of this size when parallel.
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_RANGE_SIZE = 16 * 1024 * 1024
 
 # The following two classes are Error and Success objects respectively. Each will contain:
 # 
@@ -10,21 +54,149 @@ import requests
 # The request content in case of failure (raw text, be advised), or the requested data (e.g, the token)
 #
 # Each class has a to_dict method, an is_err method and an is_ok method for debugging and logging
+# Both also say how many times the request(s) behind them were retried, and how many seconds that took (retries, retry_time)
 # Though the classes guarantee that the Msgraph class itself doesn't halt, this assumes you've entered at least the correct number of arguments.
 # This is obvious, but also kind of a disclaimer, so you don't @ me if you get a raised exception for those reasons.
 # Any other types of bugs or halting behaviours, feel free to open up an issue.
+#
+# Results made from an HTTP response also keep its headers, how long it took (elapsed, in seconds) and its body, as the
+# bytes that came off the wire. Nothing gets decoded until asked for: .text decodes the body, .json() parses it, and
+# "data" or "response_content" that are just the body are worked out from it on first access. Results are immutable.
 
-class MsgraphError:
-    def __init__(self, message: str, status_code: int | None, response_content: str | None):
-        self.message = message
-        self.status_code = status_code # This can be empty. Sometimes this gets returned before an API call is made, upon which there's no HTTP status code.
-        self.response_content = response_content
-        self.is_ok = False
-        self.is_err = True
-    
-    def __str__(self):
+_UNSET = object()
+# Stand-ins for "data", for results whose data is the response body, as text or parsed.
+_BODY_TEXT = object()
+_BODY_JSON = object()
+
+
+def _elapsed(response: Any) -> float | None:
+    # requests sets elapsed when the headers arrive. httpx only once the response is closed, and raises before.
+    try:
+        return response.elapsed.total_seconds()
+    except (AttributeError, RuntimeError):
+        return None
+
+
+class _MsgraphResult(ABC):
+    __slots__ = ("_body", "_json", "_text", "elapsed", "headers", "message", "retries", "retry_time", "status_code")
+
+    message: str
+    status_code: int | None
+    headers: Mapping[str, str] | None
+    elapsed: float | None
+    retries: int
+    retry_time: float
+    _body: bytes | bytearray | memoryview | None
+    _text: str | None
+    _json: Any
+
+    def __init__(
+        self,
+        message: str,
+        status_code: int | None,
+        body: bytes | bytearray | memoryview | None,
+        headers: Mapping[str, str] | None,
+        elapsed: float | None,
+    ):
+        init = object.__setattr__
+        init(self, "message", message)
+        init(self, "status_code", status_code)
+        init(self, "headers", headers)
+        init(self, "elapsed", elapsed)
+        init(self, "retries", 0)
+        init(self, "retry_time", 0.0)
+        init(self, "_body", body)
+        init(self, "_text", None)
+        init(self, "_json", _UNSET)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{self.__class__.__name__} objects are immutable.")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{self.__class__.__name__} objects are immutable.")
+
+    def __str__(self) -> str:
         return str(self.as_dict())
-        
+
+    @abstractmethod
+    def as_dict(self) -> dict: ...
+
+    @property
+    def body(self) -> bytes | bytearray | memoryview | None:
+        """
+        The response body as received, or None for results that didn't come from a response.
+        """
+        return self._body
+
+    @property
+    def text(self) -> str:
+        """
+        The response body decoded as UTF-8 (Graph doesn't send anything else). Decoded once, on first access.
+        """
+        if self._text is None:
+            body = self._body
+            object.__setattr__(self, "_text", str(body, "utf-8", "replace") if body is not None else "")
+        return self._text  # type: ignore[return-value]
+
+    def json(self) -> Any:
+        """
+        The response body parsed as JSON. Parsed once, on first call. Raises ValueError if the body isn't JSON.
+        """
+        if self._json is _UNSET:
+            body = self._body
+            object.__setattr__(self, "_json", json.loads(body if isinstance(body, (bytes, bytearray)) else self.text))
+        return self._json
+
+    def _stamp(self, retries: int, retry_time: float) -> None:
+        # The one change a result goes through, by reports_retries, before it's handed out.
+        object.__setattr__(self, "retries", retries)
+        object.__setattr__(self, "retry_time", retry_time)
+
+    def _reduce(self, args: tuple) -> tuple:
+        # Immutable objects can't be unpickled attribute by attribute, so pickles (from a process pool, say) rebuild them.
+        body = bytes(self._body) if isinstance(self._body, memoryview) else self._body
+        options = {"body": body, "headers": self.headers, "elapsed": self.elapsed}
+        return _rebuild_result, (self.__class__, args, options, self.retries, self.retry_time)
+
+
+def _rebuild_result(cls: type, args: tuple, options: dict, retries: int, retry_time: float) -> _MsgraphResult:
+    result = cls(*args, **options)
+    result._stamp(retries, retry_time)
+    return result
+
+
+class MsgraphError(_MsgraphResult):
+    __slots__ = ("_content",)
+
+    is_ok = False
+    is_err = True
+    _content: str | None
+
+    def __init__(
+        self,
+        message: str,
+        status_code: int | None,
+        response_content: str | None = None,
+        *,
+        body: bytes | bytearray | memoryview | None = None,
+        headers: Mapping[str, str] | None = None,
+        elapsed: float | None = None,
+    ):
+        # status_code can be empty. Sometimes this gets returned before an API call is made, upon which there's no HTTP status code.
+        super().__init__(message, status_code, body, headers, elapsed)
+        object.__setattr__(self, "_content", response_content)
+
+    @classmethod
+    def from_response(cls, message: str, response: Any) -> "MsgraphError":
+        # response_content is the body, decoded when someone looks at it.
+        return cls(message, response.status_code, body=response.content, headers=response.headers, elapsed=_elapsed(response))
+
+    @property
+    def response_content(self) -> str | None:
+        if self._content is None and self._body is not None:
+            return self.text
+        return self._content
+
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.message!r}, {self.status_code!r}, {self.response_content!r})"
     
@@ -37,17 +209,43 @@ class MsgraphError:
     
     def unwrap(self):
         return self.response_content
+
+    def __reduce__(self) -> tuple:
+        return self._reduce((self.message, self.status_code, self._content))
     
-class MsgraphResponse:
-    def __init__(self, message: str, status_code: int, data: str):
-        self.message = message
-        self.status_code = status_code
-        self.data = data
-        self.is_ok = True
-        self.is_err = False
-    
-    def __str__(self) -> str:
-        return str(self.as_dict())
+class MsgraphResponse(_MsgraphResult):
+    __slots__ = ("_data",)
+
+    is_ok = True
+    is_err = False
+    status_code: int
+    _data: Any
+
+    def __init__(
+        self,
+        message: str,
+        status_code: int,
+        data: Any,
+        *,
+        body: bytes | bytearray | memoryview | None = None,
+        headers: Mapping[str, str] | None = None,
+        elapsed: float | None = None,
+    ):
+        super().__init__(message, status_code, body, headers, elapsed)
+        object.__setattr__(self, "_data", data)
+
+    @classmethod
+    def from_response(cls, message: str, response: Any, data: Any = _BODY_TEXT) -> "MsgraphResponse":
+        # By default the data is the body as text, decoded when someone looks at it. _BODY_JSON makes it the parsed body.
+        return cls(message, response.status_code, data, body=response.content, headers=response.headers, elapsed=_elapsed(response))
+
+    @property
+    def data(self) -> Any:
+        if self._data is _BODY_TEXT:
+            return self.text
+        if self._data is _BODY_JSON:
+            return self.json()
+        return self._data
     
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.message!r}, {self.status_code!r}, {self.data!r})"
@@ -62,6 +260,100 @@ class MsgraphResponse:
     def unwrap(self):
         return self.data
 
+    def __reduce__(self) -> tuple:
+        return self._reduce((self.message, self.status_code, self.data))
+
+
+# Builds the pooled, keep-alive session every Msgraph method goes through.
+# Pass the result to several Msgraph instances if you want them to share connections.
+# The transports are only imported here, when the first session is built. requests is most of what importing this
+# module would otherwise cost, and a process that never sends anything doesn't need http.client either.
+
+TRANSPORTS = ("requests", "http.client")
+
+
+def build_session(
+    pool_connections: int = 10,
+    pool_maxsize: int = 10,
+    pool_block: bool = False,
+    keep_alive: bool = True,
+    transport: str = "requests",
+) -> "Transport":
+    """
+    Builds a connection-pooled session: a requests.Session, or an msgraph.transport.HttpClientTransport.
+
+    Requires:
+
+    OPTIONAL: Number of hosts to keep connection pools for.
+
+    OPTIONAL: Maximum number of connections kept alive per host.
+
+    OPTIONAL: Whether to block instead of opening extra connections once a host's pool is exhausted.
+
+    OPTIONAL: Whether to keep connections alive between requests. Disabling this is mostly useful for benchmarks.
+
+    OPTIONAL: "requests" (the default), or "http.client" for the standard library one, which imports much faster.
+    pool_connections and pool_block only apply to requests.
+
+    Returns:
+
+    A requests.Session or HttpClientTransport object. Raises ValueError for other transports.
+    """
+    if transport == "http.client":
+        from msgraph.transport import HttpClientTransport
+
+        return HttpClientTransport(pool_maxsize, keep_alive)
+    if transport != "requests":
+        raise ValueError(f"Unknown transport {transport!r}. Use one of: {', '.join(TRANSPORTS)}.")
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+# Helpers to keep track of upload sessions between runs, for resuming, and to clean up after transfers.
+
+def _write_upload_state(path: str, state: dict) -> None:
+    try:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+    except OSError:
+        pass  # Not being able to resume later is no reason to fail the upload now.
+
+def _remove_quietly(path: str) -> None:
+    # For resume files and partial downloads. If it's already gone, good.
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _ranges(size: int, range_size: int) -> list[tuple[int, int]]:
+    return [(start, min(start + range_size, size) - 1) for start in range(0, size, range_size)]
+
+def _preallocate(path: str, size: int) -> MsgraphError | None:
+    try:
+        with open(path, "wb") as file:
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(file.fileno(), 0, size)
+            else:
+                file.truncate(size)
+    except OSError as e:
+        return MsgraphError(f"Failed to allocate {size} bytes for the download: {e}", None, None)
+    return None
+
+def _finish_download(target: str, status_code: int) -> MsgraphResponse | MsgraphError:
+    try:
+        os.replace(f"{target}.part", target)
+    except OSError as e:
+        return MsgraphError(f"Failed to move the download into place: {e}", None, None)
+    return MsgraphResponse("Successfully downloaded file.", status_code, target)
+
 
 # Helper function to handle attachments in the email method.
 
@@ -69,33 +361,151 @@ def _read_attachment_as_base64(path: str) -> str:
     with open(path, 'rb') as f:
         return base64.b64encode(f.read()).decode('utf-8')
 
-# This is the main class. All methods are callable.
-# This receives a dictionary of cradentials as well as the desired Sharepoint audience/domain.
-# Do make sure your refresh token is up to date.
 
-class Msgraph:
-    def __init__(self, credentials: dict):
+def _read_chunk(path: str, offset: int, size: int) -> bytes:
+    with open(path, "rb") as file:
+        file.seek(offset)
+        return file.read(size)
+
+
+def _next_expected_ranges(response) -> list[str] | None:
+    try:
+        payload = response.json()
+    except ValueError:
+        return None  # Empty body, the upload is complete.
+    return payload.get("nextExpectedRanges") if isinstance(payload, dict) else None
+
+
+def _is_ok(response) -> bool:
+    # Same rule as requests' Response.ok, spelled out so httpx responses (which don't have .ok) follow it too.
+    return response.status_code < 400
+
+
+def _upload_entry(entry: tuple[str, ...] | str) -> tuple[str, str, str]:
+    # upload_many's entries, padded out to (filepath, destination, mimetype).
+    if isinstance(entry, str):
+        return entry, "", ""
+    filepath, destination, mimetype = (*entry, "", "")[:3]
+    return filepath, destination, mimetype
+
+
+def _resume_file(resume_dir: str, driveid: str, filepath: str, destination: str) -> str:
+    # upload_many's resume file for one upload. The same file going to the same place gets the same one next run.
+    name = hashlib.sha256(f"{driveid}|{os.path.abspath(filepath)}|{destination}".encode()).hexdigest()[:32]
+    return os.path.join(resume_dir, f"{name}.upload")
+
+
+def _folder_chain(destination: str) -> list[str]:
+    # "a/b/c/" -> ["a", "a/b", "a/b/c"]. The root needs no creating.
+    parts = [part for part in destination.strip("/").split("/") if part]
+    return ["/".join(parts[:depth]) for depth in range(1, len(parts) + 1)]
+
+
+def _split_folder(folder: str) -> tuple[str, str]:
+    parent, _, name = folder.rpartition("/")
+    return parent, name
+
+
+# A GraphCall describes one HTTP request without sending it: method, URL, headers and body,
+# plus the function that turns the response into a MsgraphResponse or MsgraphError.
+# The sync and async clients build the exact same calls and only differ in how they send them,
+# so URLs and response handling can't drift apart between the two.
+
+class GraphCall:
+    __slots__ = ("content", "data", "headers", "json", "method", "params", "parse", "url")
+
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        parse: Callable[[Any], "MsgraphResponse | MsgraphError"],
+        headers: dict | None = None,
+        params: dict | None = None,
+        json: Any = None,
+        data: dict | None = None,
+        content: bytes | None = None,
+    ):
+        self.method = method
+        self.url = url
+        self.parse = parse
+        self.headers = headers or {}
+        self.params = params
+        self.json = json
+        self.data = data
+        self.content = content
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.method!r}, {self.url!r})"
+
+
+# Everything the sync and async clients have in common: credentials, URLs, the token cache and the call builders.
+# The builders are the one place where requests get shaped and responses get read.
+
+class _MsgraphBase:
+    def __init__(
+        self,
+        credentials: dict,
+        timeout: float | tuple[float, float] | None,
+        graph_url: str,
+        login_url: str,
+        token_cache: TokenCache | None,
+        token_cache_path: str | None,
+        retry_policy: RetryPolicy | None,
+        retry_policies: dict[str, RetryPolicy] | None,
+        rate_limiter: RateLimiter | None,
+        id_cache: IdCache | None,
+        id_cache_path: str | None,
+        instrumentation: Instrumentation | None = None,
+        hash_index: HashIndex | None = None,
+        hash_index_path: str | None = None,
+    ):
         self.tenantid = credentials['tenantid']
         self.clientid = credentials['clientid']
         self.clientsecret = credentials['clientsecret']
         self.audience = credentials['audience']
         self.refresh_token = credentials['refresh_token']
+        self.timeout = timeout
+        self.graph_url = graph_url.rstrip("/")
+        self.login_url = login_url.rstrip("/")
+        # Tokens are cached per scope. Pass token_cache_path to share them with other processes through a file.
+        self.token_cache = token_cache if token_cache is not None else TokenCache(token_cache_path)
+        # Cache entries belong to this credential set: the client, and the user whose refresh token we were given.
+        # Keyed by a hash of the original token, so it stays the same after rotations and never lands in the file.
+        self._credential_id = hashlib.sha256(f"{self.clientid}|{self.refresh_token}".encode()).hexdigest()[:16]
+        # A refresh token rotated by an earlier run beats the one we were given.
+        self.refresh_token = self.token_cache.get_refresh_token(self._token_cache_key("refresh_token")) or self.refresh_token
+        # Throttled and failed requests are retried per retry_policy, or per retry_policies[method name] where given.
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.retry_policies = retry_policies or {}
+        # Optional client-side throttle. Share one RateLimiter between clients to throttle them together.
+        self.rate_limiter = rate_limiter
+        # Site and drive ids are cached. Pass id_cache_path to share them with other processes through a SQLite file.
+        self._owns_id_cache = id_cache is None
+        self.id_cache = id_cache if id_cache is not None else IdCache(path=id_cache_path)
+        # Off unless given. See msgraph.instrumentation.
+        self.instrumentation = instrumentation
+        # Hashes of local files, for skip_unchanged uploads and syncs. Pass hash_index_path to keep them between runs.
+        self._owns_hash_index = hash_index is None
+        self.hash_index = hash_index if hash_index is not None else HashIndex(hash_index_path)
 
-    def get_access_token(self, mode: str) -> MsgraphResponse | MsgraphError:
-        """
-        Gets the access token. The "mode" parameter changes the audience scope between the user-specified audience, Outlook and the Graph API. 
-
-        Requires:
+    # ---------------------------------------------------------------------------------
+    # Retries
 
-        Running mode. "audience" for user-specified audience, "graph" for Graph API, "outlook" for, well, Outlook.
+    def _retry_policy(self) -> RetryPolicy:
+        return self.retry_policies.get(current_operation(), self.retry_policy)
 
-        Returns:
+    def _rate_limit_key(self, url: str) -> str:
+        # Graph throttles per tenant and per service, so that's what requests queue up by.
+        return f"{self.tenantid}|{urlsplit(url).netloc}"
 
-        On success: MsgraphResponse object
+    # ---------------------------------------------------------------------------------
+    # Tokens
 
-        On fail: MsgraphError object
-        """
+    def _token_cache_key(self, name: str) -> str:
+        # "name" is the scope for access tokens (it includes the audience), or "refresh_token".
+        return f"{self.tenantid}|{self.clientid}|{self._credential_id}|{name}"
 
+    def _token_scope(self, mode: str) -> str | MsgraphError:
         match mode:
             case "audience":
                 scope = f"https://{self.audience}/.default"
@@ -118,100 +528,181 @@ class Msgraph:
         if not self.tenantid or self.tenantid == "":
             message = "Tenant ID missing or invalid. Declare this class with a valid tenant ID."
             return MsgraphError(message, None, None)
-        
+        return scope
+
+    def _cached_token(self, key: str, force_refresh: bool) -> MsgraphResponse | None:
+        if force_refresh:
+            return None
+        token = self.token_cache.get(key)
+        return MsgraphResponse("Token retrieved from cache", 200, token) if token else None
+
+    def _token_call(self, key: str, scope: str) -> GraphCall:
+        refresh_key = self._token_cache_key("refresh_token")
+        refresh_token = self.token_cache.get_refresh_token(refresh_key) or self.refresh_token
+
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
         
         data = {
             "client_id": self.clientid,
             "scope": scope,
-            "refresh_token": self.refresh_token,
+            "refresh_token": refresh_token,
             "grant_type": "refresh_token",
             "client_secret": self.clientsecret
         }
-        
-        response = requests.post(
-            url=f'https://login.microsoftonline.com/{self.tenantid}/oauth2/v2.0/token',
-            headers=headers,
-            data=data
-        )
 
-        if response.ok:
-            return MsgraphResponse("Token retrieved successfully", response.status_code, response.json()["access_token"])
-        else:
-            return MsgraphError("Failed to fetch access_token.", response.status_code, response.text)
-            
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if not _is_ok(response):
+                return MsgraphError.from_response("Failed to fetch access_token.", response)
+            payload = response.json()
+            self.token_cache.set(key, payload["access_token"], float(payload.get("expires_in", 3599)))
+            # The endpoint rotates refresh tokens. Keep the new one, the old one may stop working.
+            if payload.get("refresh_token"):
+                self.refresh_token = payload["refresh_token"]
+                self.token_cache.set_refresh_token(refresh_key, payload["refresh_token"])
+            # No body on this one: it holds the refresh token, which isn't the caller's to keep.
+            return MsgraphResponse("Token retrieved successfully", response.status_code, payload["access_token"], headers=response.headers, elapsed=_elapsed(response))
 
-    def get_siteid(self, token: str, site: str) -> MsgraphResponse | MsgraphError:
-        """
-        Gets the id of the target site within your audience.
-        
-        Requires:
+        return GraphCall("POST", f'{self.login_url}/{self.tenantid}/oauth2/v2.0/token', parse, headers=headers, data=data)
 
-        Access token with the Graph API scope.
+    # ---------------------------------------------------------------------------------
+    # Sites and drives
 
-        Target site name
+    def _siteid_key(self, site: str) -> str:
+        return f"site|{self.audience}|{site}"
 
-        Returns:
+    def _driveid_key(self, siteid: str) -> str:
+        return f"drive|{siteid}"
 
-        On success: MsgraphResponse object
+    def _cached_id(self, key: str) -> MsgraphResponse | MsgraphError | None:
+        entry = self.id_cache.get(key)
+        if entry is None:
+            return None
+        if entry.ok:
+            return MsgraphResponse(entry.message, entry.status_code or 200, entry.value)
+        return MsgraphError(entry.message, entry.status_code, entry.content)
 
-        On fail: MsgraphError object
-        """
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f'https://graph.microsoft.com/v1.0/sites/{self.audience}:/sites/{site}', headers=headers)
-        
-        if response.ok:
-            return MsgraphResponse("Successfully retrieved site id.", response.status_code, response.json().get("id"))
-        else:
-            return MsgraphError(f"Failed to fetch siteid for {self.audience}/sites/{site}", response.status_code, response.text)
+    def _remember_id(self, key: str, result: MsgraphResponse | MsgraphError) -> None:
+        # Ids are kept for long. "Not found" is kept for a little while. Anything else may be temporary, so it isn't.
+        if isinstance(result, MsgraphResponse):
+            if result.data:
+                self.id_cache.set(key, result.data, result.message, result.status_code)
+        elif result.status_code == 404:
+            self.id_cache.set_failure(key, result.message, result.status_code, result.response_content)
 
-    def get_driveid(self, token: str, siteid: str) -> MsgraphResponse | MsgraphError:
+    def invalidate_ids(self, site: str | None = None, siteid: str | None = None) -> None:
         """
-        Gets the id of the target site id's root drive.
+        Forgets cached site and drive ids, so the next lookup asks Graph again.
 
         Requires:
 
-        Access token with the Graph API scope.
+        OPTIONAL: Site name whose site id to forget.
 
-        Target site's id.
+        OPTIONAL: Site id whose drive id to forget.
 
-        Returns:
+        With neither, the whole id cache is cleared.
+        """
+        keys = []
+        if site is not None:
+            keys.append(self._siteid_key(site))
+        if siteid is not None:
+            keys.append(self._driveid_key(siteid))
+        if keys:
+            self.id_cache.invalidate(*keys)
+        else:
+            self.id_cache.invalidate()
 
-        On success: MsgraphResponse object.
+    def _siteid_call(self, token: str, site: str) -> GraphCall:
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Successfully retrieved site id.", response, response.json().get("id"))
+            else:
+                return MsgraphError.from_response(f"Failed to fetch siteid for {self.audience}/sites/{site}", response)
 
-        On fail: MsgraphError object.
-        """
         headers = {"Authorization": f"Bearer {token}"}
-        
-        response = requests.get(f"https://graph.microsoft.com/v1.0/sites/{siteid}/drives", headers=headers)
-        
-        if response.ok:
-            return MsgraphResponse("Successfully retrieved site id.", response.status_code, response.json().get("value")[0]['id'])
+        return GraphCall("GET", f'{self.graph_url}/sites/{self.audience}:/sites/{site}', parse, headers=headers)
+
+    def _driveid_call(self, token: str, siteid: str) -> GraphCall:
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Successfully retrieved site id.", response, response.json().get("value")[0]['id'])
+            else:
+                return MsgraphError.from_response(f"Failed to fetch driver id for site id '{siteid}'.", response)
+
+        headers = {"Authorization": f"Bearer {token}"}
+        return GraphCall("GET", f"{self.graph_url}/sites/{siteid}/drives", parse, headers=headers)
+
+    def _list_files_call(self, token: str, siteid: str, driveid: str, path: str, select: list[str] | None = None, top: int | None = None) -> GraphCall:
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Successfully retrieved files.", response, _BODY_JSON)
+            else:
+                return MsgraphError.from_response("Failed to retrieve files.", response)
+
+        headers = {"Authorization": f"Bearer {token}"}
+        if path:
+            url = f"{self.graph_url}/sites/{siteid}/drives/{driveid}/root:/{path}/children"
         else:
-            return MsgraphError(f"Failed to fetch driver id for site id '{siteid}'.", response.status_code, response.text)
+            url = f"{self.graph_url}/sites/{siteid}/drives/{driveid}/root/children"
+        params = {}
+        if select:
+            params["$select"] = ",".join(select)
+        if top:
+            params["$top"] = str(top)
+        return GraphCall("GET", url, parse, headers=headers, params=params or None)
 
-    def upload_to_drive(self, token, driveid, filepath, destination = "", mimetype = "") -> MsgraphResponse | MsgraphError:
-        """
-        Uploads a file to Sharepoint.
+    def _next_page_call(self, token: str, next_link: str) -> GraphCall:
+        # Follows an @odata.nextLink. The link already carries the query ($select, $top, skip token), so no params.
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Successfully retrieved files.", response, _BODY_JSON)
+            else:
+                return MsgraphError.from_response("Failed to retrieve the next page of files.", response)
 
-        Requires:
+        return GraphCall("GET", next_link, parse, headers={"Authorization": f"Bearer {token}"})
 
-        Access token with the Graph API scope.
+    def _item_page_call(self, call: GraphCall, keep_raw: bool) -> GraphCall:
+        # The same request as a listing or next page call, read into DriveItems instead of dicts. Data is (items, next link).
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if not _is_ok(response):
+                return call.parse(response)
+            try:
+                return MsgraphResponse.from_response("Successfully retrieved files.", response, parse_page(response.text, keep_raw))
+            except ValueError:
+                return MsgraphError.from_response("Unexpected listing response.", response)
 
-        Target site's drive id.
+        return GraphCall(call.method, call.url, parse, headers=call.headers, params=call.params)
 
-        Path of the target file in your machine.
+    def _delta_call(self, token: str, siteid: str, driveid: str, select: list[str] | None = None, latest: bool = False) -> GraphCall:
+        # First page of a drive's delta feed. With "latest", no items, just a delta link to start tracking from now.
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Successfully retrieved changes.", response, _BODY_JSON)
+            else:
+                return MsgraphError.from_response("Failed to retrieve changes.", response)
 
-        OPTIONAL: Destination folder path within Sharepoint. If not provided, the file will go into the root folder.
+        params = {}
+        if select:
+            params["$select"] = ",".join(select)
+        if latest:
+            params["token"] = "latest"
+        return GraphCall(
+            "GET",
+            f"{self.graph_url}/sites/{siteid}/drives/{driveid}/root/delta",
+            parse,
+            headers={"Authorization": f"Bearer {token}"},
+            params=params or None,
+        )
 
-        OPTIONAL: Mime-type of the file. Microsoft can handle it in some cases, but other file formats may need their mime-types specified.
+    # ---------------------------------------------------------------------------------
+    # Uploads
 
-        Returns: 
+    def _upload_call(self, token: str, driveid: str, filepath: str, destination: str, mimetype: str, content: bytes) -> GraphCall:
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("File uploaded successfully", response)
+            else:
+                return MsgraphError.from_response("Failed to upload file.", response)
 
-        On success: MsgraphResponse object.
-        
-        On fail: MsgraphError object.
-        """
         if mimetype:
             headers = {
                 "Authorization": f"Bearer {token}",
@@ -224,48 +715,131 @@ class Msgraph:
         
         filename = os.path.basename(filepath)
         
-        url = f"https://graph.microsoft.com/v1.0/drives/{driveid}/root:/{destination}{filename}:/content"
-        
-        with open(filepath, "rb") as file:
-            content = file.read()
-        
-        response = requests.put(url, headers=headers, data=content)
+        url = f"{self.graph_url}/drives/{driveid}/root:/{destination}{filename}:/content"
+        return GraphCall("PUT", url, parse, headers=headers, content=content)
 
-        if response.ok:
-            return MsgraphResponse("File uploaded successfully", response.status_code, response.text)
-        else:
-            return MsgraphError("Failed to upload file.", response.status_code, response.text)
-    
-    def send_email(self, token: str, subject: str, body: str, target_emails: list[str], attachments: list[str] | None = None) -> MsgraphResponse | MsgraphError:
-        """
-        Sends an email to the target user(s), with attachments if specified.
-        If attachments are needed to be specified, they must be represented as a list of absolute paths to the files.
-        
-        Requires:
-        
-        Access token with the Outlook scope.
+    def _create_folder_call(self, token: str, driveid: str, parent: str, name: str) -> GraphCall:
+        # A folder that's already there comes back 409, which for our purposes is just as good.
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Folder created.", response)
+            elif response.status_code == 409:
+                return MsgraphResponse.from_response("Folder already exists.", response)
+            else:
+                return MsgraphError.from_response(f"Failed to create folder {name}.", response)
 
-        Subject of the email.
+        url = f"{self.graph_url}/drives/{driveid}/root:/{parent}:/children" if parent else f"{self.graph_url}/drives/{driveid}/root/children"
+        return GraphCall(
+            "POST",
+            url,
+            parse,
+            headers={"Authorization": f"Bearer {token}"},
+            json={"name": name, "folder": {}, "@microsoft.graph.conflictBehavior": "fail"},
+        )
 
-        Body of the email.
+    def _remote_item_call(self, token: str, driveid: str, filepath: str, destination: str) -> GraphCall:
+        # The item an upload of filepath to destination would replace. Only what's needed to tell if it's the same file.
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Successfully retrieved file metadata.", response, _BODY_JSON)
+            else:
+                return MsgraphError.from_response("Failed to retrieve file metadata.", response)
 
-        List of recipients.
+        url = f"{self.graph_url}/drives/{driveid}/root:/{destination}{os.path.basename(filepath)}"
+        return GraphCall("GET", url, parse, headers={"Authorization": f"Bearer {token}"}, params={"$select": "id,size,file"})
 
-        Returns:
-        
-        On success: MsgraphResponse object.
+    def _is_unchanged(self, remote: MsgraphResponse, filepath: str, size: int) -> bool:
+        # Same size, and the same hash by whichever algorithm the drive reports. No hash means we can't tell, so upload.
+        item = remote.data
+        if not isinstance(item, dict) or item.get("size") != size:
+            return False
+        hashes = (item.get("file") or {}).get("hashes") or {}
+        for algorithm in ALGORITHMS:
+            expected = hashes.get(algorithm)
+            if expected:
+                try:
+                    digest = self.hash_index.digest(filepath, algorithm)
+                except OSError:
+                    return False
+                # sha1Hash is hex, and not always upper case. quickXorHash is base64, where case matters.
+                return digest == (expected.upper() if algorithm == "sha1Hash" else expected)
+        return False
 
-        On fail: MsgraphError object.
-        """
-        
-        url = "https://graph.microsoft.com/v1.0/me/sendMail"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json",
-        }
+    def _unchanged_result(self, remote: MsgraphResponse) -> MsgraphResponse:
+        # Looks like an upload's result: the data is the item's JSON text.
+        return MsgraphResponse("File unchanged, upload skipped.", remote.status_code, _BODY_TEXT, body=remote.body, headers=remote.headers, elapsed=remote.elapsed)
+
+    def _create_upload_session_call(self, token: str, driveid: str, filepath: str, destination: str) -> GraphCall:
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Upload session created.", response, response.json()["uploadUrl"])
+            else:
+                return MsgraphError.from_response("Failed to create upload session.", response)
+
+        filename = os.path.basename(filepath)
+        return GraphCall(
+            "POST",
+            f"{self.graph_url}/drives/{driveid}/root:/{destination}{filename}:/createUploadSession",
+            parse,
+            headers={"Authorization": f"Bearer {token}"},
+            json={"item": {"@microsoft.graph.conflictBehavior": "replace"}},
+        )
+
+    def _upload_status_call(self, upload_url: str) -> GraphCall:
+        # Asks a session which byte it expects next. The data of the result is that offset.
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if not _is_ok(response):
+                return MsgraphError.from_response("Upload session not found.", response)
+            ranges = response.json().get("nextExpectedRanges") or ["0-"]
+            return MsgraphResponse.from_response("Upload session found.", response, int(ranges[0].split("-")[0]))
+
+        return GraphCall("GET", upload_url, parse)
+
+    def _upload_chunk_call(self, upload_url: str, offset: int, chunk: bytes, size: int) -> GraphCall:
+        # One chunk of an upload session. A 202 result means "keep going", and its data is the next offset.
+        # The upload URL is pre-authenticated, sending the bearer token along makes Graph reject the request.
+        end = offset + len(chunk) - 1
+
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            # Drive sessions answer 202 until the last chunk. Mail attachment sessions answer 200 with the next range.
+            ranges = _next_expected_ranges(response) if response.status_code in (200, 202) else None
+            if response.status_code == 202 or ranges:
+                ranges = ranges or [f"{end + 1}-"]
+                return MsgraphResponse("Chunk accepted.", 202, int(ranges[0].split("-")[0]))
+            if response.status_code in (200, 201):
+                return MsgraphResponse.from_response("File uploaded successfully", response)
+            if response.status_code == 404:
+                return MsgraphError.from_response("Upload session expired or was cancelled.", response)
+            return MsgraphError.from_response(f"Failed to upload bytes {offset}-{end}.", response)
+
+        headers = {"Content-Length": str(len(chunk)), "Content-Range": f"bytes {offset}-{end}/{size}"}
+        return GraphCall("PUT", upload_url, parse, headers=headers, content=chunk)
+
+    def _upload_fingerprint(self, driveid: str, filepath: str, destination: str) -> dict | MsgraphError:
+        # What a resume file has to match to be reused: same file, unchanged, going to the same place.
+        try:
+            stat = os.stat(filepath)
+        except OSError as e:
+            return MsgraphError(f"Failed to read file: {e}", None, None)
+        return {"filepath": os.path.abspath(filepath), "size": stat.st_size, "mtime": stat.st_mtime, "driveid": driveid, "destination": destination}
 
-        req_body = {
-            "message": {
+    def _recorded_upload_url(self, resume_path: str | None, fingerprint: dict) -> str | None:
+        if not resume_path:
+            return None
+        try:
+            with open(resume_path, encoding="utf-8") as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if {key: state.get(key) for key in fingerprint} != fingerprint:
+            return None  # Different file, or the file changed since. The old session is useless.
+        return state.get("upload_url")
+
+    # ---------------------------------------------------------------------------------
+    # Mail
+
+    def _message(self, subject: str, body: str, target_emails: list[str]) -> dict:
+        return {
             "subject": subject,
             "body": {
                 "content": body
@@ -279,7 +853,21 @@ class Msgraph:
                 for email in target_emails
             ]
         }
+
+    def _send_email_call(self, token: str, subject: str, body: str, target_emails: list[str], attachments: list[str] | None) -> GraphCall | MsgraphError:
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Email sent successfully", response)
+            else:
+                return MsgraphError.from_response("Failed to send email.", response)
+
+        url = f"{self.graph_url}/me/sendMail"
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
         }
+
+        req_body = {"message": self._message(subject, body, target_emails)}
         
         
         if attachments:
@@ -295,76 +883,1116 @@ class Msgraph:
             except Exception as e: # noqa: BLE001 : This needs to be here to make absolutely sure this doesn't Raise and stop. 
                 return MsgraphError(f"Failed to attach files: {e}", None, None) 
 
-        response = requests.post(url, headers=headers, json=req_body)
+        return GraphCall("POST", url, parse, headers=headers, json=req_body)
 
-        if response.ok:
-            return MsgraphResponse("Email sent successfully", response.status_code, response.text)
-        else:
-            return MsgraphError("Failed to send email.", response.status_code, response.text)
-        
-    def list_files_sharepoint(self, token: str, siteid: str, driveid: str, path: str = "") -> MsgraphResponse | MsgraphError:
-        """
-        Lists all files in a chosen Sharepoint folder.
-        
-        Requires:
-        
-        Access token with the Graph API scope.
-        
-        Target site's id.
-        
-        Target site's drive id.
-        
-        Returns:
-        
-        On success: MsgraphResponse object.
-        
-        On fail: MsgraphError object.
-        """
-        
-        headers = {"Authorization": f"Bearer {token}"}
-        
-        if path:
-            response = requests.get(f"https://graph.microsoft.com/v1.0/sites/{siteid}/drives/{driveid}/root:/{path}/children", headers=headers)
-        else:
-            response = requests.get(f"https://graph.microsoft.com/v1.0/sites/{siteid}/drives/{driveid}/root/children", headers=headers)
+    def _send_prepared_email_call(self, token: str, payload: bytes) -> GraphCall:
+        # Same as _send_email_call, with the JSON body already built. Bulk sends reuse attachments they encoded once.
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Email sent successfully", response)
+            else:
+                return MsgraphError.from_response("Failed to send email.", response)
 
-        if response.ok:
-            return MsgraphResponse("Successfully retrieved files.", response.status_code, response.json())
-        else:
-            return MsgraphError("Failed to retrieve files.", response.status_code, response.text)
-        
-    def download_file_sharepoint(self, token: str, siteid: str, driveid: str, path: str, filename: str, localpath: str) -> MsgraphResponse | MsgraphError:
-        """
-        Downloads a file from Sharepoint.
-        
-        Requires:
-        
-        Access token with the Graph API scope.
-        
-        Target site's id.
-        
-        Target site's drive id.
-        
-        Path to the file in Sharepoint. (It has to end with "/")
-        
-        Name of the file to be downloaded.
-        
-        Local path to save the file.
-        
-        Returns:
-        
-        On success: MsgraphResponse object.
-        
-        On fail: MsgraphError object.
-        """
-        
-        headers = {"Authorization": f"Bearer {token}"}
-        
-        response = requests.get(f"https://graph.microsoft.com/v1.0/sites/{siteid}/drives/{driveid}/root:/{path}{filename}:/content", headers=headers)
+        return GraphCall(
+            "POST",
+            f"{self.graph_url}/me/sendMail",
+            parse,
+            headers={"Authorization": f"Bearer {token}", "Accept": "application/json", "Content-Type": "application/json"},
+            content=payload,
+        )
 
-        if response.ok:
-            with open(os.path.join(localpath, filename), "wb") as file:
-                file.write(response.content)
-            return MsgraphResponse("Successfully downloaded file.", response.status_code, os.path.join(localpath, filename))
-        else:
-            return MsgraphError("Failed to download file.", response.status_code, response.text)
+    def _attachment_sizes(self, attachments: list[str]) -> list[tuple[str, int]] | MsgraphError:
+        try:
+            return [(attachment, os.path.getsize(attachment)) for attachment in attachments]
+        except OSError as e:
+            return MsgraphError(f"Failed to attach files: {e}", None, None)
+
+    def _too_big_to_inline(self, attachments: list[str] | None, inline_limit: int) -> bool:
+        # Unreadable files count as small, so send_email reports them the way it always has.
+        sizes = self._attachment_sizes(attachments or [])
+        return not isinstance(sizes, MsgraphError) and sum(size for _, size in sizes) > inline_limit
+
+    def _create_draft_call(self, token: str, subject: str, body: str, target_emails: list[str]) -> GraphCall:
+        # Large attachments can't go in one request, so the message is built up as a draft and sent at the end.
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Draft created.", response, response.json()["id"])
+            else:
+                return MsgraphError.from_response("Failed to create draft message.", response)
+
+        return GraphCall(
+            "POST",
+            f"{self.graph_url}/me/messages",
+            parse,
+            headers={"Authorization": f"Bearer {token}", "Accept": "application/json"},
+            json=self._message(subject, body, target_emails),
+        )
+
+    def _add_attachment_call(self, token: str, message_id: str, path: str) -> GraphCall | MsgraphError:
+        # One small attachment, base64 in the request body.
+        name = os.path.basename(path)
+
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Attachment added.", response)
+            else:
+                return MsgraphError.from_response(f"Failed to attach {name}.", response)
+
+        try:
+            content = _read_attachment_as_base64(path)
+        except OSError as e:
+            return MsgraphError(f"Failed to attach files: {e}", None, None)
+        return GraphCall(
+            "POST",
+            f"{self.graph_url}/me/messages/{message_id}/attachments",
+            parse,
+            headers={"Authorization": f"Bearer {token}"},
+            json={"@odata.type": "#microsoft.graph.fileAttachment", "name": name, "contentBytes": content},
+        )
+
+    def _create_attachment_session_call(self, token: str, message_id: str, path: str, size: int) -> GraphCall:
+        # The chunks then go to the upload URL as raw bytes, through the same code as drive uploads.
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Upload session created.", response, response.json()["uploadUrl"])
+            else:
+                return MsgraphError.from_response("Failed to create attachment upload session.", response)
+
+        return GraphCall(
+            "POST",
+            f"{self.graph_url}/me/messages/{message_id}/attachments/createUploadSession",
+            parse,
+            headers={"Authorization": f"Bearer {token}"},
+            json={"AttachmentItem": {"attachmentType": "file", "name": os.path.basename(path), "size": size}},
+        )
+
+    def _send_draft_call(self, token: str, message_id: str) -> GraphCall:
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Email sent successfully", response)
+            else:
+                return MsgraphError.from_response("Failed to send email.", response)
+
+        return GraphCall("POST", f"{self.graph_url}/me/messages/{message_id}/send", parse, headers={"Authorization": f"Bearer {token}"})
+
+    def _delete_draft_call(self, token: str, message_id: str) -> GraphCall:
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Draft deleted.", response, None)
+            else:
+                return MsgraphError.from_response("Failed to delete draft.", response)
+
+        return GraphCall("DELETE", f"{self.graph_url}/me/messages/{message_id}", parse, headers={"Authorization": f"Bearer {token}"})
+
+    # ---------------------------------------------------------------------------------
+    # Downloads
+
+    def _download_content_url(self, siteid: str, driveid: str, path: str, filename: str) -> str:
+        return f"{self.graph_url}/sites/{siteid}/drives/{driveid}/root:/{path}{filename}:/content"
+
+    def _download_item_call(self, token: str, siteid: str, driveid: str, path: str, filename: str) -> GraphCall:
+        # The item's size, hashes and pre-authenticated download URL, for ranged downloads.
+        def parse(response) -> MsgraphResponse | MsgraphError:
+            if _is_ok(response):
+                return MsgraphResponse.from_response("Successfully retrieved file metadata.", response, _BODY_JSON)
+            else:
+                return MsgraphError.from_response("Failed to download file.", response)
+
+        return GraphCall(
+            "GET",
+            f"{self.graph_url}/sites/{siteid}/drives/{driveid}/root:/{path}{filename}",
+            parse,
+            headers={"Authorization": f"Bearer {token}"},
+            params={"$select": "id,size,file,@microsoft.graph.downloadUrl"},
+        )
+
+    def _check_download(self, item: dict, part: str, hasher: QuickXorHash) -> MsgraphError | None:
+        # Size and checksum check for a finished ranged download. Throws the partial file away if it doesn't match.
+        size = os.path.getsize(part)
+        if size != item["size"]:
+            _remove_quietly(part)
+            return MsgraphError(f"Download size mismatch: expected {item['size']} bytes, got {size}.", None, None)
+        expected_hash = (item.get("file") or {}).get("hashes", {}).get("quickXorHash")
+        if expected_hash and expected_hash != hasher.base64digest():
+            _remove_quietly(part)
+            return MsgraphError("Download checksum mismatch.", None, f"expected quickXorHash {expected_hash}, got {hasher.base64digest()}")
+        return None
+
+
+# This is the main class. All methods are callable.
+# This receives a dictionary of cradentials as well as the desired Sharepoint audience/domain.
+# Do make sure your refresh token is up to date.
+# Every method goes through one pooled session, so close the instance (or use it as a context manager) when you're done.
+# For asyncio code, msgraph.aio.AsyncMsgraph has the same methods.
+
+class Msgraph(_MsgraphBase):
+    def __init__(
+        self,
+        credentials: dict,
+        *,
+        session: "Transport | None" = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        transport: str = "requests",
+        timeout: float | tuple[float, float] | None = (10, 300),
+        graph_url: str = GRAPH_URL,
+        login_url: str = LOGIN_URL,
+        token_cache: TokenCache | None = None,
+        token_cache_path: str | None = None,
+        retry_policy: RetryPolicy | None = None,
+        retry_policies: dict[str, RetryPolicy] | None = None,
+        rate_limiter: RateLimiter | None = None,
+        id_cache: IdCache | None = None,
+        id_cache_path: str | None = None,
+        instrumentation: Instrumentation | None = None,
+        hash_index: HashIndex | None = None,
+        hash_index_path: str | None = None,
+    ):
+        super().__init__(
+            credentials, timeout, graph_url, login_url, token_cache, token_cache_path,
+            retry_policy, retry_policies, rate_limiter, id_cache, id_cache_path, instrumentation,
+            hash_index, hash_index_path,
+        )
+        # A session handed in from outside belongs to the caller, so we don't close it.
+        self._owns_session = session is None
+        self.session = session if session is not None else build_session(pool_connections, pool_maxsize, pool_block, keep_alive, transport)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Closes the pooled connections, and the id cache and hash index files. Sessions and caches passed in through the constructor are left open.
+        """
+        if self._owns_session:
+            self.session.close()
+        if self._owns_id_cache:
+            self.id_cache.close()
+        if self._owns_hash_index:
+            self.hash_index.close()
+
+    def _request(self, method: str, url: str, retry_policy: RetryPolicy | None = None, **kwargs) -> Any:
+        # Single exit point to the network. Connection errors and timeouts become error objects, like everything else.
+        # Throttling (429/503 with Retry-After), server errors and dropped connections are retried here, per the retry policy
+        # (the operation's, unless the caller brings its own).
+        kwargs.setdefault("timeout", self.timeout)
+        policy = retry_policy or self._retry_policy()
+        key = self._rate_limit_key(url)
+        instrumentation = self.instrumentation
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(key)
+            attempt_started = time.monotonic()
+            if instrumentation is not None:
+                event = instrumentation.start(method, url, current_operation(), attempt, (self.graph_url, self.login_url))
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except OSError as e:  # requests' exceptions and TransportError are all OSErrors.
+                response = MsgraphError(f"Request to {url} failed: {e}", None, None)
+
+            if isinstance(response, MsgraphError):
+                delay = policy.next_delay(attempt, method, None, None, time.monotonic() - started)
+            else:
+                delay = policy.next_delay(attempt, method, response.status_code, response.headers, time.monotonic() - started)
+            if instrumentation is not None:
+                if isinstance(response, MsgraphError):
+                    instrumentation.finish(event, None, response.message, delay is not None)
+                else:
+                    instrumentation.finish(event, response, None, delay is not None)
+            if delay is None:
+                return response
+
+            if not isinstance(response, MsgraphError):
+                response.close()  # Hands a streamed connection back to the pool.
+                if self.rate_limiter is not None and response.status_code in (429, 503):
+                    self.rate_limiter.penalize(key, delay)
+            time.sleep(delay)
+            record_retry(time.monotonic() - attempt_started)
+            attempt += 1
+
+    def _execute(self, call: GraphCall) -> MsgraphResponse | MsgraphError:
+        response = self._request(
+            call.method,
+            call.url,
+            headers=call.headers,
+            params=call.params,
+            json=call.json,
+            data=call.content if call.content is not None else call.data,
+        )
+        if isinstance(response, MsgraphError):
+            return response
+        return call.parse(response)
+
+    @reports_retries
+    def get_access_token(self, mode: str, force_refresh: bool = False) -> MsgraphResponse | MsgraphError:
+        """
+        Gets the access token. The "mode" parameter changes the audience scope between the user-specified audience, Outlook and the Graph API. 
+        Tokens are cached until shortly before they expire, so calling this before every operation is fine.
+
+        Requires:
+
+        Running mode. "audience" for user-specified audience, "graph" for Graph API, "outlook" for, well, Outlook.
+
+        OPTIONAL: force_refresh, to skip the cache and fetch a new token.
+
+        Returns:
+
+        On success: MsgraphResponse object
+
+        On fail: MsgraphError object
+        """
+        scope = self._token_scope(mode)
+        if isinstance(scope, MsgraphError):
+            return scope
+
+        key = self._token_cache_key(scope)
+        cached = self._cached_token(key, force_refresh)
+        if cached:
+            return cached
+
+        # Only one caller refreshes. Whoever waited on the lock gets the token it fetched.
+        with self.token_cache.lock(key):
+            cached = self._cached_token(key, force_refresh)
+            if cached:
+                return cached
+            return self._execute(self._token_call(key, scope))
+
+    @reports_retries
+    def get_siteid(self, token: str, site: str) -> MsgraphResponse | MsgraphError:
+        """
+        Gets the id of the target site within your audience.
+        Ids are cached (a day by default, see msgraph.id_cache.IdCache), and so are sites that don't exist, for a minute.
+        
+        Requires:
+
+        Access token with the Graph API scope.
+
+        Target site name
+
+        Returns:
+
+        On success: MsgraphResponse object
+
+        On fail: MsgraphError object
+        """
+        key = self._siteid_key(site)
+        cached = self._cached_id(key)
+        if cached:
+            return cached
+        result = self._execute(self._siteid_call(token, site))
+        self._remember_id(key, result)
+        return result
+
+    @reports_retries
+    def get_driveid(self, token: str, siteid: str) -> MsgraphResponse | MsgraphError:
+        """
+        Gets the id of the target site id's root drive. Cached like get_siteid.
+
+        Requires:
+
+        Access token with the Graph API scope.
+
+        Target site's id.
+
+        Returns:
+
+        On success: MsgraphResponse object.
+
+        On fail: MsgraphError object.
+        """
+        key = self._driveid_key(siteid)
+        cached = self._cached_id(key)
+        if cached:
+            return cached
+        result = self._execute(self._driveid_call(token, siteid))
+        self._remember_id(key, result)
+        return result
+
+    def batch(self, token: str, max_workers: int = 4, max_retries: int = 3) -> "GraphBatch":
+        """
+        Starts a JSON batch: queue site id, drive id and listing calls, then send them all with execute(),
+        20 per round trip. See msgraph.batch.GraphBatch.
+
+        Requires:
+
+        Access token with the Graph API scope.
+
+        OPTIONAL: How many batches are sent at the same time.
+
+        OPTIONAL: How many times throttled calls are sent again.
+
+        Returns:
+
+        A GraphBatch object. Its execute() returns a list of MsgraphResponse/MsgraphError objects, one per call.
+        """
+        from msgraph.batch import GraphBatch
+
+        return GraphBatch(self, token, max_workers, max_retries)
+
+    def sync(self, token: str, siteid: str, driveid: str, workers: int = 8, compare_hashes: bool = True) -> "DriveSync":
+        """
+        Starts a folder sync between local disk and a drive: download() or upload() whole folder trees,
+        transferring only files that changed. See msgraph.sync.DriveSync.
+
+        Requires:
+
+        Access token with the Graph API scope.
+
+        Target site's id.
+
+        Target site's drive id.
+
+        OPTIONAL: How many folders are listed, and files transferred, at the same time.
+
+        OPTIONAL: Whether files with the same size but different times get their quickXorHash compared before transferring.
+
+        Returns:
+
+        A DriveSync object.
+        """
+        from msgraph.sync import DriveSync
+
+        return DriveSync(self, token, siteid, driveid, workers, compare_hashes)
+
+    def delta(self, token: str, siteid: str, driveid: str, state_path: str | None = None, select: list[str] | None = None) -> "DeltaTracker":
+        """
+        Tracks what changes in a drive through Graph's delta queries, see msgraph.delta.DeltaTracker.
+        Each run of changes() only returns what was created, modified or deleted since the previous one.
+
+        Requires:
+
+        Access token with the Graph API scope.
+
+        Target site's id.
+
+        Target site's drive id.
+
+        OPTIONAL: Path of a JSON file to keep the delta link in between runs. Without it, tracking only lasts as long as the object.
+
+        OPTIONAL: Fields to fetch per item ($select).
+
+        Returns:
+
+        A DeltaTracker object.
+        """
+        from msgraph.delta import DeltaTracker
+
+        return DeltaTracker(self, token, siteid, driveid, state_path, select)
+
+    def bulk_mail(
+        self,
+        token: str,
+        subject: str = "",
+        body: str = "",
+        attachments: list[str] | None = None,
+        workers: int = 4,
+        per_minute: float = 30,
+    ) -> "BulkMailer":
+        """
+        Starts a bulk send: personalised messages from one mailbox, several at a time but within the mailbox's
+        send limit. See msgraph.mail.BulkMailer.
+
+        Requires:
+
+        Access token with the Outlook API scope.
+
+        OPTIONAL: Subject and body templates, filled in per message with string.Template ("Hello $name").
+
+        OPTIONAL: Files attached to every message. They're read and encoded once for the whole run.
+
+        OPTIONAL: How many messages are sent at the same time.
+
+        OPTIONAL: How many messages may be sent per minute. Exchange allows 30 per mailbox.
+
+        Returns:
+
+        A BulkMailer object. Its send() takes the messages and generates a MailResult per message.
+        """
+        from msgraph.mail import BulkMailer
+
+        return BulkMailer(self, token, subject, body, attachments, workers, per_minute)
+
+    @reports_retries
+    def upload_to_drive(
+        self,
+        token,
+        driveid,
+        filepath,
+        destination = "",
+        mimetype = "",
+        large_file_threshold: int = SIMPLE_UPLOAD_LIMIT,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+        resume_path: str | None = None,
+        skip_unchanged: bool = False,
+        progress: Callable[[int], None] | None = None,
+    ) -> MsgraphResponse | MsgraphError:
+        """
+        Uploads a file to Sharepoint.
+        Files larger than large_file_threshold are sent in chunks through an upload session, see upload_large_file.
+        With skip_unchanged, a file that's already at the destination with the same size and hash isn't sent again.
+
+        Requires:
+
+        Access token with the Graph API scope.
+
+        Target site's drive id.
+
+        Path of the target file in your machine.
+
+        OPTIONAL: Destination folder path within Sharepoint. If not provided, the file will go into the root folder.
+
+        OPTIONAL: Mime-type of the file. Microsoft can handle it in some cases, but other file formats may need their mime-types specified.
+        Only simple uploads send it. Upload sessions have no way to set it, so above large_file_threshold Microsoft always
+        works it out from the file name.
+
+        OPTIONAL: Size in bytes above which the upload session is used. Defaults to 4 MiB.
+
+        OPTIONAL: Chunk size and resume file for large uploads, see upload_large_file.
+
+        OPTIONAL: skip_unchanged, to compare with the file at the destination first (quickXorHash, or sha1Hash on personal
+        OneDrive). Local hashes are kept in the client's hash_index, so files that didn't change aren't read again.
+        A skipped upload's message says so, and its data is the existing item's JSON, like an upload's.
+
+        OPTIONAL: Function called with how many bytes Microsoft has so far: after every chunk of a large upload, once
+        with the file size otherwise (skipped uploads included).
+
+        Returns: 
+
+        On success: MsgraphResponse object.
+        
+        On fail: MsgraphError object.
+        """
+        try:
+            size = os.path.getsize(filepath)
+        except OSError as e:
+            return MsgraphError(f"Failed to read file: {e}", None, None)
+
+        if skip_unchanged:
+            remote = self._execute(self._remote_item_call(token, driveid, filepath, destination))
+            if isinstance(remote, MsgraphResponse) and self._is_unchanged(remote, filepath, size):
+                if progress is not None:
+                    progress(size)
+                return self._unchanged_result(remote)
+
+        if size > large_file_threshold:
+            return self.upload_large_file(token, driveid, filepath, destination, chunk_size, resume_path, progress=progress)
+
+        try:
+            with open(filepath, "rb") as file:
+                content = file.read()
+        except OSError as e:
+            return MsgraphError(f"Failed to read file: {e}", None, None)
+
+        result = self._execute(self._upload_call(token, driveid, filepath, destination, mimetype, content))
+        if result.is_ok and progress is not None:
+            progress(size)
+        return result
+
+    def upload_many(
+        self,
+        token: str,
+        driveid: str,
+        files: list[tuple[str, str, str] | tuple[str, str] | str],
+        workers: int = 8,
+        large_file_threshold: int = SIMPLE_UPLOAD_LIMIT,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+        create_folders: bool = True,
+        progress: Callable[[int, int, int, int], None] | None = None,
+        skip_unchanged: bool = False,
+        resume_dir: str | None = None,
+    ) -> Iterator[tuple[str, MsgraphResponse | MsgraphError]]:
+        """
+        Uploads many files at the same time. Each file goes up the way upload_to_drive would send it: in one request,
+        or in chunks above large_file_threshold. Destination folders that don't exist yet are created first, once each.
+
+        Requires:
+
+        Access token with the Graph API scope.
+
+        Target site's drive id.
+
+        The files, as (path in your machine, destination folder, mime-type) tuples. Destination and mime-type can be
+        left out, and a plain path goes into the root folder.
+
+        OPTIONAL: How many files are uploaded at the same time.
+
+        OPTIONAL: Size threshold and chunk size for chunked uploads, see upload_to_drive.
+
+        OPTIONAL: create_folders=False to leave creating folders to Graph's upload calls.
+
+        OPTIONAL: Function called with (files done, total files, bytes done, total bytes) whenever a chunk or a file
+        is done. It's called from the worker threads, one call at a time.
+
+        OPTIONAL: skip_unchanged, to leave out files already at their destination, see upload_to_drive.
+
+        OPTIONAL: Folder to keep a resume file in for every chunked upload, see upload_large_file. Running the same
+        upload_many again with the same resume_dir picks interrupted uploads back up where they stopped.
+
+        Returns:
+
+        A generator of (path, MsgraphResponse/MsgraphError) tuples, one per file, in the order they finish.
+        If a destination folder can't be created, the files meant for it get that MsgraphError.
+        """
+        entries = [_upload_entry(entry) for entry in files]
+        sizes = []
+        for filepath, _, _ in entries:
+            try:
+                sizes.append(os.path.getsize(filepath))
+            except OSError:
+                sizes.append(0)  # upload_to_drive reports it.
+        totals = (len(entries), sum(sizes))
+        done = [0, 0]
+        lock = threading.Lock()
+
+        def advance(files_done: int, bytes_done: int) -> None:
+            with lock:
+                done[0] += files_done
+                done[1] += bytes_done
+                if progress is not None:
+                    progress(done[0], totals[0], done[1], totals[1])
+
+        def upload(filepath: str, destination: str, mimetype: str, folder_error: MsgraphError | None) -> tuple[str, MsgraphResponse | MsgraphError]:
+            if folder_error is not None:
+                advance(1, 0)
+                return filepath, folder_error
+            sent = [0]
+
+            def uploaded(offset: int) -> None:
+                advance(0, offset - sent[0])
+                sent[0] = offset
+
+            resume_path = _resume_file(resume_dir, driveid, filepath, destination) if resume_dir else None
+            result = self.upload_to_drive(
+                token, driveid, filepath, destination, mimetype, large_file_threshold, chunk_size, resume_path, skip_unchanged, uploaded
+            )
+            advance(1, 0)
+            return filepath, result
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            failed_folders = self._create_folders(token, driveid, [destination for _, destination, _ in entries], pool) if create_folders else {}
+            in_flight: set[Future] = set()
+            for filepath, destination, mimetype in entries:
+                if len(in_flight) >= workers * 2:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    yield from (future.result() for future in finished)
+                folder_error = failed_folders.get(destination.strip("/"))
+                in_flight.add(pool.submit(contextvars.copy_context().run, upload, filepath, destination, mimetype, folder_error))
+            while in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                yield from (future.result() for future in finished)
+
+    def _create_folders(self, token: str, driveid: str, destinations: list[str], pool: ThreadPoolExecutor) -> dict[str, MsgraphError]:
+        # Every folder the destinations need, parents before children, a whole level at once. Returns the ones that failed.
+        folders = {folder for destination in destinations for folder in _folder_chain(destination)}
+        failed: dict[str, MsgraphError] = {}
+        for depth in sorted({folder.count("/") for folder in folders}):
+            level = []
+            for folder in sorted(folder for folder in folders if folder.count("/") == depth):
+                parent = folder.rpartition("/")[0]
+                if parent in failed:
+                    failed[folder] = failed[parent]  # Not tried. It fails with its parent.
+                else:
+                    level.append(folder)
+            futures = [
+                pool.submit(contextvars.copy_context().run, self._execute, self._create_folder_call(token, driveid, *_split_folder(folder)))
+                for folder in level
+            ]
+            for folder, future in zip(level, futures):
+                result = future.result()
+                if isinstance(result, MsgraphError):
+                    failed[folder] = result
+        return failed
+
+    @reports_retries
+    def upload_large_file(
+        self,
+        token: str,
+        driveid: str,
+        filepath: str,
+        destination: str = "",
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+        resume_path: str | None = None,
+        max_chunk_retries: int = 3,
+        progress: Callable[[int], None] | None = None,
+    ) -> MsgraphResponse | MsgraphError:
+        """
+        Uploads a file of any size through a Graph upload session, reading it from disk one chunk at a time.
+        Chunks are retried per the retry policy. When one still fails, the session is asked which bytes it has and the
+        upload carries on from there, up to max_chunk_retries times in a row. If a resume_path is given, the session is recorded there, and calling this again
+        with the same file and resume_path picks the upload back up from the last byte Microsoft acknowledged.
+
+        Requires:
+
+        Access token with the Graph API scope.
+
+        Target site's drive id.
+
+        Path of the target file in your machine.
+
+        OPTIONAL: Destination folder path within Sharepoint. If not provided, the file will go into the root folder.
+
+        OPTIONAL: Chunk size in bytes. Has to be a multiple of 320 KiB. Defaults to 10 MiB.
+
+        OPTIONAL: Path of a small JSON file to keep the session in, for resuming. It's removed once the upload completes.
+
+        OPTIONAL: How many times in a row a failed chunk is picked up again from what the session has before giving up.
+
+        OPTIONAL: Function called with how many bytes Microsoft has so far, after every chunk.
+
+        Returns:
+
+        On success: MsgraphResponse object.
+
+        On fail: MsgraphError object.
+        """
+        if chunk_size <= 0 or chunk_size % UPLOAD_CHUNK_MULTIPLE:
+            return MsgraphError(f"Chunk size must be a positive multiple of {UPLOAD_CHUNK_MULTIPLE} bytes.", None, None)
+        fingerprint = self._upload_fingerprint(driveid, filepath, destination)
+        if isinstance(fingerprint, MsgraphError):
+            return fingerprint
+
+        upload_url = self._recorded_upload_url(resume_path, fingerprint)
+        status = self._execute(self._upload_status_call(upload_url)) if upload_url else None
+        if upload_url and isinstance(status, MsgraphResponse):
+            offset = status.data
+        else:
+            session = self._execute(self._create_upload_session_call(token, driveid, filepath, destination))
+            if isinstance(session, MsgraphError):
+                return session
+            upload_url, offset = session.data, 0
+            if resume_path:
+                _write_upload_state(resume_path, {**fingerprint, "upload_url": upload_url})
+
+        result = self._upload_session_chunks(upload_url, filepath, fingerprint["size"], offset, chunk_size, max_chunk_retries, progress)
+        if resume_path and (result.is_ok or result.status_code == 404):
+            _remove_quietly(resume_path)  # Done, or the session expired and there's nothing left to resume.
+        return result
+
+    def _upload_session_chunks(
+        self,
+        upload_url: str,
+        filepath: str,
+        size: int,
+        offset: int,
+        chunk_size: int,
+        max_chunk_retries: int,
+        progress: Callable[[int], None] | None = None,
+    ) -> MsgraphResponse | MsgraphError:
+        # PUTs the file to an upload session one chunk at a time, from "offset" on. Only one chunk is ever in memory.
+        try:
+            with open(filepath, "rb") as file:
+                failures = 0
+                while True:
+                    file.seek(offset)
+                    result = self._execute(self._upload_chunk_call(upload_url, offset, file.read(chunk_size), size))
+                    if isinstance(result, MsgraphResponse) and result.status_code == 202:
+                        failures = 0
+                        offset = result.data
+                        if progress is not None:
+                            progress(offset)
+                        continue
+                    if result.is_ok or result.status_code == 404:
+                        if result.is_ok and progress is not None:
+                            progress(size)
+                        return result
+
+                    # _request has already retried the chunk as far as the retry policy goes, backoff included. It may
+                    # have landed partially, or not at all, so ask the session where to carry on from and go again.
+                    failures += 1
+                    if failures > max_chunk_retries:
+                        return result
+                    status = self._execute(self._upload_status_call(upload_url))
+                    if isinstance(status, MsgraphError):
+                        return result
+                    offset = status.data
+        except OSError as e:
+            return MsgraphError(f"Failed to read file: {e}", None, None)
+
+    @reports_retries
+    def send_email(
+        self,
+        token: str,
+        subject: str,
+        body: str,
+        target_emails: list[str],
+        attachments: list[str] | None = None,
+        inline_limit: int = INLINE_ATTACHMENT_LIMIT,
+    ) -> MsgraphResponse | MsgraphError:
+        """
+        Sends an email to the target user(s), with attachments if specified.
+        If attachments are needed to be specified, they must be represented as a list of absolute paths to the files.
+        Attachments adding up to more than inline_limit (3 MiB) are sent through send_large_email instead.
+        
+        Requires:
+        
+        Access token with the Outlook scope.
+
+        Subject of the email.
+
+        Body of the email.
+
+        List of recipients.
+
+        Returns:
+        
+        On success: MsgraphResponse object.
+
+        On fail: MsgraphError object.
+        """
+        if self._too_big_to_inline(attachments, inline_limit):
+            return self.send_large_email(token, subject, body, target_emails, attachments or [], inline_limit=inline_limit)
+        call = self._send_email_call(token, subject, body, target_emails, attachments)
+        if isinstance(call, MsgraphError):
+            return call
+        return self._execute(call)
+
+    @reports_retries
+    def send_large_email(
+        self,
+        token: str,
+        subject: str,
+        body: str,
+        target_emails: list[str],
+        attachments: list[str],
+        inline_limit: int = INLINE_ATTACHMENT_LIMIT,
+        chunk_size: int = ATTACHMENT_CHUNK_SIZE,
+        max_chunk_retries: int = 3,
+    ) -> MsgraphResponse | MsgraphError:
+        """
+        Sends an email with attachments of any size. The message is created as a draft, attachments up to inline_limit
+        are added one request each, bigger ones are streamed from disk through upload sessions, and then the draft is sent.
+        Only one chunk of an attachment is in memory at a time. If anything fails, the draft is deleted again.
+
+        Requires:
+
+        Access token with the Outlook scope.
+
+        Subject of the email.
+
+        Body of the email.
+
+        List of recipients.
+
+        List of paths to the files to attach.
+
+        OPTIONAL: Size in bytes above which an attachment goes through an upload session. Defaults to 3 MiB.
+
+        OPTIONAL: Chunk size in bytes for upload sessions. Has to be a multiple of 320 KiB. Defaults to 3.125 MiB.
+
+        OPTIONAL: How many times in a row a failed chunk is picked up again from what the session has before giving up.
+
+        Returns:
+
+        On success: MsgraphResponse object.
+
+        On fail: MsgraphError object.
+        """
+        if chunk_size <= 0 or chunk_size % UPLOAD_CHUNK_MULTIPLE:
+            return MsgraphError(f"Chunk size must be a positive multiple of {UPLOAD_CHUNK_MULTIPLE} bytes.", None, None)
+        sizes = self._attachment_sizes(attachments)
+        if isinstance(sizes, MsgraphError):
+            return sizes
+
+        draft = self._execute(self._create_draft_call(token, subject, body, target_emails))
+        if isinstance(draft, MsgraphError):
+            return draft
+        message_id = draft.data
+
+        for path, size in sizes:
+            result: MsgraphResponse | MsgraphError
+            if size <= inline_limit:
+                call = self._add_attachment_call(token, message_id, path)
+                result = call if isinstance(call, MsgraphError) else self._execute(call)
+            else:
+                session = self._execute(self._create_attachment_session_call(token, message_id, path, size))
+                result = session if isinstance(session, MsgraphError) else self._upload_session_chunks(session.data, path, size, 0, chunk_size, max_chunk_retries)
+            if isinstance(result, MsgraphError):
+                self._execute(self._delete_draft_call(token, message_id))  # Don't leave half a message in the mailbox.
+                return result
+
+        return self._execute(self._send_draft_call(token, message_id))
+
+    @reports_retries
+    def list_items_sharepoint(
+        self,
+        token: str,
+        siteid: str,
+        driveid: str,
+        path: str = "",
+        select: list[str] | None = None,
+        top: int | None = None,
+        keep_raw: bool = False,
+    ) -> MsgraphResponse | MsgraphError:
+        """
+        Lists every item in a Sharepoint folder, all pages, into a compact DriveListing (see msgraph.items):
+        names, ids, sizes, times and hashes in columns instead of Graph's JSON, ready to filter, sort and diff.
+
+        Requires:
+
+        Access token with the Graph API scope.
+
+        Target site's id.
+
+        Target site's drive id.
+
+        OPTIONAL: Folder path within Sharepoint. Defaults to the root folder.
+
+        OPTIONAL: Fields to fetch per item ($select). ["id", "name", "size", "file", "folder", "lastModifiedDateTime"] is all the listing keeps.
+
+        OPTIONAL: Items per page ($top).
+
+        OPTIONAL: keep_raw, to also keep each item's JSON text, for DriveItem.get() on other fields.
+
+        Returns:
+
+        On success: MsgraphResponse object, with the DriveListing as its data.
+
+        On fail: MsgraphError object.
+        """
+        listing = DriveListing(keep_raw=keep_raw)
+        call = self._item_page_call(self._list_files_call(token, siteid, driveid, path, select, top), keep_raw)
+        while True:
+            page = self._execute(call)
+            if isinstance(page, MsgraphError):
+                return page
+            items, next_link = page.data
+            listing.extend(items)
+            if not next_link:
+                return MsgraphResponse(f"Listed {len(listing)} items.", page.status_code, listing)
+            call = self._item_page_call(self._next_page_call(token, next_link), keep_raw)
+
+    @reports_retries
+    def list_files_sharepoint(self, token: str, siteid: str, driveid: str, path: str = "") -> MsgraphResponse | MsgraphError:
+        """
+        Lists all files in a chosen Sharepoint folder.
+        
+        Requires:
+        
+        Access token with the Graph API scope.
+        
+        Target site's id.
+        
+        Target site's drive id.
+        
+        Returns:
+        
+        On success: MsgraphResponse object.
+        
+        On fail: MsgraphError object.
+        """
+        return self._execute(self._list_files_call(token, siteid, driveid, path))
+        
+    def iter_files_sharepoint(
+        self,
+        token: str,
+        siteid: str,
+        driveid: str,
+        path: str = "",
+        select: list[str] | None = None,
+        top: int | None = None,
+        prefetch: bool = True,
+    ) -> Iterator[dict | MsgraphError]:
+        """
+        Lists every item in a Sharepoint folder, one at a time, following @odata.nextLink across pages.
+        Unlike list_files_sharepoint, nothing gets cut off at the first page, and only about two pages are ever in memory.
+        While you go through one page, the next one is already being fetched.
+
+        Requires:
+
+        Access token with the Graph API scope.
+
+        Target site's id.
+
+        Target site's drive id.
+
+        OPTIONAL: Folder path within Sharepoint. Defaults to the root folder.
+
+        OPTIONAL: Fields to fetch per item ($select), e.g. ["id", "name", "size"]. Smaller pages come back faster.
+
+        OPTIONAL: Items per page ($top).
+
+        OPTIONAL: Whether to fetch the next page in the background.
+
+        Returns:
+
+        A generator of drive items (dicts, as Graph sends them).
+
+        On fail: a MsgraphError object as the last thing generated.
+        """
+        pool = ThreadPoolExecutor(max_workers=1) if prefetch else None
+
+        def fetch(call: GraphCall) -> Callable[[], MsgraphResponse | MsgraphError]:
+            if pool is None:
+                return lambda: self._execute(call)
+            future = pool.submit(contextvars.copy_context().run, self._execute, call)
+            return future.result
+
+        try:
+            pending: Callable[[], MsgraphResponse | MsgraphError] | None = fetch(self._list_files_call(token, siteid, driveid, path, select, top))
+            while pending is not None:
+                page = pending()
+                if isinstance(page, MsgraphError):
+                    yield page
+                    return
+                next_link = page.data.get("@odata.nextLink")
+                pending = fetch(self._next_page_call(token, next_link)) if next_link else None
+                yield from page.data.get("value", [])
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    @reports_retries
+    def download_file_sharepoint(
+        self,
+        token: str,
+        siteid: str,
+        driveid: str,
+        path: str,
+        filename: str,
+        localpath: str,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+        workers: int = 1,
+        range_size: int = DOWNLOAD_RANGE_SIZE,
+        max_range_retries: int = 3,
+    ) -> MsgraphResponse | MsgraphError:
+        """
+        Downloads a file from Sharepoint.
+        The body is streamed to disk in chunks, so memory use doesn't grow with the file size.
+        With workers above 1, files bigger than range_size are split into HTTP Range requests downloaded concurrently,
+        each retried on its own, and the result is checked against the size and quickXorHash Sharepoint reports.
+        The file only shows up under its final name once it's complete.
+        
+        Requires:
+        
+        Access token with the Graph API scope.
+        
+        Target site's id.
+        
+        Target site's drive id.
+        
+        Path to the file in Sharepoint. (It has to end with "/")
+        
+        Name of the file to be downloaded.
+        
+        Local path to save the file.
+
+        OPTIONAL: Size in bytes of the chunks written to disk. Defaults to 1 MiB.
+
+        OPTIONAL: Number of concurrent range requests. Keep it at or below the pool_maxsize given to the constructor.
+
+        OPTIONAL: Size in bytes of each range. Defaults to 16 MiB.
+
+        OPTIONAL: How many times a single range is retried before giving up.
+        
+        Returns:
+        
+        On success: MsgraphResponse object.
+        
+        On fail: MsgraphError object.
+        """
+        target = os.path.join(localpath, filename)
+
+        if workers > 1:
+            metadata = self._execute(self._download_item_call(token, siteid, driveid, path, filename))
+            if isinstance(metadata, MsgraphError):
+                return metadata
+            item = metadata.data
+            if item.get("size", 0) > range_size and item.get("@microsoft.graph.downloadUrl"):
+                return self._download_ranges(item, target, chunk_size, workers, range_size, max_range_retries)
+
+        # Uncompressed, so the bytes written can be checked against Content-Length (and the hash, for ranges).
+        headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "identity"}
+        response = self._request("GET", self._download_content_url(siteid, driveid, path, filename), headers=headers, stream=True)
+        if isinstance(response, MsgraphError):
+            return response
+
+        with response:
+            if not _is_ok(response):
+                return MsgraphError.from_response("Failed to download file.", response)
+            expected = response.headers.get("Content-Length")
+            try:
+                with open(f"{target}.part", "wb") as file:
+                    file.writelines(response.iter_content(chunk_size))
+                    written = file.tell()
+            except OSError as e:
+                _remove_quietly(f"{target}.part")
+                return MsgraphError(f"Failed to download file: {e}", response.status_code, None)
+
+        if expected is not None and int(expected) != written:
+            _remove_quietly(f"{target}.part")
+            return MsgraphError(f"Download incomplete: got {written} of {expected} bytes.", response.status_code, None)
+        return _finish_download(target, response.status_code)
+
+    def _download_ranges(self, item: dict, target: str, chunk_size: int, workers: int, range_size: int, max_range_retries: int) -> MsgraphResponse | MsgraphError:
+        # Preallocates the file, then fills it with concurrent range requests, each writing at its own offset.
+        # The download URL is pre-authenticated, so no token goes along.
+        part = f"{target}.part"
+        preallocated = _preallocate(part, item["size"])
+        if isinstance(preallocated, MsgraphError):
+            return preallocated
+
+        url = item["@microsoft.graph.downloadUrl"]
+        # Each range runs in a copy of our context, so its retries count towards this download and follow its retry policy.
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, self._download_range, url, part, start, end, chunk_size, max_range_retries)
+                for start, end in _ranges(item["size"], range_size)
+            ]
+            results = [future.result() for future in futures]
+        hasher = QuickXorHash()
+        for result in results:
+            if isinstance(result, MsgraphError):
+                _remove_quietly(part)
+                return result
+            hasher.combine(result)
+
+        mismatch = self._check_download(item, part, hasher)
+        return mismatch or _finish_download(target, 206)
+
+    def _download_range(self, url: str, part: str, start: int, end: int, chunk_size: int, max_range_retries: int) -> QuickXorHash | MsgraphError:
+        # Downloads bytes start..end into the partial file, hashing them on the way. A dropped connection picks up
+        # where it left off instead of starting the range over.
+        hasher = QuickXorHash(offset=start)
+        position = start
+        failures = 0
+        error = MsgraphError(f"Failed to download bytes {start}-{end}.", None, None)
+        try:
+            with open(part, "r+b") as file:
+                while position <= end:
+                    response = self._request("GET", url, headers={"Range": f"bytes={position}-{end}", "Accept-Encoding": "identity"}, stream=True)
+                    if isinstance(response, MsgraphError):
+                        error = response
+                    else:
+                        with response:
+                            if response.status_code == 206:
+                                file.seek(position)
+                                try:
+                                    for block in response.iter_content(chunk_size):
+                                        block = block[:end - position + 1]
+                                        file.write(block)
+                                        hasher.update(block)
+                                        position += len(block)
+                                except OSError as e:
+                                    error = MsgraphError(f"Failed to download bytes {position}-{end}: {e}", None, None)
+                            elif response.status_code == 200:
+                                return MsgraphError("Server ignored the Range header, use workers=1 for this file.", response.status_code, None)
+                            else:
+                                error = MsgraphError.from_response(f"Failed to download bytes {position}-{end}.", response)
+                        if position > end:
+                            break
+                    failures += 1
+                    if failures > max_range_retries:
+                        return error
+                    delay = min(2 ** failures * 0.5, 30)
+                    time.sleep(delay)
+                    record_retry(delay)
+        except OSError as e:
+            return MsgraphError(f"Failed to write bytes {position}-{end}: {e}", None, None)
+        return hasher
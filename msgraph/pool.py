@@ -0,0 +1,329 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any
+
+from msgraph.msgraph import Msgraph, build_session
+from msgraph.retry import RateLimiter
+
+if TYPE_CHECKING:
+    from msgraph.transport import Transport
+
+# Many tenants (or many app registrations) in one process.
+#
+# A Msgraph instance is bound to one set of credentials. ClientPool keeps one per name you register, made when first
+# needed, and has them all share what can be shared: one pooled session (so connections to graph.microsoft.com are
+# reused across tenants), one RateLimiter (its buckets are already per tenant, so "rate" is a per-tenant limit) and
+# one set of worker threads. Token and id caches stay per client, so tenants never see each other's tokens.
+#
+# Work goes in through submit(name, fn, ...), and fn gets that tenant's client. The workers take tasks round-robin
+# across tenants, and never run more than "per_tenant" tasks of one tenant at once, so a tenant with ten thousand
+# queued uploads slows down the others by a fair share and not by ten thousand uploads.
+#
+# Clients that have been idle for "idle_timeout" seconds are closed and dropped, caches and all, and made again
+# if needed. With max_clients, the least recently used idle ones go first once there are more than that.
+# A refresh token rotated while a client was alive is kept for the next one.
+
+
+class _Tenant:
+    __slots__ = ("client", "completed", "credentials", "last_used", "name", "options", "queue", "running")
+
+    def __init__(self, name: str, credentials: dict, options: dict):
+        self.name = name
+        self.credentials = credentials
+        self.options = options
+        self.client: Msgraph | None = None
+        self.queue: deque[_Task] = deque()
+        self.running = 0
+        self.completed = 0
+        self.last_used = time.monotonic()
+
+    def idle(self) -> bool:
+        return not self.running and not self.queue
+
+
+class _Task:
+    __slots__ = ("args", "context", "fn", "future", "kwargs", "tenant")
+
+    def __init__(self, tenant: _Tenant, fn: Callable, args: tuple, kwargs: dict):
+        self.tenant = tenant
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.context = contextvars.copy_context()
+
+
+class ClientPool:
+    def __init__(
+        self,
+        *,
+        workers: int = 16,
+        per_tenant: int = 4,
+        rate: float | None = None,
+        burst: float | None = None,
+        idle_timeout: float = 600,
+        max_clients: int | None = None,
+        session: "Transport | None" = None,
+        pool_connections: int = 10,
+        pool_maxsize: int | None = None,
+        transport: str = "requests",
+        **options: Any,
+    ):
+        """
+        A pool of Msgraph clients, one per registered credential set, sharing a session, a rate limiter and workers.
+
+        Requires:
+
+        OPTIONAL: Number of worker threads for submit(). Also the default connection pool size.
+
+        OPTIONAL: Most tasks of one tenant that may run at once.
+
+        OPTIONAL: Requests per second allowed per tenant, and how many may go out back to back. No limit by default.
+
+        OPTIONAL: Seconds a client may sit idle before it's closed and dropped.
+
+        OPTIONAL: Most clients kept alive at once. Idle ones beyond that are dropped, least recently used first.
+
+        OPTIONAL: A session to share, or the pool sizes and transport ("requests" or "http.client") for the one built here.
+
+        OPTIONAL: Anything else is passed to every Msgraph (timeout, retry_policy, instrumentation...).
+        Options given to add() for one tenant win over these.
+        """
+        self.workers = workers
+        self.per_tenant = per_tenant
+        self.idle_timeout = idle_timeout
+        self.max_clients = max_clients
+        self.options = options
+        self._owns_session = session is None
+        self.session = session if session is not None else build_session(pool_connections, pool_maxsize or workers, transport=transport)
+        self.rate_limiter = options.pop("rate_limiter", None) or (RateLimiter(rate, burst) if rate else None)
+        self._tenants: dict[str, _Tenant] = {}
+        self._ready: deque[_Tenant] = deque()  # Tenants with queued tasks, in turn order.
+        self._threads: list[threading.Thread] = []
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add(self, name: str, credentials: dict, **options: Any) -> None:
+        """
+        Registers a credential set under a name. Nothing is created until the name is first used.
+        Registering a name again replaces its credentials, and drops its client once it's idle.
+        """
+        with self._condition:
+            tenant = self._tenants.get(name)
+            if tenant is None:
+                self._tenants[name] = _Tenant(name, credentials, options)
+                return
+            tenant.credentials = credentials
+            tenant.options = options
+            stale = self._drop(tenant) if tenant.idle() else None
+        if stale is not None:
+            stale.close()
+
+    def remove(self, name: str) -> None:
+        """
+        Forgets a credential set and closes its client. Tasks still queued for it are cancelled.
+        """
+        with self._condition:
+            tenant = self._tenants.pop(name, None)
+            if tenant is None:
+                return
+            if tenant in self._ready:
+                self._ready.remove(tenant)
+            queued = list(tenant.queue)
+            tenant.queue.clear()
+            client = self._drop(tenant) if not tenant.running else None
+        for task in queued:
+            task.future.cancel()
+        if client is not None:
+            client.close()
+
+    def names(self) -> list[str]:
+        with self._condition:
+            return list(self._tenants)
+
+    def client(self, name: str) -> Msgraph:
+        """
+        The client for a registered name, made if it doesn't exist (anymore). Raises KeyError for unknown names.
+        Calls made on it directly skip the pool's queue, but still share its session and rate limits.
+        It can be evicted while you hold it, since the pool can't tell. It keeps working, but look it up again for long jobs.
+        """
+        with self._condition:
+            tenant = self._tenants[name]
+            tenant.last_used = time.monotonic()
+            client = self._client(tenant)
+            evicted = self._evictions(keep=tenant)
+        for _, stale in evicted:
+            stale.close()
+        return client
+
+    def submit(self, name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """
+        Queues fn(client, *args, **kwargs) for the named tenant and returns a Future with its result.
+
+        Requires:
+
+        A registered name.
+
+        A function taking the tenant's Msgraph client first, e.g. lambda graph: graph.get_siteid(token, "Team").
+
+        OPTIONAL: More arguments for it.
+
+        Returns:
+
+        A concurrent.futures.Future. Raises KeyError for unknown names, RuntimeError once the pool is closed.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("ClientPool is closed.")
+            tenant = self._tenants[name]
+            task = _Task(tenant, fn, args, kwargs)
+            if not tenant.queue:
+                self._ready.append(tenant)
+            tenant.queue.append(task)
+            self._start_workers()
+            self._condition.notify()
+        return task.future
+
+    def evict_idle(self) -> list[str]:
+        """
+        Closes the clients that are due, per idle_timeout and max_clients. Returns their names.
+        This also happens on its own as the pool is used.
+        """
+        with self._condition:
+            evicted = self._evictions()
+        for _, client in evicted:
+            client.close()
+        return [name for name, _ in evicted]
+
+    def stats(self) -> dict:
+        """
+        Per name: queued and running tasks, tasks completed, whether a client is alive and seconds since last use.
+        """
+        now = time.monotonic()
+        with self._condition:
+            return {
+                name: {
+                    "queued": len(tenant.queue),
+                    "running": tenant.running,
+                    "completed": tenant.completed,
+                    "alive": tenant.client is not None,
+                    "idle_for": now - tenant.last_used,
+                }
+                for name, tenant in self._tenants.items()
+            }
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Stops the workers and closes every client, and the session if the pool made it.
+        With wait, queued tasks run first. Without, they're cancelled.
+        """
+        with self._condition:
+            self._closed = True
+            if not wait:
+                for tenant in self._ready:
+                    for task in tenant.queue:
+                        task.future.cancel()
+                    tenant.queue.clear()
+                self._ready.clear()
+            self._condition.notify_all()
+            threads = list(self._threads)
+        for thread in threads:
+            thread.join()
+        with self._condition:
+            clients = [client for tenant in self._tenants.values() if (client := self._drop(tenant)) is not None]
+        for client in clients:
+            client.close()
+        if self._owns_session:
+            self.session.close()
+
+    # ---------------------------------------------------------------------------------
+    # Everything below runs with the condition's lock held, unless it says otherwise.
+
+    def _client(self, tenant: _Tenant) -> Msgraph:
+        if tenant.client is None:
+            options = {**self.options, **tenant.options}
+            tenant.client = Msgraph(tenant.credentials, session=self.session, rate_limiter=self.rate_limiter, **options)
+        return tenant.client
+
+    def _drop(self, tenant: _Tenant) -> Msgraph | None:
+        # Detaches the client, for the caller to close outside the lock. Keeps a rotated refresh token.
+        client, tenant.client = tenant.client, None
+        if client is not None and client.refresh_token != tenant.credentials.get("refresh_token"):
+            tenant.credentials = {**tenant.credentials, "refresh_token": client.refresh_token}
+        return client
+
+    def _evictions(self, keep: _Tenant | None = None) -> list[tuple[str, Msgraph]]:
+        # Detaches the clients that are due, except the one just handed out. The caller closes them, outside the lock.
+        now = time.monotonic()
+        alive = [tenant for tenant in self._tenants.values() if tenant.client is not None]
+        idle = sorted((tenant for tenant in alive if tenant.idle() and tenant is not keep), key=lambda tenant: tenant.last_used)
+        due = [tenant for tenant in idle if now - tenant.last_used >= self.idle_timeout]
+        if self.max_clients is not None:
+            extra = len(alive) - len(due) - self.max_clients
+            due += [tenant for tenant in idle if tenant not in due][:max(0, extra)]
+        return [(tenant.name, client) for tenant in due if (client := self._drop(tenant)) is not None]
+
+    def _start_workers(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"msgraph-pool-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_task(self) -> "_Task | None":
+        # Round-robin: the first tenant in turn that's under its limit gives up one task and goes to the back.
+        for _ in range(len(self._ready)):
+            tenant = self._ready.popleft()
+            if tenant.running >= self.per_tenant:
+                self._ready.append(tenant)
+                continue
+            task = tenant.queue.popleft()
+            if tenant.queue:
+                self._ready.append(tenant)
+            tenant.running += 1
+            return task
+        return None
+
+    def _work(self) -> None:
+        # Runs without the lock, taking it to pick tasks and to hand them back.
+        while True:
+            with self._condition:
+                task = self._next_task()
+                while task is None:
+                    if self._closed and not self._ready:
+                        return
+                    self._condition.wait()
+                    task = self._next_task()
+                tenant = task.tenant
+                tenant.last_used = time.monotonic()
+                client = self._client(tenant)
+            ran = task.future.set_running_or_notify_cancel()
+            if ran:
+                try:
+                    result = task.context.run(task.fn, client, *task.args, **task.kwargs)
+                except BaseException as e:  # noqa: BLE001 : Handed to whoever waits on the future.
+                    task.future.set_exception(e)
+                else:
+                    task.future.set_result(result)
+            with self._condition:
+                tenant.running -= 1
+                tenant.completed += ran
+                tenant.last_used = time.monotonic()
+                # A tenant that was at its limit may have a task up for grabs now.
+                self._condition.notify_all()
+                evicted = self._evictions()
+                # remove() leaves a busy tenant's client to whoever finishes its last task.
+                if self._tenants.get(tenant.name) is not tenant and not tenant.running and tenant.client is not None:
+                    evicted.append((tenant.name, tenant.client))
+                    tenant.client = None
+            for _, stale in evicted:
+                stale.close()
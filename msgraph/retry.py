@@ -0,0 +1,227 @@
+import functools
+import inspect
+import random
+import threading
+import time
+from collections.abc import Callable, Mapping
+from contextvars import ContextVar
+from typing import Any, TypeVar, cast
+
+# Retries, backoff and client-side rate limiting for every request Msgraph and AsyncMsgraph send.
+#
+# A RetryPolicy decides whether a failed request is tried again and how long to wait first: Graph's Retry-After
+# header when there is one, exponential backoff with jitter otherwise. Policies can differ per method, see the
+# retry_policies argument of Msgraph.
+#
+# A RateLimiter is a token bucket per key (tenant and host). Share one between clients and threads, and when
+# Graph throttles one of them, all of them hold off until the Retry-After is over instead of piling on.
+#
+# Results carry the number of retries and the seconds spent on them in "retries" and "retry_time".
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 60,
+        retry_statuses: tuple[int, ...] = (429, 500, 502, 503, 504),
+        respect_retry_after: bool = True,
+        max_retry_after: float = 300,
+        max_total_time: float | None = None,
+        retry_connection_errors: bool = True,
+        retry_non_idempotent: bool = False,
+        jitter: bool = True,
+    ):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = retry_statuses
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        self.max_total_time = max_total_time
+        self.retry_connection_errors = retry_connection_errors
+        self.retry_non_idempotent = retry_non_idempotent
+        self.jitter = jitter
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(max_retries={self.max_retries!r}, retry_statuses={self.retry_statuses!r})"
+
+    def next_delay(self, attempt: int, method: str, status_code: int | None, headers: Mapping | None, elapsed: float) -> float | None:
+        """
+        Seconds to wait before trying again, or None to give up and hand back what we have.
+        "status_code" is None when the request didn't get a response at all.
+        """
+        if attempt >= self.max_retries:
+            return None
+        retry_after = _retry_after(headers) if self.respect_retry_after and headers is not None else None
+        repeatable = method.upper() in IDEMPOTENT_METHODS or self.retry_non_idempotent
+        if status_code is None:
+            # The request may or may not have reached Graph. Only safe to repeat if repeating changes nothing.
+            if not self.retry_connection_errors or not repeatable:
+                return None
+        elif status_code not in self.retry_statuses:
+            return None
+        elif not repeatable and status_code != 429 and not (status_code == 503 and retry_after is not None):
+            # A 500/502/504 can come back after the work was done (a sent mail, say). Throttling means it wasn't.
+            return None
+
+        if retry_after is not None:
+            delay = min(retry_after, self.max_retry_after)
+        else:
+            delay = min(self.backoff_factor * 2 ** attempt, self.max_backoff)
+            if self.jitter:
+                delay = random.uniform(0, delay)  # "Full jitter", so clients that failed together don't retry together.
+        if self.max_total_time is not None and elapsed + delay > self.max_total_time:
+            return None
+        return delay
+
+
+# No retries at all. Handy in retry_policies for methods that do their own.
+NO_RETRY = RetryPolicy(max_retries=0)
+
+
+def _retry_after(headers: Mapping) -> float | None:
+    value = headers.get("Retry-After") if hasattr(headers, "get") else None
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None  # Graph sends seconds. An HTTP date we just treat as "no hint".
+
+
+class RateLimiter:
+    """
+    Token bucket per key, safe to share between threads and clients.
+    "rate" is requests per second, "burst" how many can go out back to back after a quiet period.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._buckets: dict[str, list[float]] = {}  # key -> [tokens, last refill, paused until]
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> float:
+        """
+        Blocks until a request for "key" may go out. Returns the seconds spent waiting.
+        """
+        waited = 0.0
+        while (delay := self._reserve(key)) > 0:
+            time.sleep(delay)
+            waited += delay
+        return waited
+
+    async def acquire_async(self, key: str) -> float:
+        import asyncio  # Here, so sync-only processes never import it.
+
+        waited = 0.0
+        while (delay := self._reserve(key)) > 0:
+            await asyncio.sleep(delay)
+            waited += delay
+        return waited
+
+    def penalize(self, key: str, seconds: float) -> None:
+        """
+        Holds back every request for "key" for the given time. Used when Graph says Retry-After.
+        """
+        with self._lock:
+            bucket = self._bucket(key, time.monotonic())
+            bucket[2] = max(bucket[2], time.monotonic() + seconds)
+
+    def _reserve(self, key: str) -> float:
+        # Takes a token and returns 0, or returns how long until one is available.
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(key, now)
+            if now < bucket[2]:
+                return bucket[2] - now
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / self.rate
+
+    def _bucket(self, key: str, now: float) -> list[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now, 0.0]
+        return bucket
+
+
+# ---------------------------------------------------------------------------------
+# Per-operation bookkeeping. A public method sets up an _Operation when it starts, every request it makes
+# (including ones on worker threads or tasks it spawns with a copied context) adds its retries to it,
+# and the totals are stamped on the result it returns.
+
+class _Operation:
+    __slots__ = ("_lock", "name", "retries", "retry_time")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.retries = 0
+        self.retry_time = 0.0
+        self._lock = threading.Lock()
+
+    def stamp(self, result: Any) -> None:
+        # Results are immutable, apart from this.
+        stamp = getattr(result, "_stamp", None)
+        if stamp is not None:
+            stamp(self.retries, self.retry_time)
+
+
+_operation: ContextVar[_Operation | None] = ContextVar("msgraph_operation", default=None)
+
+
+def current_operation() -> str:
+    operation = _operation.get()
+    return operation.name if operation else ""
+
+
+def record_retry(seconds: float) -> None:
+    operation = _operation.get()
+    if operation is not None:
+        with operation._lock:
+            operation.retries += 1
+            operation.retry_time += seconds
+
+
+def reports_retries(method: F) -> F:
+    """
+    Decorator for public client methods: retries made while the method runs are reported on its result.
+    Nested calls (upload_to_drive handing over to upload_large_file, say) count towards the outer one.
+    """
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            if _operation.get() is not None:
+                return await method(self, *args, **kwargs)
+            operation = _Operation(method.__name__)
+            token = _operation.set(operation)
+            try:
+                result = await method(self, *args, **kwargs)
+            finally:
+                _operation.reset(token)
+            operation.stamp(result)
+            return result
+        return cast(F, async_wrapper)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if _operation.get() is not None:
+            return method(self, *args, **kwargs)
+        operation = _Operation(method.__name__)
+        token = _operation.set(operation)
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            _operation.reset(token)
+        operation.stamp(result)
+        return result
+    return cast(F, wrapper)
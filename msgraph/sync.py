@@ -0,0 +1,278 @@
+import contextvars
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING
+
+from msgraph.items import parse_timestamp
+from msgraph.msgraph import MsgraphError, MsgraphResponse
+
+if TYPE_CHECKING:
+    from msgraph.msgraph import Msgraph
+
+# Mirrors a drive folder to local disk or the other way round, transferring only what changed.
+#
+# The remote tree is walked with a pool of workers, one folder listing each, so deep libraries don't take one round
+# trip per folder in a row. Files are compared by size first, then modification time, and only when those disagree
+# by quickXorHash, which means reading the local file but nothing more from the network. Local hashes come from the
+# client's hash_index, so a file that hasn't changed since it was last hashed isn't read again. What's left is
+# transferred, again with a pool of workers.
+#
+# Nothing is ever deleted on either side. Get one from Msgraph.sync(token, siteid, driveid).
+
+# Only what the comparison needs, to keep the listing pages small.
+WALK_FIELDS = ["id", "name", "size", "file", "folder", "lastModifiedDateTime"]
+# Filesystems and Graph round modification times differently. Closer than this counts as the same time.
+MTIME_TOLERANCE = 2.0
+
+
+class SyncAction:
+    """
+    One file to transfer. "path" is relative to the folders being synced, with "/" separators.
+    "reason" is why: "new", "size", "modified" (no hash to compare) or "content".
+    "result" is the MsgraphResponse/MsgraphError of the transfer, None until it ran (and for dry runs).
+    """
+
+    __slots__ = ("direction", "local_path", "mtime", "path", "reason", "result", "size")
+
+    def __init__(self, direction: str, path: str, local_path: str, size: int, reason: str, mtime: float | None = None):
+        self.direction = direction
+        self.path = path
+        self.local_path = local_path
+        self.size = size
+        self.reason = reason
+        self.mtime = mtime
+        self.result: MsgraphResponse | MsgraphError | None = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.direction!r}, {self.path!r}, {self.reason!r})"
+
+
+class SyncSummary:
+    """
+    What a sync did, or for a dry run, would have done. It's the data of the MsgraphResponse sync methods return.
+    """
+
+    __slots__ = ("actions", "checked", "dry_run", "elapsed")
+
+    def __init__(self, actions: list[SyncAction], checked: int, dry_run: bool, elapsed: float):
+        self.actions = actions
+        self.checked = checked
+        self.dry_run = dry_run
+        self.elapsed = elapsed
+
+    @property
+    def transferred(self) -> list[SyncAction]:
+        return [action for action in self.actions if action.result is not None and action.result.is_ok]
+
+    @property
+    def failed(self) -> list[SyncAction]:
+        return [action for action in self.actions if action.result is not None and action.result.is_err]
+
+    @property
+    def skipped(self) -> int:
+        return self.checked - len(self.actions)
+
+    @property
+    def bytes_transferred(self) -> int:
+        return sum(action.size for action in self.transferred)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.as_dict()!r})"
+
+    def as_dict(self) -> dict:
+        return {
+            "checked": self.checked,
+            "planned": len(self.actions),
+            "transferred": len(self.transferred),
+            "failed": len(self.failed),
+            "skipped": self.skipped,
+            "bytes_transferred": self.bytes_transferred,
+            "elapsed": self.elapsed,
+            "dry_run": self.dry_run,
+        }
+
+
+class DriveSync:
+    def __init__(self, graph: "Msgraph", token: str, siteid: str, driveid: str, workers: int = 8, compare_hashes: bool = True):
+        self.graph = graph
+        self.token = token
+        self.siteid = siteid
+        self.driveid = driveid
+        self.workers = workers
+        self.compare_hashes = compare_hashes
+
+    def walk(self, path: str = "") -> dict[str, dict] | MsgraphError:
+        """
+        Every file under a drive folder, keyed by its path relative to that folder. Subfolders are listed concurrently.
+        """
+        root = path.strip("/")
+        files: dict[str, dict] = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending: set[Future] = {pool.submit(contextvars.copy_context().run, self._list_folder, root)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    listing = future.result()
+                    if isinstance(listing, MsgraphError):
+                        for other in pending:
+                            other.cancel()
+                        return listing
+                    folder, items = listing
+                    for item in items:
+                        full = f"{folder}/{item['name']}" if folder else item["name"]
+                        if "folder" in item:
+                            pending.add(pool.submit(contextvars.copy_context().run, self._list_folder, full))
+                        elif "file" in item:
+                            files[full[len(root) + 1:] if root else full] = item
+        return files
+
+    def download(self, remote_path: str, local_dir: str, dry_run: bool = False) -> MsgraphResponse | MsgraphError:
+        """
+        Brings a local folder up to date with a drive folder, subfolders included.
+
+        Requires:
+
+        Path of the folder within Sharepoint. "" for the root.
+
+        Local folder to sync into. It's created if needed.
+
+        OPTIONAL: dry_run, to only work out what would be downloaded.
+
+        Returns:
+
+        On success: MsgraphResponse object, with a SyncSummary as its data. Check its "failed" list, single files can fail.
+
+        On fail: MsgraphError object, if the drive folder couldn't be walked.
+        """
+        started = time.monotonic()
+        remote = self.walk(remote_path)
+        if isinstance(remote, MsgraphError):
+            return remote
+
+        def plan(entry: tuple[str, dict]) -> SyncAction | None:
+            relative, item = entry
+            local = os.path.join(local_dir, *relative.split("/"))
+            remote_mtime = parse_timestamp(item.get("lastModifiedDateTime"))
+            reason = self._difference(local, item, remote_mtime, touch=not dry_run)
+            return SyncAction("download", relative, local, item.get("size", 0), reason, remote_mtime) if reason else None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            actions = [action for action in pool.map(plan, sorted(remote.items())) if action]
+        return self._run(remote_path, actions, len(remote), dry_run, started)
+
+    def upload(self, local_dir: str, remote_path: str, dry_run: bool = False) -> MsgraphResponse | MsgraphError:
+        """
+        Brings a drive folder up to date with a local folder, subfolders included. Missing drive folders are created.
+
+        Requires:
+
+        Local folder to upload from.
+
+        Path of the folder within Sharepoint. "" for the root.
+
+        OPTIONAL: dry_run, to only work out what would be uploaded.
+
+        Returns:
+
+        On success: MsgraphResponse object, with a SyncSummary as its data. Check its "failed" list, single files can fail.
+
+        On fail: MsgraphError object, if the local or drive folder couldn't be read.
+        """
+        started = time.monotonic()
+        if not os.path.isdir(local_dir):
+            return MsgraphError(f"Local folder {local_dir} doesn't exist.", None, None)
+        remote = self.walk(remote_path)
+        if isinstance(remote, MsgraphError):
+            if remote.status_code != 404:
+                return remote
+            remote = {}  # Nothing uploaded yet.
+
+        local_files = []
+        for folder, _, names in os.walk(local_dir):
+            for name in names:
+                local = os.path.join(folder, name)
+                local_files.append((os.path.relpath(local, local_dir).replace(os.sep, "/"), local))
+
+        def plan(entry: tuple[str, str]) -> SyncAction | None:
+            relative, local = entry
+            item = remote.get(relative)
+            reason = "new" if item is None else self._difference(local, item, parse_timestamp(item.get("lastModifiedDateTime")), touch=False)
+            if not reason:
+                return None
+            try:
+                size = os.path.getsize(local)
+            except OSError:
+                size = 0
+            return SyncAction("upload", relative, local, size, reason)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            actions = [action for action in pool.map(plan, sorted(local_files)) if action]
+        return self._run(remote_path, actions, len(local_files), dry_run, started)
+
+    def _list_folder(self, folder: str) -> tuple[str, list[dict]] | MsgraphError:
+        items = []
+        for item in self.graph.iter_files_sharepoint(self.token, self.siteid, self.driveid, folder, select=WALK_FIELDS, prefetch=False):
+            if isinstance(item, MsgraphError):
+                return item
+            items.append(item)
+        return folder, items
+
+    def _difference(self, local: str, item: dict, remote_mtime: float | None, touch: bool) -> str | None:
+        # Why the local file and the drive item differ, or None if they don't. Cheapest checks first.
+        try:
+            stat = os.stat(local)
+        except OSError:
+            return "new"
+        if stat.st_size != item.get("size"):
+            return "size"
+        if remote_mtime is not None and abs(stat.st_mtime - remote_mtime) <= MTIME_TOLERANCE:
+            return None
+        expected = ((item.get("file") or {}).get("hashes") or {}).get("quickXorHash")
+        if not self.compare_hashes or not expected:
+            return "modified"
+        try:
+            if self.graph.hash_index.digest(local) != expected:
+                return "content"
+            if touch and remote_mtime is not None:
+                os.utime(local, (stat.st_atime, remote_mtime))  # Same file. Match the times so next run skips the hashing.
+        except OSError:
+            return "modified"
+        return None
+
+    def _run(self, remote_path: str, actions: list[SyncAction], checked: int, dry_run: bool, started: float) -> MsgraphResponse:
+        if not dry_run and actions:
+            root = remote_path.strip("/")
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(contextvars.copy_context().run, self._transfer, root, action) for action in actions]
+                for action, future in zip(actions, futures):
+                    action.result = future.result()
+
+        summary = SyncSummary(actions, checked, dry_run, time.monotonic() - started)
+        if dry_run:
+            message = f"Dry run: {len(actions)} of {checked} files would be transferred."
+        elif summary.failed:
+            message = f"Sync finished, {len(summary.failed)} of {len(actions)} transfers failed."
+        else:
+            message = f"Synced {len(actions)} of {checked} files, {summary.bytes_transferred} bytes in {summary.elapsed:.1f}s."
+        return MsgraphResponse(message, 200, summary)
+
+    def _transfer(self, root: str, action: SyncAction) -> MsgraphResponse | MsgraphError:
+        full = f"{root}/{action.path}" if root else action.path
+        folder, _, name = full.rpartition("/")
+        folder = f"{folder}/" if folder else ""
+        if action.direction == "upload":
+            return self.graph.upload_to_drive(self.token, self.driveid, action.local_path, destination=folder)
+
+        local_folder = os.path.dirname(action.local_path)
+        try:
+            os.makedirs(local_folder, exist_ok=True)
+        except OSError as e:
+            return MsgraphError(f"Failed to create {local_folder}: {e}", None, None)
+        result = self.graph.download_file_sharepoint(self.token, self.siteid, self.driveid, folder, name, local_folder)
+        if result.is_ok and action.mtime is not None:
+            try:
+                os.utime(action.local_path, (time.time(), action.mtime))
+            except OSError:
+                pass  # Only costs a hash comparison on the next run.
+        return result
@@ -0,0 +1,567 @@
+import base64
+import gzip
+import json
+import re
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit
+
+from msgraph.hashes import QuickXorHash
+from msgraph.msgraph import Msgraph
+
+# Local stand-in for the login and Graph endpoints the Msgraph class talks to.
+# It's plain HTTP on localhost, meant for tests and benchmarks. It doesn't check tokens.
+#
+# "latency" is added to every request, "connect_latency" to every new connection,
+# which is roughly what a TCP + TLS handshake to Microsoft costs you.
+#
+# "throttle_rate" makes it throttle like Graph: past that many requests per second (with bursts of up to
+# "throttle_burst"), requests get 429 with a Retry-After of "throttle_retry_after" seconds.
+# "item_padding" adds that many bytes of extra metadata to every listed drive item. Real items run to a kilobyte or
+# two, and $select drops the padding like it drops Graph's extra fields.
+# "redirect_downloads" answers .../content with a 302 to the pre-authenticated download URL, which is what Graph does.
+# "compress_downloads" gzips file contents for clients that accept it, like a CDN in front of the download URL may.
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_StubHTTPServer"
+
+    def setup(self) -> None:
+        super().setup()
+        # Headers and body go out in separate writes, don't let Nagle hold the body back.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.stub._connection_opened()
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_PUT(self) -> None:
+        self._dispatch("PUT")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        url = urlsplit(self.path)
+        status, headers, payload = self.server.stub._handle(method, unquote(url.path), dict(self.headers), body, dict(parse_qsl(url.query)))
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if payload:
+            self.wfile.write(payload)
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    stub: "StubGraphServer"
+
+
+class StubGraphServer:
+    """
+    Fake Graph/login server running on a background thread.
+
+    Usage:
+
+    with StubGraphServer() as stub:
+        graph = stub.client()
+        token = graph.get_access_token("graph").unwrap()
+
+    Uploaded files end up in the "files" dictionary, keyed by their path inside the drive, sent mail in "sent_mail".
+    "requests", "connections", "bytes_received", "largest_request", "batches", "pages_served" and "throttled" count
+    what the server saw. Use fail_next() to make the next matching requests fail, to exercise retries and resumes.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        connect_latency: float = 0.0,
+        page_size: int = 200,
+        throttle_rate: float | None = None,
+        throttle_burst: float | None = None,
+        throttle_retry_after: float = 1.0,
+        item_padding: int = 0,
+        redirect_downloads: bool = False,
+        compress_downloads: bool = False,
+    ):
+        self.host = host
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.throttle_rate = throttle_rate
+        self.throttle_burst = throttle_burst if throttle_burst is not None else max(1.0, throttle_rate or 0.0)
+        self.throttle_retry_after = throttle_retry_after
+        self.item_padding = item_padding
+        self.redirect_downloads = redirect_downloads
+        self.compress_downloads = compress_downloads
+        self.throttled = 0
+        self._throttle_tokens = self.throttle_burst
+        self._throttle_refilled = time.monotonic()
+        # Folder listings are paged like Graph's: page_size items per page (or $top), with an @odata.nextLink to the next.
+        self.page_size = page_size
+        self.pages_served = 0
+        self.files: dict[str, bytes] = {}
+        # Folders created with POST .../children. Folders that only exist because files are in them aren't listed here.
+        self.folders: set[str] = set()
+        # When each file was last written. Files put straight into "files" count as written when the server started.
+        self.modified: dict[str, float] = {}
+        self.started = time.time()
+        self._hashes: dict[str, tuple[bytes, str]] = {}
+        # Change log for delta queries: the sequence number each path last changed at. Deleted paths map to None content.
+        self.change_seq = 0
+        self._changes: dict[str, tuple[int, bool]] = {}
+        self._delta_floor = 0
+        self.sent_mail: list[dict] = []
+        # Messages created with POST /me/messages and not sent yet, by id.
+        self.drafts: dict[str, dict] = {}
+        self.upload_sessions: dict[str, dict] = {}
+        self._faults: list[dict] = []
+        self.connections = 0
+        self.requests = 0
+        self.bytes_received = 0
+        self.largest_request = 0
+        self.batches = 0
+        self._lock = threading.Lock()
+        self._httpd = _StubHTTPServer((host, port), _StubHandler)
+        self._httpd.stub = self
+        self._thread: threading.Thread | None = None
+        self._routes = [
+            ("POST", re.compile(r"^/(?P<tenant>[^/]+)/oauth2/v2\.0/token$"), self._token),
+            ("GET", re.compile(r"^/v1\.0/sites/(?P<audience>[^/:]+):/sites/(?P<site>[^/]+)$"), self._site),
+            ("GET", re.compile(r"^/v1\.0/sites/(?P<siteid>[^/]+)/drives$"), self._drives),
+            ("GET", re.compile(r"^/v1\.0/sites/[^/]+/drives/[^/]+/root(?::/(?P<path>.+?):?)?/children$"), self._children),
+            ("GET", re.compile(r"^/v1\.0/sites/[^/]+/drives/[^/]+/root/delta$"), self._delta),
+            ("GET", re.compile(r"^/v1\.0/(?:sites/[^/]+/)?drives/[^/]+/root:/(?P<path>.+):/content$"), self._download),
+            ("GET", re.compile(r"^/v1\.0/(?:sites/[^/]+/)?drives/[^/]+/root:/(?P<path>[^:]+)$"), self._item),
+            ("GET", re.compile(r"^/download/(?P<path>.+)$"), self._download_url),
+            ("PUT", re.compile(r"^/v1\.0/drives/[^/]+/root:/(?P<path>.+):/content$"), self._upload),
+            ("POST", re.compile(r"^/v1\.0/drives/[^/]+/root(?::/(?P<path>.+?):)?/children$"), self._create_folder),
+            ("POST", re.compile(r"^/v1\.0/me/sendMail$"), self._send_mail),
+            ("POST", re.compile(r"^/v1\.0/me/messages$"), self._create_draft),
+            ("POST", re.compile(r"^/v1\.0/me/messages/(?P<message>[^/]+)/attachments$"), self._add_attachment),
+            ("POST", re.compile(r"^/v1\.0/me/messages/(?P<message>[^/]+)/attachments/createUploadSession$"), self._create_attachment_session),
+            ("POST", re.compile(r"^/v1\.0/me/messages/(?P<message>[^/]+)/send$"), self._send_draft),
+            ("DELETE", re.compile(r"^/v1\.0/me/messages/(?P<message>[^/]+)$"), self._delete_draft),
+            ("POST", re.compile(r"^/v1\.0/\$batch$"), self._batch),
+            ("POST", re.compile(r"^/v1\.0/drives/[^/]+/root:/(?P<path>.+):/createUploadSession$"), self._create_upload_session),
+            ("PUT", re.compile(r"^/upload/(?P<session>[^/]+)$"), self._upload_chunk),
+            ("GET", re.compile(r"^/upload/(?P<session>[^/]+)$"), self._upload_status),
+        ]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self._httpd.server_port}"
+
+    @property
+    def graph_url(self) -> str:
+        return f"{self.url}/v1.0"
+
+    @property
+    def login_url(self) -> str:
+        return self.url
+
+    def credentials(self) -> dict:
+        return {
+            "tenantid": "stub-tenant",
+            "clientid": "stub-client",
+            "clientsecret": "stub-secret",
+            "audience": "stub.sharepoint.com",
+            "refresh_token": "stub-refresh-token",
+        }
+
+    def client(self, **kwargs) -> Msgraph:
+        """
+        Returns a Msgraph instance pointed at this server. Keyword arguments go to the Msgraph constructor.
+        """
+        return Msgraph(self.credentials(), graph_url=self.graph_url, login_url=self.login_url, **kwargs)
+
+    def start(self) -> "StubGraphServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def fail_next(self, count: int = 1, status: int = 503, headers: dict | None = None, match: str = "", after: int = 0) -> None:
+        """
+        Makes the next "count" requests whose path contains "match" fail with the given status and headers.
+        The first "after" matching requests are let through untouched.
+        """
+        with self._lock:
+            self._faults.append({"count": count, "status": status, "headers": headers or {}, "match": match, "after": after})
+
+    def clear_faults(self) -> None:
+        with self._lock:
+            self._faults.clear()
+
+    def put_file(self, path: str, content: bytes) -> None:
+        """
+        Creates or replaces a file the way an upload would, so it shows up in delta queries.
+        """
+        with self._lock:
+            self._record_write(path, content)
+
+    def delete_file(self, path: str) -> None:
+        with self._lock:
+            self.files.pop(path, None)
+            self.change_seq += 1
+            self._changes[path] = (self.change_seq, True)
+
+    def expire_delta_links(self) -> None:
+        """
+        Makes every delta link handed out so far answer 410 Gone, like Graph does when one is too old.
+        """
+        with self._lock:
+            self._delta_floor = self.change_seq + 1
+
+    # ---------------------------------------------------------------------------------
+    # Request handling. Handlers return (status, headers, body).
+
+    def _connection_opened(self) -> None:
+        with self._lock:
+            self.connections += 1
+        if self.connect_latency:
+            time.sleep(self.connect_latency)
+
+    def _handle(self, method: str, path: str, headers: dict, body: bytes, query: dict | None = None) -> tuple[int, dict, bytes]:
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += len(body)
+            self.largest_request = max(self.largest_request, len(body))
+            fault = next((fault for fault in self._faults if fault["match"] in path), None)
+            if fault and fault["after"] > 0:
+                fault["after"] -= 1
+                fault = None
+            elif fault:
+                fault["count"] -= 1
+                if fault["count"] <= 0:
+                    self._faults.remove(fault)
+            throttled = self.throttle_rate is not None and not self._take_throttle_token()
+        if self.latency:
+            time.sleep(self.latency)
+        if fault:
+            return self._json(fault["status"], {"error": {"code": "injectedFault", "message": "Injected by fail_next()."}}, fault["headers"])
+        if throttled:
+            return self._json(
+                429,
+                {"error": {"code": "activityLimitReached", "message": "The request has been throttled."}},
+                {"Retry-After": f"{self.throttle_retry_after:g}"},
+            )
+        for route_method, pattern, handler in self._routes:
+            match = pattern.match(path)
+            if route_method == method and match:
+                return handler(match, headers, body, query or {})
+        return self._not_found(f"No stub route for {method} {path}")
+
+    def _take_throttle_token(self) -> bool:
+        # Caller holds self._lock. Token bucket, like RateLimiter, but refusing instead of waiting.
+        assert self.throttle_rate is not None
+        now = time.monotonic()
+        self._throttle_tokens = min(self.throttle_burst, self._throttle_tokens + (now - self._throttle_refilled) * self.throttle_rate)
+        self._throttle_refilled = now
+        if self._throttle_tokens >= 1:
+            self._throttle_tokens -= 1
+            return True
+        self.throttled += 1
+        return False
+
+    def _record_write(self, path: str, content: bytes) -> None:
+        # Caller holds self._lock.
+        self.files[path] = content
+        self.modified[path] = time.time()
+        self.change_seq += 1
+        self._changes[path] = (self.change_seq, False)
+
+    def _json(self, status: int, payload: dict, headers: dict | None = None) -> tuple[int, dict, bytes]:
+        return status, {"Content-Type": "application/json", **(headers or {})}, json.dumps(payload).encode()
+
+    def _not_found(self, message: str = "The resource could not be found.") -> tuple[int, dict, bytes]:
+        return self._json(404, {"error": {"code": "itemNotFound", "message": message}})
+
+    def _page(self, query: dict) -> tuple[int, int]:
+        # Listings and delta pages: how many items a page holds ($top, or page_size) and where this one starts.
+        return int(query.get("$top") or self.page_size), int(query.get("$skiptoken") or 0)
+
+    def _token(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        return self._json(200, {
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "access_token": f"stub-access-token-{match['tenant']}",
+            "refresh_token": "stub-refresh-token",
+        })
+
+    def _site(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        return self._json(200, {"id": f"{match['audience']},site-{match['site']}"})
+
+    def _drives(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        return self._json(200, {"value": [{"id": f"drive-{match['siteid']}"}]})
+
+    def _children(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        prefix = (match["path"] or "").strip("/")
+        prefix = f"{prefix}/" if prefix else ""
+        with self._lock:
+            self.pages_served += 1
+            files = {path[len(prefix):]: content for path, content in self.files.items() if path.startswith(prefix)}
+            created = [folder[len(prefix):] for folder in self.folders if folder.startswith(prefix)]
+        folders: dict[str, int] = {folder.split("/", 1)[0]: 0 for folder in created}
+        for relative in files:
+            if "/" in relative:
+                folder = relative.split("/", 1)[0]
+                folders[folder] = folders.get(folder, 0) + 1
+        names = sorted([(name, None) for name in folders] + [(name, content) for name, content in files.items() if "/" not in name])
+        top, skip = self._page(query)
+        items = [
+            {"id": f"folder-{prefix}{name}", "name": name, "size": 0, "folder": {"childCount": folders[name]}} if content is None
+            else self._drive_item(f"{prefix}{name}", content)
+            for name, content in names[skip:skip + top]
+        ]
+        if query.get("$select"):
+            fields = query["$select"].split(",")
+            items = [{key: value for key, value in item.items() if key in fields} for item in items]
+        payload: dict = {"value": items}
+        if skip + top < len(names):
+            payload["@odata.nextLink"] = f"{self.url}{quote(match.string)}?{urlencode({**query, '$skiptoken': skip + top})}"
+        return self._json(200, payload)
+
+    def _delta(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        # No token: every file. token=latest: nothing, just a link for later. token=N: what changed after change N.
+        kept = {key: value for key, value in query.items() if key not in ("token", "snapshot", "$skiptoken")}
+        with self._lock:
+            snapshot = int(query.get("snapshot") or self.change_seq)
+            token = query.get("token")
+            delta_link = f"{self.url}{quote(match.string)}?{urlencode({**kept, 'token': snapshot})}"
+            if token == "latest":
+                return self._json(200, {"value": [], "@odata.deltaLink": delta_link})
+            since = int(token) if token else None
+            if since is not None and since < self._delta_floor:
+                return self._json(410, {"error": {"code": "resyncRequired", "message": "The delta token is no longer valid."}})
+            if since is None:
+                changed = sorted((path, False) for path in self.files)
+            else:
+                changed = sorted((path, deleted) for path, (seq, deleted) in self._changes.items() if since < seq <= snapshot)
+            entries = [(path, deleted, self.files.get(path)) for path, deleted in changed]
+        top, skip = self._page(query)
+        items = []
+        for path, deleted, content in entries[skip:skip + top]:
+            parent = path.rpartition("/")[0]
+            if deleted or content is None:
+                item: dict = {"id": f"item-{path}", "name": path.rsplit("/", 1)[-1], "deleted": {"state": "deleted"}}
+            else:
+                item = self._drive_item(path, content)
+            item["parentReference"] = {"path": f"/drive/root:/{parent}" if parent else "/drive/root:"}
+            items.append(item)
+        payload: dict = {"value": items}
+        if skip + top < len(entries):
+            payload["@odata.nextLink"] = f"{self.url}{quote(match.string)}?{urlencode({**query, 'snapshot': snapshot, '$skiptoken': skip + top})}"
+        else:
+            payload["@odata.deltaLink"] = delta_link
+        return self._json(200, payload)
+
+    def _download(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        path = match["path"].strip("/")
+        with self._lock:
+            content = self.files.get(path)
+        if content is None:
+            return self._not_found()
+        if self.redirect_downloads:
+            return 302, {"Location": f"{self.url}/download/{quote(path)}"}, b""
+        return self._file_content(200, {"Content-Type": "application/octet-stream"}, content, headers)
+
+    def _file_content(self, status: int, response_headers: dict, content: bytes, headers: dict) -> tuple[int, dict, bytes]:
+        if self.compress_downloads and "gzip" in headers.get("Accept-Encoding", ""):
+            return status, {**response_headers, "Content-Encoding": "gzip"}, gzip.compress(content)
+        return status, response_headers, content
+
+    def _item(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        path = match["path"].strip("/")
+        with self._lock:
+            content = self.files.get(path)
+        if content is None:
+            return self._not_found()
+        return self._json(200, self._drive_item(path, content))
+
+    def _drive_item(self, path: str, content: bytes) -> dict:
+        # A file's metadata, the way Graph lists it. Hashes are cached until the file changes.
+        with self._lock:
+            cached = self._hashes.get(path)
+            modified = self.modified.get(path, self.started)
+        if cached is None or cached[0] is not content:
+            cached = (content, QuickXorHash(content).base64digest())
+            with self._lock:
+                self._hashes[path] = cached
+        item = {
+            "id": f"item-{path}",
+            "name": path.rsplit("/", 1)[-1],
+            "size": len(content),
+            "lastModifiedDateTime": datetime.fromtimestamp(modified, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "file": {"hashes": {"quickXorHash": cached[1]}},
+            "@microsoft.graph.downloadUrl": f"{self.url}/download/{path}",
+        }
+        if self.item_padding:
+            item["description"] = "x" * self.item_padding
+        return item
+
+    def _download_url(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        # The pre-authenticated URL Graph hands out for downloads. Honours single Range headers like the real one.
+        with self._lock:
+            content = self.files.get(match["path"].strip("/"))
+        if content is None:
+            return self._not_found()
+        requested = re.match(r"bytes=(\d+)-(\d*)$", headers.get("Range", ""))
+        if not requested:
+            return self._file_content(200, {"Content-Type": "application/octet-stream", "Accept-Ranges": "bytes"}, content, headers)
+        start = int(requested[1])
+        end = min(int(requested[2]) if requested[2] else len(content) - 1, len(content) - 1)
+        return self._file_content(206, {"Content-Type": "application/octet-stream", "Content-Range": f"bytes {start}-{end}/{len(content)}"}, content[start:end + 1], headers)
+
+    def _upload(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        path = match["path"].strip("/")
+        with self._lock:
+            self._record_write(path, body)
+        return self._json(201, {"id": f"item-{path}", "name": path.rsplit("/", 1)[-1], "size": len(body), "file": {}})
+
+    def _create_folder(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        parent = (match["path"] or "").strip("/")
+        name = json.loads(body or b"{}").get("name", "")
+        path = f"{parent}/{name}" if parent else name
+        with self._lock:
+            if path in self.folders or path in self.files or any(existing.startswith(f"{path}/") for existing in self.files):
+                return self._json(409, {"error": {"code": "nameAlreadyExists", "message": "An item with the same name already exists."}})
+            self.folders.add(path)
+        return self._json(201, {"id": f"folder-{path}", "name": name, "folder": {"childCount": 0}})
+
+    def _send_mail(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        with self._lock:
+            self.sent_mail.append(json.loads(body or b"{}"))
+        return 202, {}, b""
+
+    def _create_draft(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        message = json.loads(body or b"{}")
+        message_id = uuid.uuid4().hex
+        with self._lock:
+            self.drafts[message_id] = {**message, "attachments": list(message.get("attachments", []))}
+        return self._json(201, {"id": message_id, **message})
+
+    def _draft_not_found(self) -> tuple[int, dict, bytes]:
+        return self._json(404, {"error": {"code": "ErrorItemNotFound", "message": "The specified object was not found in the store."}})
+
+    def _add_attachment(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        attachment = json.loads(body or b"{}")
+        with self._lock:
+            draft = self.drafts.get(match["message"])
+            if draft is None:
+                return self._draft_not_found()
+            draft["attachments"].append(attachment)
+        return self._json(201, {"id": uuid.uuid4().hex, "name": attachment.get("name")})
+
+    def _create_attachment_session(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        item = json.loads(body or b"{}").get("AttachmentItem", {})
+        session = uuid.uuid4().hex
+        with self._lock:
+            if match["message"] not in self.drafts:
+                return self._draft_not_found()
+            self.upload_sessions[session] = {"message": match["message"], "name": item.get("name"), "data": bytearray(), "size": item.get("size")}
+        return self._json(201, {"uploadUrl": f"{self.url}/upload/{session}", "expirationDateTime": "2099-01-01T00:00:00Z", "nextExpectedRanges": ["0-"]})
+
+    def _send_draft(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        with self._lock:
+            draft = self.drafts.pop(match["message"], None)
+            if draft is None:
+                return self._draft_not_found()
+            self.sent_mail.append({"message": draft})
+        return 202, {}, b""
+
+    def _delete_draft(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        with self._lock:
+            if self.drafts.pop(match["message"], None) is None:
+                return self._draft_not_found()
+        return 204, {}, b""
+
+    def _create_upload_session(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        session = uuid.uuid4().hex
+        with self._lock:
+            self.upload_sessions[session] = {"path": match["path"].strip("/"), "data": bytearray(), "size": None}
+        return self._json(200, {"uploadUrl": f"{self.url}/upload/{session}", "expirationDateTime": "2099-01-01T00:00:00Z", "nextExpectedRanges": ["0-"]})
+
+    def _upload_chunk(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        # Mimics Graph: chunks must arrive in order, and the last one commits the file.
+        if "Authorization" in headers:
+            return self._json(401, {"error": {"code": "unauthenticated", "message": "uploadUrl must not carry a token."}})
+        with self._lock:
+            session = self.upload_sessions.get(match["session"])
+            if session is None:
+                return self._not_found("Upload session not found.")
+            content_range = re.match(r"bytes (\d+)-(\d+)/(\d+)", headers.get("Content-Range", ""))
+            if not content_range:
+                return self._json(400, {"error": {"code": "invalidRequest", "message": "Missing Content-Range."}})
+            start, end, size = (int(value) for value in content_range.groups())
+            if start != len(session["data"]) or end - start + 1 != len(body):
+                return self._json(416, {"error": {"code": "invalidRange", "message": "Unexpected range."}, "nextExpectedRanges": [f"{len(session['data'])}-"]})
+            session["data"] += body
+            session["size"] = size
+            if len(session["data"]) < size:
+                # Drive sessions answer 202 until the end, attachment sessions 200.
+                status = 200 if "message" in session else 202
+                return self._json(status, {"expirationDateTime": "2099-01-01T00:00:00Z", "nextExpectedRanges": [f"{len(session['data'])}-{size - 1}"]})
+            del self.upload_sessions[match["session"]]
+            if "message" in session:
+                draft = self.drafts.get(session["message"])
+                if draft is None:
+                    return self._draft_not_found()
+                content = base64.b64encode(bytes(session["data"])).decode("ascii")
+                draft["attachments"].append({"@odata.type": "#microsoft.graph.fileAttachment", "name": session["name"], "contentBytes": content})
+                return 201, {"Location": f"{self.url}/v1.0/me/messages/{session['message']}/attachments/{match['session']}"}, b""
+            self._record_write(session["path"], bytes(session["data"]))
+        return self._json(201, {"id": f"item-{session['path']}", "name": session["path"].rsplit("/", 1)[-1], "size": size, "file": {}})
+
+    def _upload_status(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        with self._lock:
+            session = self.upload_sessions.get(match["session"])
+            if session is None:
+                return self._not_found("Upload session not found.")
+            received = len(session["data"])
+        return self._json(200, {"expirationDateTime": "2099-01-01T00:00:00Z", "nextExpectedRanges": [f"{received}-"]})
+
+    def _batch(self, match, headers, body, query) -> tuple[int, dict, bytes]:
+        # Runs every item through the normal routes, fault injection included.
+        requests = json.loads(body).get("requests", [])
+        if len(requests) > 20:
+            return self._json(400, {"error": {"code": "invalidRequest", "message": "Too many requests in the batch."}})
+        with self._lock:
+            self.batches += 1
+        responses = []
+        for item in requests:
+            item_body = json.dumps(item["body"]).encode() if "body" in item else b""
+            url = urlsplit(item["url"])
+            status, item_headers, payload = self._handle(item["method"], f"/v1.0{unquote(url.path)}", item.get("headers") or {}, item_body, dict(parse_qsl(url.query)))
+            try:
+                parsed = json.loads(payload) if payload else None
+            except ValueError:
+                parsed = payload.decode(errors="replace")
+            responses.append({"id": item["id"], "status": status, "headers": item_headers, "body": parsed})
+        return self._json(200, {"responses": responses})
@@ -0,0 +1,150 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+# Token cache used by Msgraph.get_access_token.
+#
+# Access tokens are kept per key (tenant, client, credential set and scope) until "refresh_margin" seconds before they expire.
+# The rotated refresh tokens the OAuth endpoint hands back are kept as well, so the next refresh uses the newest one.
+#
+# With a path, the cache is mirrored to a JSON file. Several processes can point at the same file:
+# whoever refreshes first writes the token down, the rest pick it up instead of minting their own.
+# The file holds live credentials, so it's created readable by the owner only.
+
+
+class TokenCache:
+    def __init__(self, path: str | None = None, refresh_margin: float = 300):
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._file_signature: tuple | None = None
+        if path:
+            self._reload()
+
+    def get(self, key: str) -> str | None:
+        """
+        Returns the cached access token for the key, or None if there's none or it's about to expire.
+        """
+        entry = self._entry(key)
+        if entry and entry.get("access_token") and entry.get("expires_at", 0) - self.refresh_margin > time.time():
+            return entry["access_token"]
+        return None
+
+    def set(self, key: str, access_token: str, expires_in: float) -> None:
+        self._update(key, {"access_token": access_token, "expires_at": time.time() + expires_in})
+
+    def get_refresh_token(self, key: str) -> str | None:
+        entry = self._entry(key)
+        return entry.get("refresh_token") if entry else None
+
+    def set_refresh_token(self, key: str, refresh_token: str) -> None:
+        self._update(key, {"refresh_token": refresh_token})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self.path:
+                self._write()
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """
+        Serializes refreshes of one key, so a burst of threads (or processes, with a file) mints a single token.
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if not self.path:
+                yield
+                return
+            with _file_lock(f"{self.path}.lock"):
+                yield
+
+    # ---------------------------------------------------------------------------------
+
+    def _entry(self, key: str) -> dict | None:
+        with self._lock:
+            if self.path:
+                self._reload()
+            return self._entries.get(key)
+
+    def _update(self, key: str, values: dict) -> None:
+        with self._lock:
+            if self.path:
+                self._reload()
+            self._entries.setdefault(key, {}).update(values)
+            if self.path:
+                self._write()
+
+    def _reload(self) -> None:
+        # Cheap when nothing changed: one stat call. Caller holds self._lock.
+        assert self.path
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        # The file is swapped in with os.replace, so the inode changes on every write even within one mtime tick.
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == self._file_signature:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            return  # A corrupt or unreadable file just means a cold cache.
+        if isinstance(entries, dict):
+            self._entries.update(entries)
+        self._file_signature = signature
+
+    def _write(self) -> None:
+        # Write to a temporary file and swap it in, so readers never see half a file. Caller holds self._lock.
+        assert self.path
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".msgraph-tokens-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(self._entries, file)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return  # Persisting is best effort, the in-memory cache still works.
+        stat = os.stat(self.path)
+        self._file_signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    except OSError:
+        fd = None  # Read-only location or similar. The in-process lock still applies.
+    if fd is None:
+        yield
+        return
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        yield
+    finally:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
@@ -0,0 +1,296 @@
+import http.client
+import json as jsonlib
+import threading
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from datetime import timedelta
+from typing import Any, Protocol
+from urllib.parse import urlencode, urljoin, urlsplit
+
+# What Msgraph sends its requests through, and a small implementation of it on the standard library's http.client.
+#
+# A transport is anything with request(method, url, **kwargs) and close(), where request takes requests-style keyword
+# arguments (headers, params, json, data, timeout, stream) and returns a response with status_code, headers, content,
+# text, json(), ok, elapsed, request.headers, iter_content() and close(). requests.Session is one, and it's the default.
+#
+# HttpClientTransport is the other. It imports nothing outside the standard library, so a process that only needs a
+# token and an upload doesn't pay for requests, urllib3 and charset detection on every cold start. It keeps idle
+# connections per host (up to pool_maxsize each), follows redirects the way requests does (dropping the Authorization
+# header when the host changes) and turns everything that goes wrong on the wire into TransportError, an OSError like
+# requests' own exceptions. It doesn't do proxies from the environment, .netrc or compressed responses.
+
+USER_AGENT = "msgraph-pywrap"
+_REDIRECTS = (301, 302, 303, 307, 308)
+
+
+class Transport(Protocol):
+    def request(self, method: str, url: str, *args: Any, **kwargs: Any) -> Any: ...
+
+    def close(self) -> None: ...
+
+
+class TransportError(OSError):
+    pass
+
+
+class Headers(Mapping[str, str]):
+    """
+    Case-insensitive, read-only response headers. Repeated headers are joined with commas, like requests does.
+    """
+    __slots__ = ("_items",)
+
+    def __init__(self, items: Iterable[tuple[str, str]] = ()):
+        self._items: dict[str, tuple[str, str]] = {}
+        for key, value in items:
+            previous = self._items.get(key.lower())
+            self._items[key.lower()] = (previous[0], f"{previous[1]}, {value}") if previous else (key, value)
+
+    def __getitem__(self, key: str) -> str:
+        return self._items[key.lower()][1]
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, _ in self._items.values())
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+
+class SentRequest:
+    __slots__ = ("headers", "method", "url")
+
+    def __init__(self, method: str, url: str, headers: dict):
+        self.method = method
+        self.url = url
+        self.headers = headers
+
+
+class HttpClientResponse:
+    __slots__ = ("_connection", "_content", "_key", "_raw", "_transport", "elapsed", "headers", "reason", "request", "status_code", "url")
+
+    def __init__(self, transport: "HttpClientTransport", key: tuple, connection: http.client.HTTPConnection, raw: http.client.HTTPResponse, request: SentRequest, elapsed: float):
+        self._transport = transport
+        self._key = key
+        self._connection: http.client.HTTPConnection | None = connection
+        self._raw = raw
+        self._content: bytes | None = None
+        self.status_code = raw.status
+        self.reason = raw.reason
+        self.headers = Headers(raw.getheaders())
+        self.request = request
+        self.url = request.url
+        self.elapsed = timedelta(seconds=elapsed)
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = b"".join(self.iter_content(1024 * 1024))
+        return self._content
+
+    @property
+    def text(self) -> str:
+        _, _, charset = self.headers.get("Content-Type", "").partition("charset=")
+        try:
+            return self.content.decode(charset.split(";")[0].strip(" \"'") or "utf-8", errors="replace")
+        except LookupError:
+            return self.content.decode("utf-8", errors="replace")
+
+    def json(self, **kwargs: Any) -> Any:
+        return jsonlib.loads(self.content, **kwargs)
+
+    def iter_content(self, chunk_size: int = 1) -> Iterator[bytes]:
+        """
+        The body in pieces of up to chunk_size bytes, read off the connection as they're asked for. Raises TransportError
+        if the connection breaks halfway.
+        """
+        if self._content is not None:
+            for start in range(0, len(self._content), chunk_size):
+                yield self._content[start:start + chunk_size]
+            return
+        try:
+            while chunk := self._raw.read(chunk_size):
+                yield chunk
+        except (OSError, http.client.HTTPException) as e:
+            self._discard()
+            raise TransportError(f"Connection broken while reading the response: {e!r}") from e
+        self.close()
+
+    def close(self) -> None:
+        # A fully read response hands its connection back for the next request. Anything else can't be reused.
+        if self._connection is None:
+            return
+        if self._raw.isclosed() and not self._raw.will_close:
+            self._transport._release(self._key, self._connection)
+            self._connection = None
+        else:
+            self._discard()
+
+    def _discard(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} [{self.status_code}]>"
+
+
+class HttpClientTransport:
+    def __init__(self, pool_maxsize: int = 10, keep_alive: bool = True, max_redirects: int = 10, ssl_context: Any = None):
+        """
+        A transport on http.client, for Msgraph's session argument (or build_session(transport="http.client")).
+
+        Requires:
+
+        OPTIONAL: Maximum number of idle connections kept alive per host.
+
+        OPTIONAL: Whether to keep connections alive between requests.
+
+        OPTIONAL: How many redirects to follow before giving up.
+
+        OPTIONAL: An ssl.SSLContext for https connections. The default one is made when the first one opens.
+        """
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.max_redirects = max_redirects
+        self.headers: dict[str, str] = {"User-Agent": USER_AGENT, "Accept": "*/*"}
+        if not keep_alive:
+            self.headers["Connection"] = "close"
+        self._ssl_context = ssl_context
+        self._idle: dict[tuple, list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        headers: Mapping[str, str] | None = None,
+        params: Mapping[str, Any] | None = None,
+        json: Any = None,
+        data: Any = None,
+        timeout: float | tuple[float, float] | None = None,
+        stream: bool = False,
+    ) -> HttpClientResponse:
+        """
+        Sends a request, following redirects. Without stream, the body is read before this returns.
+        Raises TransportError when the connection fails, times out, or the server sends something that isn't HTTP.
+        """
+        if params:
+            url = f"{url}{'&' if urlsplit(url).query else '?'}{urlencode(params, doseq=True)}"
+        sent = {**self.headers, **(headers or {})}
+        body = _encode_body(sent, json, data)
+        if body is not None or method in ("POST", "PUT", "PATCH"):
+            sent["Content-Length"] = str(len(body or b""))
+
+        for _ in range(self.max_redirects + 1):
+            response = self._send(method, url, sent, body, timeout)
+            location = response.headers.get("Location")
+            if response.status_code not in _REDIRECTS or not location:
+                if not stream:
+                    response.content  # noqa: B018 : Reads the body, which hands the connection back.
+                return response
+            response.content  # noqa: B018 : Redirect bodies are tiny. Reading them keeps the connection.
+            response.close()
+            target = urljoin(url, location)
+            if urlsplit(target).netloc != urlsplit(url).netloc:
+                sent = {key: value for key, value in sent.items() if key.lower() != "authorization"}
+            if (response.status_code == 303 and method != "HEAD") or (response.status_code in (301, 302) and method == "POST"):
+                method, body = "GET", None
+                sent = {key: value for key, value in sent.items() if key.lower() not in ("content-length", "content-type")}
+            url = target
+        raise TransportError(f"Exceeded {self.max_redirects} redirects.")
+
+    def close(self) -> None:
+        """
+        Closes the idle connections. The transport can still be used afterwards, it just opens new ones.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+    def _send(self, method: str, url: str, headers: dict, body: bytes | None, timeout: float | tuple[float, float] | None) -> HttpClientResponse:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise TransportError(f"Invalid URL {url!r}.")
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        target = f"{parts.path or '/'}?{parts.query}" if parts.query else parts.path or "/"
+        connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        while True:
+            connection, reused = self._checkout(key, connect_timeout)
+            started = time.monotonic()
+            try:
+                if connection.sock is None:
+                    connection.connect()
+                connection.sock.settimeout(read_timeout)
+                connection.request(method, target, body, headers)
+                raw = connection.getresponse()
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                if reused and isinstance(e, ConnectionError):
+                    continue  # The server closed it while it sat in the pool. Try again on a fresh one.
+                raise TransportError(f"{e.__class__.__name__}: {e}") from e
+            return HttpClientResponse(self, key, connection, raw, SentRequest(method, url, headers), time.monotonic() - started)
+
+    def _checkout(self, key: tuple, timeout: float | None) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        scheme, host, port = key
+        if scheme == "http":
+            return http.client.HTTPConnection(host, port, timeout=timeout), False
+        return http.client.HTTPSConnection(host, port, timeout=timeout, context=self._context()), False
+
+    def _release(self, key: tuple, connection: http.client.HTTPConnection) -> None:
+        if self.keep_alive:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.pool_maxsize:
+                    idle.append(connection)
+                    return
+        connection.close()
+
+    def _context(self) -> Any:
+        # Loading the CA certificates takes a while, so it's done once, and only once there's an https URL to talk to.
+        with self._lock:
+            if self._ssl_context is None:
+                import ssl
+                self._ssl_context = ssl.create_default_context()
+            return self._ssl_context
+
+
+def _encode_body(headers: dict, json: Any, data: Any) -> bytes | None:
+    # The same rules as requests: dicts go form-encoded, json is serialized, strings are UTF-8.
+    content_type = None
+    if data is not None:
+        if isinstance(data, Mapping):
+            body, content_type = urlencode(data, doseq=True).encode(), "application/x-www-form-urlencoded"
+        else:
+            body = data.encode() if isinstance(data, str) else bytes(data)
+    elif json is not None:
+        body, content_type = jsonlib.dumps(json, allow_nan=False).encode(), "application/json"
+    else:
+        return None
+    if content_type is not None and not any(key.lower() == "content-type" for key in headers):
+        headers["Content-Type"] = content_type
+    return body
@@ -0,0 +1,13 @@
+import pytest
+
+
+@pytest.fixture
+
+def test_creds():
+    return {
+        "clientid": "1234567890n",
+        "clientsecret": "1234567890m",
+        "tenantid": "1234567890l",
+        "refresh_token": "1234567890k",
+        "audience": "test.sharepoint.com"
+    }
@@ -0,0 +1,152 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from msgraph.aio import AsyncMsgraph
+from msgraph.msgraph import UPLOAD_CHUNK_MULTIPLE, MsgraphError, MsgraphResponse
+from msgraph.retry import NO_RETRY
+from msgraph.testing import StubGraphServer
+
+# ---------------------------------------------------------------------------------
+#-------------------------- ASYNC CLIENT TESTS ------------------------------------
+
+def async_client(stub: StubGraphServer, **kwargs) -> AsyncMsgraph:
+    return AsyncMsgraph(stub.credentials(), graph_url=stub.graph_url, login_url=stub.login_url, **kwargs)
+
+
+def test_async_methods_return_same_result_objects():
+    async def scenario(stub):
+        async with async_client(stub) as graph:
+            token = await graph.get_access_token("graph")
+            assert isinstance(token, MsgraphResponse)
+            siteid = await graph.get_siteid(token.unwrap(), "Communications_site")
+            driveid = await graph.get_driveid(token.unwrap(), siteid.unwrap())
+            listing = await graph.list_files_sharepoint(token.unwrap(), siteid.unwrap(), driveid.unwrap())
+            mail = await graph.send_email(token.unwrap(), "subject", "body", ["test@test.com"])
+            invalid = await graph.get_access_token("invalid_mode")
+            return siteid, listing, mail, invalid
+
+    with StubGraphServer() as stub, stub.client() as sync_graph:
+        siteid, listing, mail, invalid = asyncio.run(scenario(stub))
+        assert siteid.as_dict() == sync_graph.get_siteid("token", "Communications_site").as_dict()
+        assert listing.is_ok
+        assert mail.is_ok
+        assert len(stub.sent_mail) == 1
+        assert isinstance(invalid, MsgraphError)
+
+def test_async_concurrency_limit():
+    async def scenario(stub):
+        async with async_client(stub, concurrency=4) as graph:
+            return await asyncio.gather(*(graph.get_siteid("token", f"site{i}") for i in range(40)))
+
+    with StubGraphServer(latency=0.01) as stub:
+        results = asyncio.run(scenario(stub))
+        assert all(result.is_ok for result in results)
+        assert stub.connections <= 4
+
+def test_async_concurrent_token_requests_refresh_once():
+    async def scenario(stub):
+        async with async_client(stub) as graph:
+            return await asyncio.gather(*(graph.get_access_token("graph") for _ in range(20)))
+
+    with StubGraphServer(latency=0.05) as stub:
+        results = asyncio.run(scenario(stub))
+        assert all(result.is_ok for result in results)
+        assert stub.requests == 1
+
+def test_async_upload_and_download_round_trip(tmp_path):
+    content = os.urandom(UPLOAD_CHUNK_MULTIPLE * 2 + 99)
+    source = tmp_path / "source.bin"
+    source.write_bytes(content)
+    (tmp_path / "out").mkdir()
+
+    async def scenario(stub):
+        async with async_client(stub) as graph:
+            uploaded = await graph.upload_to_drive("token", "drive", str(source), "folder/", large_file_threshold=1024, chunk_size=UPLOAD_CHUNK_MULTIPLE)
+            streamed = await graph.download_file_sharepoint("token", "site", "drive", "folder/", "source.bin", str(tmp_path / "out"))
+            ranged = await graph.download_file_sharepoint("token", "site", "drive", "folder/", "source.bin", str(tmp_path), workers=3, range_size=100_000)
+            return uploaded, streamed, ranged
+
+    with StubGraphServer(compress_downloads=True) as stub:  # Only the uncompressed bytes add up to Content-Length.
+        uploaded, streamed, ranged = asyncio.run(scenario(stub))
+        assert uploaded.is_ok and streamed.is_ok and ranged.is_ok
+        assert stub.files["folder/source.bin"] == content
+        assert (tmp_path / "out" / "source.bin").read_bytes() == content
+
+def test_async_connection_error_returns_error_object():
+    async def scenario():
+        creds = {"tenantid": "t", "clientid": "c", "clientsecret": "s", "audience": "a", "refresh_token": "r"}
+        async with AsyncMsgraph(creds, graph_url="http://127.0.0.1:1/v1.0", retry_policy=NO_RETRY) as graph:
+            return await graph.get_siteid("token", "site")
+
+    result = asyncio.run(scenario())
+    assert result.is_err
+    assert result.status_code is None
+
+def test_async_iter_files_follows_every_page():
+    async def scenario(stub):
+        async with async_client(stub) as graph:
+            return [item async for item in graph.iter_files_sharepoint("token", "site", "drive", select=["name"])]
+
+    with StubGraphServer(page_size=7) as stub:
+        for i in range(50):
+            stub.files[f"{i:02}.txt"] = b"x"
+        items = asyncio.run(scenario(stub))
+        assert items == [{"name": f"{i:02}.txt"} for i in range(50)]
+        assert stub.pages_served == 8
+
+def test_async_large_email(tmp_path):
+    large = tmp_path / "large.bin"
+    content = os.urandom(UPLOAD_CHUNK_MULTIPLE * 3)
+    large.write_bytes(content)
+
+    async def scenario(stub):
+        async with async_client(stub) as graph:
+            return await graph.send_email("token", "Subject", "Body", ["a@example.com"], [str(large)], inline_limit=UPLOAD_CHUNK_MULTIPLE)
+
+    with StubGraphServer() as stub:
+        assert asyncio.run(scenario(stub)).is_ok
+        assert stub.sent_mail[0]["message"]["attachments"][0]["name"] == "large.bin"
+        assert stub.largest_request <= UPLOAD_CHUNK_MULTIPLE * 10
+
+def test_async_stream_gives_its_slot_back_while_waiting_to_retry(tmp_path):
+    finished = []
+
+    async def download(graph):
+        result = await graph.download_file_sharepoint("token", "site", "drive", "", "a.txt", str(tmp_path))
+        finished.append("download")
+        return result
+
+    async def lookup(graph):
+        await asyncio.sleep(0.05)  # Once the download is waiting to retry.
+        result = await graph.get_siteid("token", "site")
+        finished.append("lookup")
+        return result
+
+    async def scenario(stub):
+        async with async_client(stub, concurrency=1) as graph:
+            return await asyncio.gather(download(graph), lookup(graph))
+
+    with StubGraphServer() as stub:
+        stub.files["a.txt"] = b"a"
+        stub.fail_next(1, 503, headers={"Retry-After": "0.3"}, match="a.txt")
+        results = asyncio.run(scenario(stub))
+        assert all(result.is_ok for result in results)
+        assert finished == ["lookup", "download"]
+
+def test_async_upload_large_file_reports_progress(tmp_path):
+    content = os.urandom(UPLOAD_CHUNK_MULTIPLE * 2 + 10)
+    source = tmp_path / "source.bin"
+    source.write_bytes(content)
+    calls = []
+
+    async def scenario(stub):
+        async with async_client(stub) as graph:
+            return await graph.upload_large_file("token", "drive", str(source), chunk_size=UPLOAD_CHUNK_MULTIPLE, progress=calls.append)
+
+    with StubGraphServer() as stub:
+        assert asyncio.run(scenario(stub)).is_ok
+        assert calls == [UPLOAD_CHUNK_MULTIPLE, UPLOAD_CHUNK_MULTIPLE * 2, len(content)]
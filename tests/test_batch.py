@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+from msgraph.testing import StubGraphServer
+
+# ---------------------------------------------------------------------------------
+#-------------------------- JSON BATCH TESTS --------------------------------------
+
+def test_batch_splits_at_twenty_and_keeps_order():
+    with StubGraphServer() as stub, stub.client() as instance:
+        batch = instance.batch("token")
+        for i in range(45):
+            batch.get_siteid(f"site{i}")
+        results = batch.execute()
+        assert len(results) == 45
+        assert all(result.is_ok for result in results)
+        assert [result.unwrap() for result in results] == [instance.get_siteid("token", f"site{i}").unwrap() for i in range(45)]
+        assert stub.batches == 3
+        assert len(batch) == 0
+
+def test_batch_mixes_call_types_and_item_errors():
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.files["folder/a.txt"] = b"a"
+        batch = instance.batch("token")
+        site = batch.get_siteid("Communications_site")
+        drive = batch.get_driveid("siteid")
+        listing = batch.list_files_sharepoint("siteid", "drive", "folder")
+        missing = batch.add(instance._download_item_call("token", "siteid", "drive", "", "missing.txt"))
+        results = batch.execute()
+        assert results[site].unwrap() == "stub.sharepoint.com,site-Communications_site"
+        assert results[drive].unwrap() == "drive-siteid"
+        assert results[listing].unwrap()["value"][0]["name"] == "a.txt"
+        assert results[missing].is_err
+        assert results[missing].status_code == 404
+
+def test_batch_retries_only_throttled_items():
+    with StubGraphServer() as stub, stub.client() as instance, patch("msgraph.batch.time.sleep") as sleep:
+        stub.fail_next(2, 429, headers={"Retry-After": "7"}, match="/sites/stub.sharepoint.com:/sites/slow")
+        batch = instance.batch("token")
+        for site in ("fast1", "slow", "fast2"):
+            batch.get_siteid(site)
+        before = stub.requests
+        results = batch.execute()
+        assert all(result.is_ok for result in results)
+        assert stub.batches == 3
+        # 3 items in the first batch, then the throttled one alone, twice, plus the 3 batch POSTs.
+        assert stub.requests - before == 3 + 1 + 1 + 3
+        sleep.assert_called_with(7.0)
+
+def test_throttled_batch_is_waited_on_once():
+    with StubGraphServer() as stub, stub.client() as instance, patch("msgraph.batch.time.sleep") as sleep:
+        stub.fail_next(1, 429, headers={"Retry-After": "2"}, match="/$batch")
+        batch = instance.batch("token")
+        batch.get_siteid("site")
+        result = batch.execute()[0]
+        assert result.is_ok
+        assert stub.batches == 1
+        # Msgraph doesn't retry the /$batch POST itself, so there's one wait, not one per layer.
+        sleep.assert_called_once_with(2.0)
+
+def test_batch_does_not_resend_non_idempotent_items_on_server_errors():
+    with StubGraphServer() as stub, stub.client() as instance, patch("msgraph.batch.time.sleep") as sleep:
+        stub.fail_next(1, 503, match="/me/sendMail")
+        batch = instance.batch("token")
+        mail = batch.add(instance._send_email_call("token", "Subject", "Body", ["someone@example.com"], None))
+        site = batch.get_siteid("site")
+        results = batch.execute()
+        assert results[mail].is_err
+        assert results[mail].status_code == 503
+        assert results[site].is_ok
+        assert stub.batches == 1
+        assert stub.sent_mail == []
+        sleep.assert_not_called()
+
+def test_batch_gives_up_after_max_retries():
+    with StubGraphServer() as stub, stub.client() as instance, patch("msgraph.batch.time.sleep"):
+        stub.fail_next(10, 429, match="/sites/stub.sharepoint.com:/sites/slow")
+        batch = instance.batch("token", max_retries=1)
+        batch.get_siteid("slow")
+        result = batch.execute()[0]
+        assert result.is_err
+        assert result.status_code == 429
+
+def test_batch_rejects_non_graph_calls():
+    with StubGraphServer() as stub, stub.client() as instance:
+        batch = instance.batch("token")
+        batch.add(instance._token_call("key", "scope"))
+        result = batch.execute()[0]
+        assert result.is_err
+        assert stub.requests == 0
+
+def test_batch_id_lookups_use_the_id_cache():
+    with StubGraphServer() as stub, stub.client() as instance:
+        instance.get_siteid("token", "cached")
+        batch = instance.batch("token")
+        cached = batch.get_siteid("cached")
+        fresh = batch.get_siteid("fresh")
+        before = stub.requests
+        results = batch.execute()
+        assert results[cached].unwrap() == "stub.sharepoint.com,site-cached"
+        assert results[fresh].unwrap() == "stub.sharepoint.com,site-fresh"
+        # The batch POST and the one item in it. The cached lookup isn't sent.
+        assert stub.requests - before == 2
+        # What the batch looked up is cached for single lookups too.
+        assert instance.get_siteid("token", "fresh").unwrap() == "stub.sharepoint.com,site-fresh"
+        assert stub.requests - before == 2
@@ -0,0 +1,106 @@
+import json
+import os
+
+from msgraph.cli import load_job, main, read_checkpoint, run_job
+from msgraph.testing import StubGraphServer
+
+# ---------------------------------------------------------------------------------
+#-------------------------- JOB RUNNER TESTS --------------------------------------
+
+def write_job(tmp_path, stub: StubGraphServer, tasks: list, **settings) -> str:
+    job = {
+        "credentials": stub.credentials(),
+        "client": {"graph_url": stub.graph_url, "login_url": stub.login_url},
+        "workers": 2,
+        "tasks": tasks,
+        **settings,
+    }
+    path = tmp_path / "job.json"
+    path.write_text(json.dumps(job))
+    return str(path)
+
+def make_files(tmp_path, count: int) -> None:
+    (tmp_path / "exports" / "nested").mkdir(parents=True)
+    for index in range(count):
+        (tmp_path / "exports" / f"file{index}.csv").write_bytes(b"x" * (index + 1))
+    (tmp_path / "exports" / "nested" / "deep.csv").write_bytes(b"deep")
+
+def test_job_uploads_downloads_and_mails(tmp_path):
+    make_files(tmp_path, 3)
+    (tmp_path / "summary.txt").write_text("summary")
+    with StubGraphServer() as stub:
+        stub.files["Statements/jan.pdf"] = b"jan"
+        stub.files["Statements/notes.txt"] = b"skip"
+        stub.files["Statements/2023/dec.pdf"] = b"dec"
+        path = write_job(tmp_path, stub, [
+            {"type": "upload", "driveid": "drive", "files": ["exports/**/*.csv"], "destination": "Reports", "root": "exports"},
+            {"type": "download", "site": "Finance", "folder": "Statements", "target": "statements", "pattern": "*.pdf", "recursive": True},
+            {"type": "mail", "subject": "Done", "body": "Uploaded.", "attachments": ["summary.txt"], "messages": [{"to": "a@example.com"}, {"to": ["b@example.com"]}]},
+        ])
+        job = load_job(path)
+        stats = run_job(job)
+        assert stub.files["Reports/file2.csv"] == b"xxx"
+        assert stub.files["Reports/nested/deep.csv"] == b"deep"
+        assert len(stub.sent_mail) == 2
+    assert (tmp_path / "statements" / "jan.pdf").read_bytes() == b"jan"
+    assert (tmp_path / "statements" / "2023" / "dec.pdf").read_bytes() == b"dec"
+    assert not (tmp_path / "statements" / "notes.txt").exists()
+    assert (stats["done"], stats["failed"], stats["skipped"]) == (8, 0, 0)
+    assert stats["kinds"]["upload"]["bytes"] == 1 + 2 + 3 + 4
+    assert not os.path.exists(job["checkpoint"])  # Finished jobs start over next time.
+
+def test_failed_job_resumes_from_its_checkpoint(tmp_path):
+    make_files(tmp_path, 4)
+    with StubGraphServer() as stub:
+        path = write_job(tmp_path, stub, [{"type": "upload", "driveid": "drive", "files": ["exports/*.csv"]}], workers=1)
+        stub.fail_next(1, 400, match="file2.csv")
+        failures = []
+        first = run_job(load_job(path), log=failures.append)
+        assert (first["done"], first["failed"]) == (3, 1)
+        assert "file2.csv" in failures[0]
+        assert len(read_checkpoint(load_job(path)["checkpoint"])) == 3
+
+        stub.requests = 0
+        second = run_job(load_job(path))
+        assert (second["done"], second["failed"], second["skipped"]) == (1, 0, 3)
+        assert "file2.csv" in stub.files
+        assert stub.requests == 2  # A token, and the one upload left.
+
+def test_unreadable_file_fails_its_unit_only(tmp_path, monkeypatch):
+    make_files(tmp_path, 3)
+    gone = str(tmp_path / "exports" / "file1.csv")
+    getsize = os.path.getsize
+
+    def vanished(path):
+        if os.path.abspath(path) == gone:
+            raise FileNotFoundError(path)
+        return getsize(path)
+
+    with StubGraphServer() as stub:
+        path = write_job(tmp_path, stub, [{"type": "upload", "driveid": "drive", "files": ["exports/*.csv"]}])
+        monkeypatch.setattr(os.path, "getsize", vanished)
+        failures = []
+        stats = run_job(load_job(path), log=failures.append)
+        assert (stats["done"], stats["failed"]) == (2, 1)
+        assert "file1.csv" in failures[0]
+        assert sorted(stub.files) == ["file0.csv", "file2.csv"]
+
+def test_process_pool_runs_the_same_job(tmp_path):
+    make_files(tmp_path, 4)
+    with StubGraphServer() as stub:
+        path = write_job(tmp_path, stub, [{"type": "upload", "driveid": "drive", "files": ["exports/*.csv"]}], pool="process")
+        stats = run_job(load_job(path))
+        assert (stats["done"], stats["failed"]) == (4, 0)
+        assert sorted(name for name in stub.files if name.endswith(".csv")) == [f"file{index}.csv" for index in range(4)]
+
+def test_command_line(tmp_path, capsys):
+    make_files(tmp_path, 2)
+    with StubGraphServer() as stub:
+        path = write_job(tmp_path, stub, [{"type": "upload", "driveid": "drive", "files": ["exports/*.csv"]}])
+        assert main(["run", path, "--dry-run"]) == 0
+        assert json.loads(capsys.readouterr().out)["kinds"]["upload"] == {"units": 2, "bytes": 3}
+        assert main(["run", path, "--json"]) == 0
+        assert json.loads(capsys.readouterr().out)["done"] == 2
+    (tmp_path / "broken.json").write_text('{"tasks": [{"type": "teleport"}]}')
+    assert main(["run", str(tmp_path / "broken.json")]) == 2
+    assert "Task 0 needs a \"type\"" in capsys.readouterr().err
@@ -0,0 +1,64 @@
+from msgraph.delta import DeltaTracker
+from msgraph.msgraph import MsgraphError
+from msgraph.testing import StubGraphServer
+
+# ---------------------------------------------------------------------------------
+#-------------------------- DELTA TRACKING TESTS ----------------------------------
+
+def paths(items) -> list[str]:
+    return sorted(DeltaTracker.path_of(item) for item in items)
+
+def test_first_run_lists_everything_then_only_changes(tmp_path):
+    state_path = str(tmp_path / "delta.json")
+    with StubGraphServer(page_size=3) as stub, stub.client() as instance:
+        for i in range(10):
+            stub.put_file(f"docs/{i}.txt", b"x")
+        tracker = instance.delta("token", "site", "drive", state_path)
+        assert paths(tracker.changes()) == sorted(f"docs/{i}.txt" for i in range(10))
+        assert list(tracker.changes()) == []
+
+        stub.put_file("docs/3.txt", b"changed")
+        stub.put_file("new.txt", b"new")
+        stub.delete_file("docs/5.txt")
+        items = list(tracker.changes())
+        assert paths(items) == ["docs/3.txt", "docs/5.txt", "new.txt"]
+        assert [item["name"] for item in items if "deleted" in item] == ["5.txt"]
+
+def test_delta_link_survives_restarts(tmp_path):
+    state_path = str(tmp_path / "delta.json")
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.put_file("a.txt", b"a")
+        assert len(list(instance.delta("token", "site", "drive", state_path).changes())) == 1
+
+        stub.put_file("b.txt", b"b")
+        fresh = instance.delta("token", "site", "drive", state_path)
+        assert paths(fresh.changes()) == ["b.txt"]
+        assert list(instance.delta("token", "site", "other-drive", state_path).changes())  # Tracked separately.
+
+def test_interrupted_run_is_repeated():
+    with StubGraphServer(page_size=2) as stub, stub.client() as instance:
+        for i in range(6):
+            stub.put_file(f"{i}.txt", b"x")
+        tracker = instance.delta("token", "site", "drive")
+        stub.fail_next(1, 403, match="/delta", after=1)
+        items = list(tracker.changes())
+        assert isinstance(items[-1], MsgraphError)
+        assert tracker.delta_link is None
+        assert len(list(tracker.changes())) == 6
+
+def test_expired_delta_link_resyncs():
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.put_file("a.txt", b"a")
+        tracker = instance.delta("token", "site", "drive")
+        list(tracker.changes())
+        stub.expire_delta_links()
+        assert paths(tracker.changes()) == ["a.txt"]
+        assert tracker.resynced
+
+def test_skip_to_latest():
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.put_file("old.txt", b"old")
+        tracker = instance.delta("token", "site", "drive")
+        assert tracker.skip_to_latest().is_ok
+        stub.put_file("new.txt", b"new")
+        assert paths(tracker.changes()) == ["new.txt"]
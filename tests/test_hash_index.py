@@ -0,0 +1,72 @@
+import hashlib
+import os
+
+from msgraph.hash_index import HashIndex
+from msgraph.hashes import hash_file
+from msgraph.testing import StubGraphServer
+
+# ---------------------------------------------------------------------------------
+#-------------------------- HASH INDEX TESTS --------------------------------------
+
+def touch(path, content: bytes, mtime_ns: int) -> None:
+    path.write_bytes(content)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def test_unchanged_files_are_not_hashed_again(tmp_path):
+    path = tmp_path / "report.csv"
+    touch(path, b"first", 1_000_000_000)
+    index = HashIndex()
+    assert index.digest(str(path)) == hash_file(str(path))
+    assert index.digest(str(path)) == hash_file(str(path))
+    assert (index.hits, index.misses) == (1, 1)
+    touch(path, b"other", 2_000_000_000)  # Same size, new time.
+    assert index.digest(str(path)) == hash_file(str(path))
+    assert index.misses == 2
+    assert index.digest(str(path), "sha1Hash") == hashlib.sha1(b"other").hexdigest().upper()
+
+def test_index_file_survives_between_runs(tmp_path):
+    path = tmp_path / "report.csv"
+    touch(path, b"content", 1_000_000_000)
+    first = HashIndex(str(tmp_path / "hashes.db"))
+    digest = first.digest(str(path))
+    first.close()
+    second = HashIndex(str(tmp_path / "hashes.db"))
+    assert second.digest(str(path)) == digest
+    assert (second.hits, second.misses) == (1, 0)
+    second.invalidate(str(path))
+    second.digest(str(path))
+    assert second.misses == 1
+    second.close()
+
+def test_upload_skips_unchanged_files(tmp_path):
+    path = tmp_path / "report.csv"
+    touch(path, b"a,b,c", 1_000_000_000)
+    with StubGraphServer() as stub:
+        graph = stub.client()
+        token = graph.get_access_token("graph").data
+        assert graph.upload_to_drive(token, "drive", str(path), "Reports/", skip_unchanged=True).is_ok
+        stub.requests = 0
+        result = graph.upload_to_drive(token, "drive", str(path), "Reports/", skip_unchanged=True)
+        assert result.is_ok and result.message == "File unchanged, upload skipped."
+        assert stub.requests == 1  # Only the look at what's there.
+
+        touch(path, b"a,b,d", 2_000_000_000)
+        result = graph.upload_to_drive(token, "drive", str(path), "Reports/", skip_unchanged=True)
+        assert result.message != "File unchanged, upload skipped."
+        assert stub.files["Reports/report.csv"] == b"a,b,d"
+
+def test_upload_many_skips_unchanged_files(tmp_path):
+    for index in range(3):
+        touch(tmp_path / f"file{index}.csv", b"x" * (index + 1), 1_000_000_000)
+    files = [str(tmp_path / f"file{index}.csv") for index in range(3)]
+    with StubGraphServer() as stub:
+        graph = stub.client()
+        token = graph.get_access_token("graph").data
+        stub.files["Reports/file1.csv"] = b"xx"
+        stub.files["Reports/file2.csv"] = b"old"
+        progress = []
+        entries = [(file, "Reports/") for file in files]
+        results = dict(graph.upload_many(token, "drive", entries, skip_unchanged=True, progress=lambda *args: progress.append(args)))
+        assert [results[file].message == "File unchanged, upload skipped." for file in files] == [False, True, False]
+        assert stub.files["Reports/file2.csv"] == b"xxx"
+        assert progress[-1] == (3, 3, 6, 6)
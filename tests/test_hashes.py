@@ -0,0 +1,67 @@
+import base64
+import os
+
+from msgraph.hashes import QuickXorHash, hash_file
+
+# ---------------------------------------------------------------------------------
+#-------------------------- QUICKXORHASH TESTS ------------------------------------
+
+def reference_quickxorhash(data: bytes) -> str:
+    # Line by line port of Microsoft's C# reference implementation, slow but obviously right.
+    width, shift = 160, 11
+    cells = [0, 0, 0]
+    shift_so_far = 0
+    vector_index = shift_so_far // 64
+    vector_offset = shift_so_far % 64
+    for i in range(min(len(data), width)):
+        is_last_cell = vector_index == len(cells) - 1
+        bits_in_cell = 32 if is_last_cell else 64
+        if vector_offset <= bits_in_cell - 8:
+            for j in range(i, len(data), width):
+                cells[vector_index] ^= (data[j] << vector_offset) & 0xFFFFFFFFFFFFFFFF
+        else:
+            index2 = 0 if is_last_cell else vector_index + 1
+            low = bits_in_cell - vector_offset
+            xored = 0
+            for j in range(i, len(data), width):
+                xored ^= data[j]
+            cells[vector_index] ^= (xored << vector_offset) & 0xFFFFFFFFFFFFFFFF
+            cells[index2] ^= xored >> low
+        vector_offset += shift
+        while vector_offset >= bits_in_cell:
+            vector_index = 0 if is_last_cell else vector_index + 1
+            vector_offset -= bits_in_cell
+    result = bytearray(cells[0].to_bytes(8, "little") + cells[1].to_bytes(8, "little") + cells[2].to_bytes(8, "little")[:4])
+    for i, byte in enumerate(len(data).to_bytes(8, "little")):
+        result[12 + i] ^= byte
+    return base64.b64encode(bytes(result)).decode()
+
+
+def test_empty_input():
+    assert QuickXorHash().base64digest() == "AAAAAAAAAAAAAAAAAAAAAAAAAAA="
+
+def test_matches_reference_implementation():
+    for size in (1, 7, 159, 160, 161, 320, 1000, 4099):
+        data = os.urandom(size)
+        assert QuickXorHash(data).base64digest() == reference_quickxorhash(data)
+
+def test_incremental_updates_match_single_update():
+    data = os.urandom(10_000)
+    hasher = QuickXorHash()
+    for start in range(0, len(data), 333):
+        hasher.update(data[start:start + 333])
+    assert hasher.base64digest() == QuickXorHash(data).base64digest()
+
+def test_pieces_hashed_out_of_order_combine():
+    data = os.urandom(5_000)
+    pieces = [(3_000, data[3_000:]), (0, data[:1_234]), (1_234, data[1_234:3_000])]
+    combined = QuickXorHash()
+    for offset, piece in pieces:
+        combined.combine(QuickXorHash(piece, offset=offset))
+    assert combined.base64digest() == QuickXorHash(data).base64digest()
+
+def test_hash_file_reads_in_chunks(tmp_path):
+    data = os.urandom(5000)
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    assert hash_file(str(path), chunk_size=333) == QuickXorHash(data).base64digest()
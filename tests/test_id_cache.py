@@ -0,0 +1,77 @@
+import time
+from unittest.mock import patch
+
+from msgraph.id_cache import IdCache
+from msgraph.retry import NO_RETRY
+from msgraph.testing import StubGraphServer
+
+# ---------------------------------------------------------------------------------
+#-------------------------- ID CACHE TESTS ----------------------------------------
+
+def test_ids_are_resolved_once():
+    with StubGraphServer() as stub, stub.client() as instance:
+        siteid = instance.get_siteid("token", "Communications_site")
+        driveid = instance.get_driveid("token", siteid.unwrap())
+        requests_before = stub.requests
+        assert instance.get_siteid("token", "Communications_site").unwrap() == siteid.unwrap()
+        assert instance.get_driveid("token", siteid.unwrap()).unwrap() == driveid.unwrap()
+        assert stub.requests == requests_before
+        assert instance.id_cache.stats() == {"hits": 2, "misses": 2, "size": 2}
+
+def test_entries_expire():
+    cache = IdCache(ttl=100)
+    with patch("msgraph.id_cache.time.time", return_value=1000.0):
+        cache.set("key", "value", "message")
+    with patch("msgraph.id_cache.time.time", return_value=1099.0):
+        assert cache.get("key").value == "value"
+    with patch("msgraph.id_cache.time.time", return_value=1100.0):
+        assert cache.get("key") is None
+
+def test_least_recently_used_entries_are_dropped():
+    cache = IdCache(max_size=2)
+    cache.set("a", "1", "message")
+    cache.set("b", "2", "message")
+    cache.get("a")
+    cache.set("c", "3", "message")
+    assert cache.get("b") is None
+    assert cache.get("a").value == "1"
+    assert cache.get("c").value == "3"
+
+def test_not_found_is_cached_briefly_other_errors_are_not():
+    with StubGraphServer() as stub, stub.client(retry_policy=NO_RETRY) as instance:
+        stub.fail_next(1, 404, match="/sites/missing")
+        assert instance.get_siteid("token", "missing").status_code == 404
+        cached = instance.get_siteid("token", "missing")
+        assert cached.is_err
+        assert cached.status_code == 404
+
+        with patch("msgraph.id_cache.time.time", return_value=time.time() + 61):
+            assert instance.get_siteid("token", "missing").is_ok  # The negative entry ran out.
+
+        stub.fail_next(1, 503, match="/sites/flaky")
+        assert instance.get_siteid("token", "flaky").status_code == 503
+        assert instance.get_siteid("token", "flaky").is_ok
+
+def test_shared_file_serves_other_processes(tmp_path):
+    path = str(tmp_path / "ids.sqlite")
+    with StubGraphServer() as stub:
+        with stub.client(id_cache_path=path) as first:
+            siteid = first.get_siteid("token", "Communications_site").unwrap()
+        requests_before = stub.requests
+        with stub.client(id_cache_path=path) as second:
+            assert second.get_siteid("token", "Communications_site").unwrap() == siteid
+        assert stub.requests == requests_before
+
+def test_invalidate():
+    with StubGraphServer() as stub, stub.client() as instance:
+        instance.get_siteid("token", "a")
+        instance.get_siteid("token", "b")
+        instance.get_driveid("token", "siteid")
+        requests_before = stub.requests
+        instance.invalidate_ids(site="a")
+        instance.get_siteid("token", "a")
+        instance.get_siteid("token", "b")
+        assert stub.requests == requests_before + 1
+        instance.invalidate_ids()
+        instance.get_driveid("token", "siteid")
+        assert stub.requests == requests_before + 2
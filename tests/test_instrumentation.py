@@ -0,0 +1,72 @@
+import os
+from unittest.mock import patch
+
+from msgraph.instrumentation import Histogram, Instrumentation, endpoint_of
+from msgraph.msgraph import UPLOAD_CHUNK_MULTIPLE
+from msgraph.testing import StubGraphServer
+
+# ---------------------------------------------------------------------------------
+#-------------------------- INSTRUMENTATION TESTS ---------------------------------
+
+GRAPH = "https://graph.microsoft.com/v1.0"
+LOGIN = "https://login.microsoftonline.com"
+
+def test_endpoints_drop_ids_and_paths():
+    assert endpoint_of(f"{GRAPH}/sites/contoso.sharepoint.com:/sites/Team", GRAPH, LOGIN) == "/sites/{host}:/sites/{site}"
+    assert endpoint_of(f"{GRAPH}/sites/abc,123/drives", GRAPH, LOGIN) == "/sites/{id}/drives"
+    assert endpoint_of(f"{GRAPH}/drives/b!x/root:/a/b/file.txt:/content", GRAPH, LOGIN) == "/drives/{id}/root:/{path}:/content"
+    assert endpoint_of(f"{GRAPH}/sites/s/drives/d/root:/a/file.txt?$select=id", GRAPH, LOGIN) == "/sites/{id}/drives/{id}/root:/{path}"
+    assert endpoint_of(f"{GRAPH}/me/messages/AAMk/attachments/createUploadSession", GRAPH, LOGIN) == "/me/messages/{id}/attachments/createUploadSession"
+    assert endpoint_of(f"{LOGIN}/tenant-id/oauth2/v2.0/token", GRAPH, LOGIN) == "/{tenant}/oauth2/v2.0/token"
+    assert endpoint_of("https://contoso.sharepoint.com/upload?session=1", GRAPH, LOGIN) == "contoso.sharepoint.com/*"
+
+def test_histogram_percentiles_stay_within_what_was_seen():
+    histogram = Histogram()
+    for value in [0.002] * 90 + [0.3] * 10:
+        histogram.observe(value)
+    assert histogram.percentile(0.5) <= 0.005
+    assert 0.25 <= histogram.percentile(0.95) <= 0.3
+    assert histogram.percentile(1.0) == 0.3
+    assert histogram.as_dict()["count"] == 100
+
+def test_requests_are_recorded_per_operation_and_endpoint(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(os.urandom(UPLOAD_CHUNK_MULTIPLE * 2))
+    instrumentation = Instrumentation()
+    with StubGraphServer() as stub, stub.client(instrumentation=instrumentation) as instance:
+        instance.get_access_token("graph")
+        instance.upload_to_drive("token", "drive", str(path), "folder/")
+    snapshot = instrumentation.snapshot()
+    assert snapshot["total"]["requests"] == 2
+    assert snapshot["total"]["bytes_sent"] >= UPLOAD_CHUNK_MULTIPLE * 2
+    assert snapshot["operations"]["get_access_token"]["requests"] == 1
+    upload = snapshot["endpoints"]["PUT /drives/{id}/root:/{path}:/content"]
+    assert upload["status_codes"] == {"201": 1}
+    assert upload["latency"]["count"] == 1
+
+def test_retries_and_throttling_are_counted():
+    instrumentation = Instrumentation()
+    with StubGraphServer() as stub, stub.client(instrumentation=instrumentation) as instance, patch("msgraph.msgraph.time.sleep"):
+        stub.fail_next(2, 429, headers={"Retry-After": "1"}, match="/drives")
+        assert instance.get_driveid("token", "site").is_ok
+    stats = instrumentation.snapshot()["operations"]["get_driveid"]
+    assert stats["requests"] == 3
+    assert stats["retries"] == 2
+    assert stats["throttled"] == 2
+    assert stats["status_codes"] == {"429": 2, "200": 1}
+
+def test_hooks_see_every_attempt_and_cannot_break_requests():
+    class Tracer:
+        def __init__(self):
+            self.finished = []
+        def request_started(self, event):
+            event.context["span"] = f"span-{event.attempt}"
+        def request_finished(self, event):
+            self.finished.append((event.context["span"], event.endpoint, event.status_code))
+    class Broken:
+        def request_started(self, event):
+            raise RuntimeError("oops")
+    tracer = Tracer()
+    with StubGraphServer() as stub, stub.client(instrumentation=Instrumentation([Broken(), tracer])) as instance:
+        assert instance.get_siteid("token", "Team").is_ok
+    assert tracer.finished == [("span-0", "GET /sites/{host}:/sites/{site}", 200)]
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from msgraph.items import DriveItem, DriveListing, parse_page
+from msgraph.msgraph import MsgraphError
+from msgraph.testing import StubGraphServer
+
+# ---------------------------------------------------------------------------------
+#-------------------------- DRIVE ITEM AND LISTING TESTS --------------------------
+
+PAGE = {
+    "@odata.context": "https://graph.microsoft.com/v1.0/$metadata#items",
+    "value": [
+        {"id": "1", "name": "a.txt", "size": 10, "lastModifiedDateTime": "2024-01-01T00:00:00Z",
+         "file": {"hashes": {"quickXorHash": "AAA="}}, "createdBy": {"user": {"displayName": "Ann"}}},
+        {"id": "2", "name": "docs", "size": 0, "folder": {"childCount": 3}},
+    ],
+    "@odata.nextLink": "https://graph.microsoft.com/v1.0/next?$skiptoken=2",
+}
+
+def listing(*rows) -> DriveListing:
+    return DriveListing(DriveItem(f"id-{name}", name, size, modified, False, digest) for name, size, modified, digest in rows)
+
+def test_parse_page_reads_items_and_next_link():
+    items, next_link = parse_page(json.dumps(PAGE, indent=2))
+    assert next_link == PAGE["@odata.nextLink"]
+    assert [(item.name, item.size, item.is_folder, item.hash) for item in items] == [("a.txt", 10, False, "AAA="), ("docs", 0, True, None)]
+    assert items[0].modified == 1704067200.0
+    assert items[0].get("createdBy") is None  # Not kept, so not known.
+
+def test_raw_fields_are_parsed_on_demand():
+    items, _ = parse_page(json.dumps(PAGE), keep_raw=True)
+    assert items[0]._data is None
+    assert items[0].get("createdBy")["user"]["displayName"] == "Ann"
+    assert items[0]._data is not None
+
+def test_parse_page_rejects_garbage():
+    assert parse_page('{"value": []}') == ([], None)
+    with pytest.raises(ValueError):
+        parse_page('{"value": [{"id": "1"}')
+    with pytest.raises(ValueError):
+        parse_page("[]")
+
+def test_filter_and_sort_work_on_columns():
+    rows = listing(("b.pdf", 300, 200.0, None), ("a.txt", 100, 100.0, None), ("c.pdf", 50, None, None))
+    assert rows.filter(name="*.pdf").names == ["b.pdf", "c.pdf"]
+    assert rows.filter(min_size=60, max_size=200).names == ["a.txt"]
+    assert rows.filter(modified_after=50).names == ["b.pdf", "a.txt"]  # No time, no match.
+    assert rows.filter(lambda item: item.name.startswith("c")).names == ["c.pdf"]
+    assert rows.sort().names == ["a.txt", "b.pdf", "c.pdf"]
+    assert rows.sort("size", reverse=True).names == ["b.pdf", "a.txt", "c.pdf"]
+    assert rows.sort("modified").names == ["c.pdf", "a.txt", "b.pdf"]
+    assert rows.total_size == 450
+    with pytest.raises(ValueError):
+        rows.sort("colour")
+
+def test_diff_finds_added_removed_and_changed():
+    old = listing(("same", 1, 1.0, "H1"), ("touched", 1, 1.0, "H2"), ("edited", 1, 1.0, "H3"), ("gone", 1, 1.0, None), ("resized", 1, 1.0, None))
+    new = listing(("same", 1, 1.0, "H1"), ("touched", 1, 9.0, "H2"), ("edited", 1, 1.0, "XX"), ("new", 1, 1.0, None), ("resized", 2, 1.0, None))
+    diff = new.diff(old)
+    assert diff.added.names == ["new"]
+    assert diff.removed.names == ["gone"]
+    assert diff.changed.names == ["edited", "resized"]  # Same hash, different time: not a change.
+    assert not listing(("x", 1, 1.0, None)).diff(listing(("x", 1, 1.0, None)))
+
+def test_list_items_reads_every_page():
+    with StubGraphServer(page_size=50) as stub, stub.client() as instance:
+        for i in range(120):
+            stub.files[f"big/{i:03}.bin"] = b"x" * i
+        response = instance.list_items_sharepoint("token", "site", "drive", "big")
+        assert response.is_ok
+        rows = response.data
+        assert len(rows) == 120
+        assert stub.pages_served == 3
+        assert rows[5] == DriveItem(rows.ids[5], "005.bin", 5, rows[5].modified, False, rows.hashes[5])
+        assert rows.filter(min_size=100).names == [f"{i:03}.bin" for i in range(100, 120)]
+
+def test_list_items_failure():
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.fail_next(1, 403, match="/children")
+        assert isinstance(instance.list_items_sharepoint("token", "site", "drive"), MsgraphError)
@@ -0,0 +1,87 @@
+import base64
+import time
+from unittest.mock import patch
+
+import msgraph.mail
+from msgraph.mail import MailMessage
+from msgraph.testing import StubGraphServer
+
+# ---------------------------------------------------------------------------------
+#-------------------------- BULK MAIL TESTS ---------------------------------------
+
+def recipients(count: int) -> list[dict]:
+    return [{"to": [f"user{i}@example.com"], "context": {"name": f"User {i}"}} for i in range(count)]
+
+def test_every_message_is_personalised():
+    with StubGraphServer() as stub, stub.client() as instance:
+        mailer = instance.bulk_mail("token", "Hello $name", "Dear $name, ${missing} stays.", per_minute=6000)
+        results = list(mailer.send(recipients(10)))
+        assert sorted(result.index for result in results) == list(range(10))
+        assert all(result.result.is_ok for result in results)
+        subjects = sorted(mail["message"]["subject"] for mail in stub.sent_mail)
+        assert subjects == sorted(f"Hello User {i}" for i in range(10))
+        assert stub.sent_mail[0]["message"]["body"]["content"].endswith("${missing} stays.")
+        assert mailer.summary()["sent"] == 10
+
+def test_shared_attachments_are_encoded_once(tmp_path):
+    shared, own = tmp_path / "shared.pdf", tmp_path / "own.txt"
+    shared.write_bytes(b"shared bytes")
+    own.write_bytes(b"own bytes")
+    messages = recipients(5) + [MailMessage(["extra@example.com"], subject="Extra", attachments=[str(own)])]
+    with StubGraphServer() as stub, stub.client() as instance:
+        with patch("msgraph.mail._read_attachment_as_base64", wraps=msgraph.mail._read_attachment_as_base64) as read:
+            results = list(instance.bulk_mail("token", "Hi", "Body", [str(shared)], per_minute=6000).send(messages))
+        assert all(result.result.is_ok for result in results)
+        assert read.call_count == 2  # Once for the shared file, once for the extra message's own.
+        for mail in stub.sent_mail:
+            attachments = mail["message"]["attachments"]
+            assert base64.b64decode(attachments[0]["contentBytes"]) == b"shared bytes"
+        extra = next(mail for mail in stub.sent_mail if mail["message"]["subject"] == "Extra")
+        assert [attachment["name"] for attachment in extra["message"]["attachments"]] == ["shared.pdf", "own.txt"]
+
+def test_send_rate_is_limited():
+    with StubGraphServer() as stub, stub.client() as instance:
+        mailer = instance.bulk_mail("token", "Hi", "Body", workers=4, per_minute=600)
+        started = time.monotonic()
+        list(mailer.send(recipients(5)))
+        assert time.monotonic() - started >= 0.35  # 10 a second, the first goes straight away.
+        assert len(stub.sent_mail) == 5
+        assert 0 < mailer.summary()["per_minute"] <= 900  # 5 in just over 0.4s.
+
+def test_failures_are_reported_per_message():
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.fail_next(1, 400, match="/sendMail")
+        mailer = instance.bulk_mail("token", "Hi", "Body", workers=1, per_minute=6000)
+        results = sorted(mailer.send(recipients(3)), key=lambda result: result.index)
+        assert results[0].result.is_err
+        assert results[0].to == ["user0@example.com"]
+        assert all(result.result.is_ok for result in results[1:])
+        assert mailer.summary()["failed"] == 1
+
+def test_large_shared_attachments_go_through_drafts(tmp_path, monkeypatch):
+    shared = tmp_path / "big.bin"
+    shared.write_bytes(b"x" * 1000)
+    monkeypatch.setattr(msgraph.mail, "INLINE_ATTACHMENT_LIMIT", 10)
+    with StubGraphServer() as stub, stub.client() as instance:
+        results = list(instance.bulk_mail("token", "Hi $name", "Body", [str(shared)], per_minute=6000).send(recipients(2)))
+        assert all(result.result.is_ok for result in results)
+        assert len(stub.sent_mail) == 2
+        assert stub.drafts == {}
+
+def test_large_own_attachments_go_through_drafts(tmp_path):
+    own = tmp_path / "own.bin"
+    own.write_bytes(b"x" * 5_000_000)
+    with StubGraphServer() as stub, stub.client() as instance:
+        messages = [MailMessage(["big@example.com"], attachments=[str(own)]), MailMessage(["small@example.com"])]
+        results = list(instance.bulk_mail("token", "Hi", "Body", per_minute=6000).send(messages))
+        assert all(result.result.is_ok for result in results)
+        assert len(stub.sent_mail) == 2
+        assert stub.largest_request < 4_000_000
+
+def test_retries_are_reported_per_message():
+    with StubGraphServer() as stub, stub.client() as instance, patch("msgraph.msgraph.time.sleep"):
+        stub.fail_next(1, 429, headers={"Retry-After": "1"}, match="/sendMail")
+        results = list(instance.bulk_mail("token", "Hi", "Body", workers=1, per_minute=6000).send(recipients(2)))
+        assert all(result.result.is_ok for result in results)
+        assert sorted(result.result.retries for result in results) == [0, 1]
+        assert len(stub.sent_mail) == 2
@@ -1,10 +1,22 @@
+import base64
 import getpass
+import os
+import pickle
 import platform
+import time
 from unittest.mock import patch
 
 import pytest
+import requests
 
-from msgraph.msgraph import Msgraph
+from msgraph.hashes import QuickXorHash
+from msgraph.msgraph import (
+    UPLOAD_CHUNK_MULTIPLE,
+    Msgraph,
+    MsgraphError,
+    MsgraphResponse,
+)
+from msgraph.testing import StubGraphServer
 
 # This is the "tests" file for the project
 # It's the first time I ever wrote any tests, be advised. Any untested cases, open an issue.
@@ -15,6 +27,11 @@ def success_response(*args, **kwargs):
         status_code = 200
         content = bytes("TEST_CONTENT", "utf-8")
         text = "TEST_CONTENT"
+        @property
+        def headers(self): return {}
+        def iter_content(self, chunk_size=1): yield self.content
+        def __enter__(self): return self
+        def __exit__(self, *exc_info): pass
         def json(self): return {
             "access_token": "77777777777777777777777",
             "value": [
@@ -31,29 +48,23 @@ def success_response(*args, **kwargs):
 def error_response(*args, **kwargs):
     class MockResponse:
         status_code = 400
+        content = b"Bad Request"
         text = "Bad Request"
         @property
+        def headers(self): return {}
+        def __enter__(self): return self
+        def __exit__(self, *exc_info): pass
+        @property
         def ok(self): return False
     return MockResponse()
 
 
 
-@pytest.fixture
-
-def test_creds():
-    return {
-        "clientid": "1234567890n",
-        "clientsecret": "1234567890m",
-        "tenantid": "1234567890l",
-        "refresh_token": "1234567890k",
-        "audience": "test.sharepoint.com"
-    }
-
 # ---------------------------------------------------------------------------------
 #-------------------------- GET ACCESS TOKEN TESTS --------------------------------
 
 def test_get_access_token(test_creds):
-    with patch("requests.post", side_effect=success_response):
+    with patch("requests.Session.request", side_effect=success_response):
         instance = Msgraph(credentials=test_creds)
         response = instance.get_access_token("graph")
         assert response.is_ok
@@ -63,7 +74,7 @@ def test_get_access_token(test_creds):
         assert response.is_ok
 
 def test_get_access_token_failure(test_creds):
-    with patch("requests.post", side_effect=error_response):
+    with patch("requests.Session.request", side_effect=error_response):
         instance = Msgraph(credentials=test_creds)
         response = instance.get_access_token("invalid_mode")
         assert response.is_err
@@ -72,13 +83,13 @@ def test_get_access_token_failure(test_creds):
 #-------------------------- GET SITE ID TESTS -------------------------------------
 
 def test_get_siteid(test_creds):
-    with patch("requests.get", side_effect=success_response):
+    with patch("requests.Session.request", side_effect=success_response):
         instance = Msgraph(credentials=test_creds)
         response = instance.get_siteid("77777777777777777777777", "Communications_site")
         assert response.is_ok
 
 def test_get_siteid_failure(test_creds):
-    with patch("requests.get", side_effect=error_response):
+    with patch("requests.Session.request", side_effect=error_response):
         instance = Msgraph(credentials=test_creds)
         response = instance.get_siteid("WRONG_TOKEN", "Communications_site")
         assert response.is_err
@@ -87,13 +98,13 @@ def test_get_siteid_failure(test_creds):
 #-------------------------- GET DRIVE ID TESTS ------------------------------------
 
 def test_get_driveid(test_creds):
-    with patch("requests.get", side_effect=success_response):
+    with patch("requests.Session.request", side_effect=success_response):
         instance = Msgraph(credentials=test_creds)
         response = instance.get_driveid("77777777777777777777777", "CORRECT_SITE_ID")
         assert response.is_ok
 
 def test_get_driveid_failure(test_creds):
-    with patch("requests.get", side_effect=error_response):
+    with patch("requests.Session.request", side_effect=error_response):
         instance = Msgraph(credentials=test_creds)
         response = instance.get_driveid("WRONG_TOKEN", "WRONG_SITE_ID")
         assert response.is_err
@@ -102,7 +113,7 @@ def test_get_driveid_failure(test_creds):
 #-------------------------- DOWNLOAD FILE SHAREPOINT TESTS -----------------------
 
 def test_download_file_sharepoint(test_creds):
-    with patch("requests.get", side_effect=success_response):
+    with patch("requests.Session.request", side_effect=success_response):
         instance = Msgraph(credentials=test_creds)
         if platform.system() == "Windows":
             path = f"C:\\Users\\{getpass.getuser()}\\Desktop"
@@ -112,7 +123,7 @@ def test_download_file_sharepoint(test_creds):
         assert response.is_ok
 
 def test_download_file_sharepoint_failure(test_creds):
-    with patch("requests.get", side_effect=error_response):
+    with patch("requests.Session.request", side_effect=error_response):
         instance = Msgraph(credentials=test_creds)
         if platform.system() == "Windows":
             path = f"C:\\Users\\{getpass.getuser()}\\Desktop"
@@ -121,11 +132,60 @@ def test_download_file_sharepoint_failure(test_creds):
         response = instance.download_file_sharepoint("WRONG_TOKEN", "WRONG_SITE_ID", "WRONG_DRIVE_ID", "testfolder", "test.txt", path)
         assert response.is_err
 
+def test_download_streams_to_disk(tmp_path):
+    content = os.urandom(3 * 1024 * 1024 + 17)
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.files["folder/big.bin"] = content
+        response = instance.download_file_sharepoint("token", "site", "drive", "folder/", "big.bin", str(tmp_path), chunk_size=64 * 1024)
+        assert response.is_ok
+        assert (tmp_path / "big.bin").read_bytes() == content
+        assert not (tmp_path / "big.bin.part").exists()
+
+def test_download_in_parallel_ranges(tmp_path):
+    content = os.urandom(1024 * 1024 + 5)
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.files["folder/big.bin"] = content
+        response = instance.download_file_sharepoint("token", "site", "drive", "folder/", "big.bin", str(tmp_path), workers=4, range_size=100_000)
+        assert response.is_ok
+        assert (tmp_path / "big.bin").read_bytes() == content
+        assert stub.requests == 12
+
+def test_downloads_ask_for_uncompressed_bytes(tmp_path):
+    content = b"compressible " * 50_000
+    with StubGraphServer(compress_downloads=True) as stub, stub.client() as instance:
+        stub.files["big.bin"] = content
+        assert instance.download_file_sharepoint("token", "site", "drive", "", "big.bin", str(tmp_path)).is_ok
+        assert (tmp_path / "big.bin").read_bytes() == content
+        (tmp_path / "big.bin").unlink()
+        assert instance.download_file_sharepoint("token", "site", "drive", "", "big.bin", str(tmp_path), workers=2, range_size=100_000).is_ok
+        assert (tmp_path / "big.bin").read_bytes() == content
+
+def test_download_retries_failed_range(tmp_path):
+    content = os.urandom(500_000)
+    with StubGraphServer() as stub, stub.client() as instance, patch("msgraph.msgraph.time.sleep"):
+        stub.files["big.bin"] = content
+        stub.fail_next(2, 503, match="/download/", after=1)
+        response = instance.download_file_sharepoint("token", "site", "drive", "", "big.bin", str(tmp_path), workers=2, range_size=100_000)
+        assert response.is_ok
+        assert (tmp_path / "big.bin").read_bytes() == content
+
+def test_download_checksum_mismatch_is_an_error(tmp_path):
+    content = os.urandom(500_000)
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.files["big.bin"] = content
+        class WrongHash(QuickXorHash):
+            def base64digest(self): return "AAAAAAAAAAAAAAAAAAAAAAAAAAA="
+        with patch("msgraph.msgraph.QuickXorHash", WrongHash):
+            response = instance.download_file_sharepoint("token", "site", "drive", "", "big.bin", str(tmp_path), workers=2, range_size=100_000)
+        assert response.is_err
+        assert not (tmp_path / "big.bin").exists()
+        assert not (tmp_path / "big.bin.part").exists()
+
 # ---------------------------------------------------------------------------------
 #-------------------------- UPLOAD TO DRIVE TESTS ---------------------------------
 
 def test_upload_to_drive(test_creds):
-    with patch("requests.put", side_effect=success_response):
+    with patch("requests.Session.request", side_effect=success_response):
         instance = Msgraph(credentials=test_creds)
         if platform.system() == "Windows":
             path = f"C:\\Users\\{getpass.getuser()}\\Desktop\\test.txt"
@@ -135,7 +195,7 @@ def test_upload_to_drive(test_creds):
         assert response.is_ok
 
 def test_upload_to_drive_failure(test_creds):
-    with patch("requests.put", side_effect=error_response):
+    with patch("requests.Session.request", side_effect=error_response):
         instance = Msgraph(credentials=test_creds)
         if platform.system() == "Windows":
             path = f"C:\\Users\\{getpass.getuser()}\\Desktop\\test.txt"
@@ -144,11 +204,148 @@ def test_upload_to_drive_failure(test_creds):
         response = instance.upload_to_drive("WRONG_TOKEN", "WRONG_DRIVE_ID", path, "testfolder", "text/plain")
         assert response.is_err
 
+def test_upload_to_drive_missing_file(test_creds, tmp_path):
+    instance = Msgraph(credentials=test_creds)
+    response = instance.upload_to_drive("77777777777777777777777", "CORRECT_DRIVE_ID", str(tmp_path / "missing.txt"))
+    assert response.is_err
+
+def test_upload_small_file_uses_single_put(tmp_path):
+    path = tmp_path / "small.txt"
+    path.write_bytes(b"small file")
+    with StubGraphServer() as stub, stub.client() as instance:
+        response = instance.upload_to_drive("token", "drive", str(path), "folder/")
+        assert response.is_ok
+        assert stub.files["folder/small.txt"] == b"small file"
+        assert not stub.upload_sessions
+
+def test_upload_large_file_in_chunks(tmp_path):
+    content = os.urandom(UPLOAD_CHUNK_MULTIPLE * 3 + 1234)
+    path = tmp_path / "large.bin"
+    path.write_bytes(content)
+    with StubGraphServer() as stub, stub.client() as instance:
+        response = instance.upload_to_drive("token", "drive", str(path), "folder/", large_file_threshold=1024, chunk_size=UPLOAD_CHUNK_MULTIPLE)
+        assert response.is_ok
+        assert stub.files["folder/large.bin"] == content
+        assert stub.requests == 5
+
+def test_upload_large_file_retries_failed_chunk(tmp_path):
+    content = os.urandom(UPLOAD_CHUNK_MULTIPLE * 2)
+    path = tmp_path / "large.bin"
+    path.write_bytes(content)
+    with StubGraphServer() as stub, stub.client() as instance, patch("msgraph.msgraph.time.sleep"):
+        stub.fail_next(1, 500, match="/upload/", after=1)
+        response = instance.upload_large_file("token", "drive", str(path), chunk_size=UPLOAD_CHUNK_MULTIPLE)
+        assert response.is_ok
+        assert stub.files["large.bin"] == content
+
+def test_upload_large_file_backs_off_in_one_place(tmp_path):
+    content = os.urandom(UPLOAD_CHUNK_MULTIPLE * 2)
+    path = tmp_path / "large.bin"
+    path.write_bytes(content)
+    with StubGraphServer() as stub, stub.client() as instance, patch("msgraph.msgraph.time.sleep") as sleep:
+        # More failures than the retry policy allows: the session loop picks up from the session, without waiting again.
+        stub.fail_next(4, 500, match="/upload/", after=1)
+        response = instance.upload_large_file("token", "drive", str(path), chunk_size=UPLOAD_CHUNK_MULTIPLE)
+        assert response.is_ok
+        assert stub.files["large.bin"] == content
+        assert sleep.call_count == 3
+
+def test_upload_large_file_resumes(tmp_path):
+    content = os.urandom(UPLOAD_CHUNK_MULTIPLE * 4)
+    path = tmp_path / "large.bin"
+    path.write_bytes(content)
+    resume_path = tmp_path / "large.bin.upload"
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.fail_next(10, 503, match="/upload/", after=2)
+        with patch("msgraph.msgraph.time.sleep"):
+            response = instance.upload_large_file("token", "drive", str(path), chunk_size=UPLOAD_CHUNK_MULTIPLE, resume_path=str(resume_path), max_chunk_retries=0)
+        assert response.is_err
+        assert resume_path.exists()
+
+        stub.clear_faults()
+        received_before = stub.bytes_received
+        response = instance.upload_large_file("token", "drive", str(path), chunk_size=UPLOAD_CHUNK_MULTIPLE, resume_path=str(resume_path))
+        assert response.is_ok
+        assert stub.files["large.bin"] == content
+        assert stub.bytes_received - received_before == UPLOAD_CHUNK_MULTIPLE * 2
+        assert not resume_path.exists()
+
+def test_upload_large_file_rejects_bad_chunk_size(test_creds):
+    instance = Msgraph(credentials=test_creds)
+    response = instance.upload_large_file("77777777777777777777777", "CORRECT_DRIVE_ID", __file__, chunk_size=1000)
+    assert response.is_err
+
+def test_upload_many_creates_each_folder_once(tmp_path):
+    entries = []
+    for i in range(12):
+        path = tmp_path / f"file{i}.txt"
+        path.write_bytes(f"file {i}".encode())
+        entries.append((str(path), ["a/b/", "a/", "c/"][i % 3], "text/plain"))
+    large = tmp_path / "large.bin"
+    large.write_bytes(os.urandom(UPLOAD_CHUNK_MULTIPLE * 2 + 10))
+    entries.append((str(large), "a/b/"))
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.files["c/existing.txt"] = b"already there"
+        results = list(instance.upload_many("token", "drive", entries, workers=4, large_file_threshold=1024, chunk_size=UPLOAD_CHUNK_MULTIPLE))
+        assert len(results) == 13
+        assert all(result.is_ok for _, result in results)
+        assert stub.folders == {"a", "a/b"}  # "c" was already there (409).
+        assert stub.files["a/b/file0.txt"] == b"file 0"
+        assert stub.files["a/b/large.bin"] == large.read_bytes()
+
+def test_upload_many_reports_progress(tmp_path):
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"file{i}.bin"
+        path.write_bytes(os.urandom(UPLOAD_CHUNK_MULTIPLE if i else UPLOAD_CHUNK_MULTIPLE * 3))
+        paths.append(str(path))
+    calls = []
+    with StubGraphServer() as stub, stub.client() as instance:
+        list(instance.upload_many("token", "drive", paths, large_file_threshold=UPLOAD_CHUNK_MULTIPLE, chunk_size=UPLOAD_CHUNK_MULTIPLE, progress=lambda *args: calls.append(args)))
+    assert calls[-1] == (5, 5, UPLOAD_CHUNK_MULTIPLE * 7, UPLOAD_CHUNK_MULTIPLE * 7)
+    assert [call[2] for call in calls] == sorted(call[2] for call in calls)
+    assert len(calls) > 5  # The chunked file reports every chunk.
+
+def test_upload_many_resumes_interrupted_uploads(tmp_path):
+    content = os.urandom(UPLOAD_CHUNK_MULTIPLE * 4)
+    path = tmp_path / "large.bin"
+    path.write_bytes(content)
+    resume_dir = tmp_path / "resume"
+    resume_dir.mkdir()
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.fail_next(100, 503, match="/upload/", after=2)
+        with patch("msgraph.msgraph.time.sleep"):
+            results = list(instance.upload_many("token", "drive", [str(path)], large_file_threshold=1024, chunk_size=UPLOAD_CHUNK_MULTIPLE, resume_dir=str(resume_dir)))
+        assert results[0][1].is_err
+        assert len(os.listdir(resume_dir)) == 1
+
+        stub.clear_faults()
+        received_before = stub.bytes_received
+        results = list(instance.upload_many("token", "drive", [str(path)], large_file_threshold=1024, chunk_size=UPLOAD_CHUNK_MULTIPLE, resume_dir=str(resume_dir)))
+        assert results[0][1].is_ok
+        assert stub.files["large.bin"] == content
+        assert stub.bytes_received - received_before == UPLOAD_CHUNK_MULTIPLE * 2
+        assert os.listdir(resume_dir) == []
+
+def test_upload_many_failures_stay_per_file(tmp_path):
+    good = tmp_path / "good.txt"
+    good.write_bytes(b"good")
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.fail_next(1, 400, match="/root/children")
+        entries = [(str(good), "broken/deeper/"), (str(good), ""), str(tmp_path / "missing.txt")]
+        results = [result for _, result in instance.upload_many("token", "drive", entries)]
+        assert sum(result.is_ok for result in results) == 1
+        messages = sorted(result.message for result in results if result.is_err)
+        assert messages[0] == "Failed to create folder broken."
+        assert messages[1].startswith("Failed to read file")
+        assert stub.files == {"good.txt": b"good"}
+        assert "broken" not in stub.folders
+
 # ---------------------------------------------------------------------------------
 #-------------------------- SEND EMAIL TESTS --------------------------------------
 
 def test_send_email(test_creds):
-    with patch("requests.post", side_effect=success_response):
+    with patch("requests.Session.request", side_effect=success_response):
         instance = Msgraph(credentials=test_creds)
         if platform.system() == "Windows":
             path = f"C:\\Users\\{getpass.getuser()}\\Desktop\\test.txt"
@@ -164,7 +361,7 @@ def test_send_email(test_creds):
         assert response.is_ok
 
 def test_send_email_failure(test_creds):
-    with patch("requests.post", side_effect=error_response):
+    with patch("requests.Session.request", side_effect=error_response):
         instance = Msgraph(credentials=test_creds)
         if platform.system() == "Windows":
             path = f"C:\\Users\\{getpass.getuser()}\\Desktop\\test.txt"
@@ -179,19 +376,173 @@ def test_send_email_failure(test_creds):
             )
         assert response.is_err
 
+def test_small_attachments_go_in_one_request(tmp_path):
+    path = tmp_path / "small.txt"
+    path.write_bytes(b"small")
+    with StubGraphServer() as stub, stub.client() as instance:
+        assert instance.send_email("token", "Subject", "Body", ["a@example.com"], [str(path)]).is_ok
+        assert stub.drafts == {}
+        assert stub.sent_mail[0]["message"]["attachments"][0]["name"] == "small.txt"
+
+def test_large_attachments_go_through_a_draft(tmp_path):
+    small, large = tmp_path / "small.txt", tmp_path / "large.bin"
+    small.write_bytes(b"small")
+    large_content = os.urandom(UPLOAD_CHUNK_MULTIPLE * 5 + 123)
+    large.write_bytes(large_content)
+    with StubGraphServer() as stub, stub.client() as instance:
+        response = instance.send_email("token", "Subject", "Body", ["a@example.com"], [str(small), str(large)], inline_limit=UPLOAD_CHUNK_MULTIPLE)
+        assert response.is_ok
+        message = stub.sent_mail[0]["message"]
+        assert message["subject"] == "Subject"
+        attachments = {attachment["name"]: base64.b64decode(attachment["contentBytes"]) for attachment in message["attachments"]}
+        assert attachments == {"small.txt": b"small", "large.bin": large_content}
+        assert stub.drafts == {}
+
+def test_large_email_requests_stay_chunk_sized(tmp_path):
+    large = tmp_path / "large.bin"
+    large.write_bytes(os.urandom(UPLOAD_CHUNK_MULTIPLE * 8))
+    with StubGraphServer() as stub, stub.client() as instance:
+        response = instance.send_large_email("token", "Subject", "Body", ["a@example.com"], [str(large)], inline_limit=0, chunk_size=UPLOAD_CHUNK_MULTIPLE)
+        assert response.is_ok
+        assert stub.largest_request == UPLOAD_CHUNK_MULTIPLE
+
+def test_failed_attachment_deletes_the_draft(tmp_path):
+    large = tmp_path / "large.bin"
+    large.write_bytes(os.urandom(UPLOAD_CHUNK_MULTIPLE * 2))
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.fail_next(1, 400, match="/createUploadSession")
+        response = instance.send_large_email("token", "Subject", "Body", ["a@example.com"], [str(large)], inline_limit=0)
+        assert response.is_err
+        assert stub.drafts == {}
+        assert stub.sent_mail == []
+
 # ---------------------------------------------------------------------------------
 #-------------------------- LIST FILES SHAREPOINT TESTS ---------------------------
 
 def test_list_files_sharepoint(test_creds):
-    with patch("requests.get", side_effect=success_response):
+    with patch("requests.Session.request", side_effect=success_response):
         instance = Msgraph(credentials=test_creds)
         response = instance.list_files_sharepoint("77777777777777777777777", "CORRECT_SITE_ID", "CORRECT_DRIVE_ID", "testfolder")
         assert response.is_ok
 
 def test_list_files_sharepoint_failure(test_creds):
-    with patch("requests.get", side_effect=error_response):
+    with patch("requests.Session.request", side_effect=error_response):
         instance = Msgraph(credentials=test_creds)
         response = instance.list_files_sharepoint("WRONG_TOKEN", "WRONG_SITE_ID", "WRONG_DRIVE_ID", "testfolder")
         assert response.is_err
 
+def test_iter_files_follows_every_page():
+    with StubGraphServer(page_size=100) as stub, stub.client() as instance:
+        for i in range(450):
+            stub.files[f"big folder/{i:04}.txt"] = b"x" * i
+        items = list(instance.iter_files_sharepoint("token", "site", "drive", "big folder"))
+        assert [item["name"] for item in items] == [f"{i:04}.txt" for i in range(450)]
+        assert stub.pages_served == 5
+
+def test_iter_files_select_and_top():
+    with StubGraphServer() as stub, stub.client() as instance:
+        for i in range(10):
+            stub.files[f"{i}.txt"] = b"x"
+        items = list(instance.iter_files_sharepoint("token", "site", "drive", select=["name", "size"], top=3, prefetch=False))
+        assert len(items) == 10
+        assert items[0] == {"name": "0.txt", "size": 1}
+        assert stub.pages_served == 4
+
+def test_item_padding_is_dropped_by_select():
+    with StubGraphServer(item_padding=2000) as stub, stub.client() as instance:
+        stub.files["a.txt"] = b"x"
+        assert len(instance.list_files_sharepoint("token", "site", "drive").data["value"][0]["description"]) == 2000
+        assert "description" not in next(instance.iter_files_sharepoint("token", "site", "drive", select=["name"]))
+
+def test_iter_files_prefetches_next_page():
+    with StubGraphServer(page_size=10) as stub, stub.client() as instance:
+        for i in range(30):
+            stub.files[f"{i:02}.txt"] = b"x"
+        items = instance.iter_files_sharepoint("token", "site", "drive")
+        next(items)
+        for _ in range(100):
+            if stub.pages_served == 2:
+                break
+            time.sleep(0.01)
+        assert stub.pages_served == 2  # Fetched while we're still on the first page.
+        items.close()
+
+def test_iter_files_ends_with_error():
+    with StubGraphServer(page_size=10) as stub, stub.client() as instance:
+        for i in range(30):
+            stub.files[f"{i:02}.txt"] = b"x"
+        stub.fail_next(1, 403, match="/children", after=1)
+        items = list(instance.iter_files_sharepoint("token", "site", "drive"))
+        assert len(items) == 11
+        assert isinstance(items[-1], MsgraphError)
+        assert items[-1].status_code == 403
+
 # ---------------------------------------------------------------------------------
+#-------------------------- SESSION POOLING TESTS ---------------------------------
+
+def test_methods_share_one_connection():
+    with StubGraphServer() as stub, stub.client() as instance:
+        token = instance.get_access_token("graph").unwrap()
+        siteid = instance.get_siteid(token, "Communications_site").unwrap()
+        assert instance.get_driveid(token, siteid).is_ok
+        assert instance.list_files_sharepoint(token, siteid, "drive").is_ok
+        assert stub.connections == 1
+
+def test_keep_alive_disabled_opens_new_connections():
+    with StubGraphServer() as stub, stub.client(keep_alive=False) as instance:
+        instance.get_siteid("77777777777777777777777", "Communications_site")
+        instance.get_siteid("77777777777777777777777", "Other_site")
+        assert stub.connections == 2
+
+def test_external_session_is_left_open(test_creds):
+    session = requests.Session()
+    with patch.object(session, "close") as close:
+        with Msgraph(credentials=test_creds, session=session) as instance:
+            assert instance.session is session
+        close.assert_not_called()
+    with patch("requests.Session.close") as close:
+        with Msgraph(credentials=test_creds):
+            pass
+        close.assert_called_once()
+
+def test_timeout_is_passed_to_requests(test_creds):
+    with patch("requests.Session.request", side_effect=success_response) as request:
+        instance = Msgraph(credentials=test_creds, timeout=3)
+        instance.get_siteid("77777777777777777777777", "Communications_site")
+        assert request.call_args.kwargs["timeout"] == 3
+
+def test_connection_error_returns_error_object(test_creds):
+    with patch("requests.Session.request", side_effect=requests.ConnectionError("refused")), patch("msgraph.msgraph.time.sleep"):
+        instance = Msgraph(credentials=test_creds)
+        response = instance.get_siteid("77777777777777777777777", "Communications_site")
+        assert response.is_err
+        assert response.status_code is None
+
+
+# ---------------------------------------------------------------------------------
+#-------------------------- RESULT OBJECT TESTS -----------------------------------
+
+def test_results_keep_the_body_headers_and_timing():
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.files["folder/a.txt"] = b"a"
+        response = instance.list_files_sharepoint("token", "site", "drive", "folder")
+        assert isinstance(response.body, bytes)
+        assert response.headers["Content-Type"].startswith("application/json")
+        assert response.elapsed is not None and response.elapsed >= 0
+        assert response.data is response.json()
+        assert response.data["value"][0]["name"] == "a.txt"
+
+        stub.fail_next(1, 404, match="/children")
+        error = instance.list_files_sharepoint("token", "site", "drive", "folder")
+        assert error.response_content == error.text
+        assert error.json()["error"]["code"] == "injectedFault"
+
+def test_results_are_immutable_and_pickle():
+    response = MsgraphResponse("ok", 200, None, body=memoryview(b'{"id": 1}'), headers={"ETag": "1"}, elapsed=0.5)
+    with pytest.raises(AttributeError):
+        response.message = "changed"
+    assert response.json() == {"id": 1}
+    copy = pickle.loads(pickle.dumps(response))
+    assert (copy.message, copy.body, copy.headers, copy.elapsed, copy.json()) == ("ok", b'{"id": 1}', {"ETag": "1"}, 0.5, {"id": 1})
+    error = pickle.loads(pickle.dumps(MsgraphError("failed", 400, "Bad Request")))
+    assert error.as_dict() == {"message": "failed", "status_code": 400, "response_content": "Bad Request"}
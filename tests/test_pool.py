@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from msgraph.pool import ClientPool
+from msgraph.testing import StubGraphServer
+
+# ---------------------------------------------------------------------------------
+#-------------------------- CLIENT POOL TESTS -------------------------------------
+
+def tenant(stub: StubGraphServer, tenantid: str) -> dict:
+    return {**stub.credentials(), "tenantid": tenantid}
+
+def stub_pool(stub: StubGraphServer, *names: str, **kwargs) -> ClientPool:
+    pool = ClientPool(graph_url=stub.graph_url, login_url=stub.login_url, **kwargs)
+    for name in names:
+        pool.add(name, tenant(stub, name))
+    return pool
+
+def test_tenants_share_the_session_but_not_tokens():
+    with StubGraphServer() as stub, stub_pool(stub, "contoso", "fabrikam") as pool:
+        contoso, fabrikam = pool.client("contoso"), pool.client("fabrikam")
+        assert contoso.session is fabrikam.session is pool.session
+        assert contoso.rate_limiter is None
+        assert contoso.token_cache is not fabrikam.token_cache
+        assert pool.submit("contoso", lambda graph: graph.get_access_token("graph")).result().data == "stub-access-token-contoso"
+        assert pool.submit("fabrikam", lambda graph: graph.get_access_token("graph")).result().data == "stub-access-token-fabrikam"
+        with pytest.raises(KeyError):
+            pool.submit("unknown", lambda graph: None)
+
+def test_busy_tenant_does_not_starve_the_others():
+    order = []
+    gate = threading.Event()
+    with StubGraphServer() as stub, stub_pool(stub, "noisy", "quiet", workers=1) as pool:
+        pool.submit("noisy", lambda graph: gate.wait(5))
+        for index in range(5):
+            pool.submit("noisy", lambda graph, index: order.append(f"noisy{index}"), index)
+        futures = [pool.submit("quiet", lambda graph, index: order.append(f"quiet{index}"), index) for index in range(2)]
+        gate.set()
+        for future in futures:
+            future.result(5)
+        assert order.index("quiet1") < 4  # Taking turns, not waiting for all five.
+        assert pool.stats()["quiet"]["completed"] == 2
+
+def test_per_tenant_limit_caps_concurrency():
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def task(graph):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    with StubGraphServer() as stub, stub_pool(stub, "contoso", workers=4, per_tenant=2) as pool:
+        futures = [pool.submit("contoso", task) for _ in range(8)]
+        for future in futures:
+            future.result(5)
+    assert peak[0] == 2
+
+def test_idle_clients_are_evicted_and_keep_rotated_refresh_tokens():
+    with StubGraphServer() as stub, stub_pool(stub, "contoso", "fabrikam", idle_timeout=3600, max_clients=1) as pool:
+        first = pool.client("contoso")
+        first.refresh_token = "rotated"
+        pool.client("fabrikam")  # One too many: contoso was idle the longest.
+        assert pool.stats()["contoso"]["alive"] is False
+        again = pool.client("contoso")
+        assert again is not first
+        assert again.refresh_token == "rotated"
+        pool.idle_timeout = 0
+        assert sorted(pool.evict_idle()) == ["contoso"]
+
+def test_errors_reach_the_future_and_closed_pools_refuse_work():
+    with StubGraphServer() as stub:
+        pool = stub_pool(stub, "contoso")
+        future = pool.submit("contoso", lambda graph: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            future.result(5)
+        pool.close()
+        with pytest.raises(RuntimeError):
+            pool.submit("contoso", lambda graph: None)
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from msgraph.msgraph import Msgraph
+from msgraph.retry import NO_RETRY, RateLimiter, RetryPolicy
+from msgraph.testing import StubGraphServer
+
+# ---------------------------------------------------------------------------------
+#-------------------------- RETRY AND RATE LIMIT TESTS ----------------------------
+
+def test_retry_after_is_honored_and_reported():
+    with StubGraphServer() as stub, stub.client() as instance, patch("msgraph.msgraph.time.sleep") as sleep:
+        stub.fail_next(2, 429, headers={"Retry-After": "3"}, match="/sites/")
+        response = instance.get_siteid("token", "Communications_site")
+        assert response.is_ok
+        assert response.retries == 2
+        assert response.retry_time >= 0
+        assert [call.args[0] for call in sleep.call_args_list] == [3.0, 3.0]
+
+def test_backoff_is_exponential_and_capped():
+    policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+    delays = [policy.next_delay(attempt, "GET", 503, {}, 0) for attempt in range(3)]
+    assert delays == [1, 2, 4]
+    assert RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False, max_retries=10).next_delay(6, "GET", 503, {}, 0) == 5
+    assert policy.next_delay(3, "GET", 503, {}, 0) is None
+    assert policy.next_delay(0, "GET", 404, {}, 0) is None
+    assert RetryPolicy(max_total_time=1).next_delay(0, "GET", 429, {"Retry-After": "5"}, 0) is None
+
+def test_retry_policy_per_method():
+    with StubGraphServer() as stub, stub.client(retry_policies={"get_siteid": NO_RETRY}) as instance:
+        stub.fail_next(1, 429, headers={"Retry-After": "0"}, match="/sites/")
+        response = instance.get_siteid("token", "Communications_site")
+        assert response.is_err
+        assert response.status_code == 429
+        assert response.retries == 0
+
+        stub.fail_next(1, 429, headers={"Retry-After": "0"}, match="/drives")
+        assert instance.get_driveid("token", "siteid").retries == 1
+
+def test_connection_errors_only_retried_when_safe(test_creds):
+    with patch("requests.Session.request", side_effect=requests.ConnectionError("refused")) as request, patch("msgraph.msgraph.time.sleep"):
+        instance = Msgraph(credentials=test_creds)
+        response = instance.get_siteid("77777777777777777777777", "Communications_site")
+        assert response.is_err
+        assert response.retries == 3
+        assert request.call_count == 4
+
+        request.reset_mock()
+        response = instance.send_email("77777777777777777777777", "Subject", "Body", ["someone@example.com"])
+        assert response.is_err
+        assert request.call_count == 1  # The mail may have gone out. Sending it again could deliver it twice.
+
+def test_server_errors_on_posts_are_not_retried():
+    with StubGraphServer() as stub, stub.client() as instance, patch("msgraph.msgraph.time.sleep"):
+        stub.fail_next(1, 504, match="/sendMail")
+        response = instance.send_email("token", "Subject", "Body", ["someone@example.com"])
+        assert response.is_err and response.status_code == 504
+        assert response.retries == 0
+
+        stub.fail_next(1, 503, headers={"Retry-After": "0"}, match="/sendMail")
+        assert instance.send_email("token", "Subject", "Body", ["someone@example.com"]).retries == 1
+    policy = RetryPolicy(jitter=False)
+    assert policy.next_delay(0, "POST", 503, {}, 0) is None
+    assert policy.next_delay(0, "POST", 429, {}, 0) == 0.5
+    assert RetryPolicy(jitter=False, retry_non_idempotent=True).next_delay(0, "POST", 504, {}, 0) == 0.5
+
+def test_range_retries_on_worker_threads_are_reported(tmp_path):
+    content = os.urandom(500_000)
+    with StubGraphServer() as stub, stub.client() as instance, patch("msgraph.msgraph.time.sleep"):
+        stub.files["big.bin"] = content
+        stub.fail_next(2, 503, match="/download/", after=1)
+        response = instance.download_file_sharepoint("token", "site", "drive", "", "big.bin", str(tmp_path), workers=4, range_size=100_000)
+        assert response.is_ok
+        assert response.retries == 2
+
+def test_rate_limiter_spaces_requests_per_key():
+    limiter = RateLimiter(rate=20, burst=1)
+    started = time.monotonic()
+    for _ in range(3):
+        limiter.acquire("tenant|graph")
+    assert time.monotonic() - started >= 0.09
+    assert limiter.acquire("tenant|login") == 0  # Other keys have their own bucket.
+
+def test_shared_rate_limiter_pauses_every_client_on_429():
+    limiter = RateLimiter(rate=1000)
+    with StubGraphServer() as stub, stub.client(rate_limiter=limiter) as first, stub.client(rate_limiter=limiter) as second:
+        stub.fail_next(1, 429, headers={"Retry-After": "0.5"}, match="/sites/")
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            throttled = pool.submit(first.get_siteid, "token", "Communications_site")
+            time.sleep(0.2)
+            # The first client got a Retry-After of 0.5s. The second one shares its limiter, so it waits too.
+            assert second.get_driveid("token", "siteid").is_ok
+            assert time.monotonic() - started >= 0.45
+            assert throttled.result().retries == 1
+
+def test_stub_throttles_past_its_rate_and_clients_keep_up():
+    with StubGraphServer(throttle_rate=20, throttle_burst=5, throttle_retry_after=0.05) as stub, stub.client() as instance:
+        results = [instance.get_driveid("token", f"site{i}") for i in range(15)]
+        assert all(result.is_ok for result in results)
+        assert stub.throttled > 0
+        assert sum(result.retries for result in results) == stub.throttled
+
+def test_async_retries_are_reported():
+    pytest.importorskip("httpx")
+    from msgraph.aio import AsyncMsgraph
+
+    async def scenario(stub):
+        async with AsyncMsgraph(stub.credentials(), graph_url=stub.graph_url, login_url=stub.login_url, retry_policy=RetryPolicy(backoff_factor=0.01)) as graph:
+            return await asyncio.gather(*(graph.get_siteid("token", f"site{i}") for i in range(5)))
+
+    with StubGraphServer() as stub:
+        stub.fail_next(3, 503, match="/sites/")
+        results = asyncio.run(scenario(stub))
+        assert all(result.is_ok for result in results)
+        assert sum(result.retries for result in results) == 3
@@ -0,0 +1,94 @@
+import os
+import time
+
+from msgraph.msgraph import MsgraphError
+from msgraph.testing import StubGraphServer
+
+# ---------------------------------------------------------------------------------
+#-------------------------- FOLDER SYNC TESTS -------------------------------------
+
+TREE = {
+    "lib/a.txt": b"alpha",
+    "lib/sub/b.txt": b"bravo",
+    "lib/sub/deep/c.txt": b"charlie",
+    "lib/other/d.txt": b"delta",
+    "elsewhere.txt": b"not synced",
+}
+
+def read_tree(root) -> dict:
+    files = {}
+    for folder, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(folder, name)
+            with open(path, "rb") as file:
+                files[os.path.relpath(path, root).replace(os.sep, "/")] = file.read()
+    return files
+
+def test_walk_lists_nested_folders():
+    with StubGraphServer(page_size=2) as stub, stub.client() as instance:
+        stub.files.update(TREE)
+        files = instance.sync("token", "site", "drive").walk("lib")
+        assert sorted(files) == ["a.txt", "other/d.txt", "sub/b.txt", "sub/deep/c.txt"]
+        assert files["sub/b.txt"]["size"] == 5
+
+def test_walk_failure_is_an_error():
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.files.update(TREE)
+        stub.fail_next(1, 403, match="/children", after=1)
+        assert isinstance(instance.sync("token", "site", "drive").walk("lib"), MsgraphError)
+
+def test_download_only_transfers_changes(tmp_path):
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.files.update(TREE)
+        sync = instance.sync("token", "site", "drive")
+        summary = sync.download("lib", str(tmp_path)).unwrap()
+        assert read_tree(tmp_path) == {key[4:]: value for key, value in TREE.items() if key.startswith("lib/")}
+        assert len(summary.transferred) == 4
+        assert summary.bytes_transferred == 22
+
+        assert sync.download("lib", str(tmp_path)).unwrap().transferred == []
+
+        stub.files["lib/sub/b.txt"] = b"BRAVO"
+        stub.modified["lib/sub/b.txt"] = time.time() + 60
+        summary = sync.download("lib", str(tmp_path)).unwrap()
+        assert [(action.path, action.reason) for action in summary.transferred] == [("sub/b.txt", "content")]
+        assert (tmp_path / "sub" / "b.txt").read_bytes() == b"BRAVO"
+
+def test_same_content_with_other_time_is_skipped(tmp_path):
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.files["lib/a.txt"] = b"alpha"
+        (tmp_path / "a.txt").write_bytes(b"alpha")
+        os.utime(tmp_path / "a.txt", (0, 0))
+        summary = instance.sync("token", "site", "drive").download("lib", str(tmp_path)).unwrap()
+        assert summary.actions == []
+        assert summary.skipped == 1
+        assert abs(os.path.getmtime(tmp_path / "a.txt") - stub.started) <= 2  # Touched, so the next run doesn't hash.
+
+def test_dry_run_changes_nothing(tmp_path):
+    with StubGraphServer() as stub, stub.client() as instance:
+        stub.files.update(TREE)
+        response = instance.sync("token", "site", "drive").download("lib", str(tmp_path), dry_run=True)
+        summary = response.unwrap()
+        assert sorted(action.path for action in summary.actions) == ["a.txt", "other/d.txt", "sub/b.txt", "sub/deep/c.txt"]
+        assert all(action.result is None for action in summary.actions)
+        assert read_tree(tmp_path) == {}
+        assert "Dry run" in response.message
+
+def test_upload_only_transfers_changes(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.txt").write_bytes(b"alpha")
+    (tmp_path / "sub" / "b.txt").write_bytes(b"bravo")
+    with StubGraphServer() as stub, stub.client() as instance:
+        sync = instance.sync("token", "site", "drive")
+        summary = sync.upload(str(tmp_path), "backup").unwrap()
+        assert stub.files == {"backup/a.txt": b"alpha", "backup/sub/b.txt": b"bravo"}
+        assert summary.as_dict()["transferred"] == 2
+
+        requests_before = stub.requests
+        assert sync.upload(str(tmp_path), "backup").unwrap().actions == []
+        assert stub.requests - requests_before == 2  # Just the two folder listings.
+
+        (tmp_path / "sub" / "b.txt").write_bytes(b"BRAVO!")
+        summary = sync.upload(str(tmp_path), "backup").unwrap()
+        assert [(action.path, action.reason) for action in summary.actions] == [("sub/b.txt", "size")]
+        assert stub.files["backup/sub/b.txt"] == b"BRAVO!"
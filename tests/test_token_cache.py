@@ -0,0 +1,124 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from msgraph.msgraph import Msgraph
+from msgraph.testing import StubGraphServer
+from msgraph.token_cache import TokenCache
+
+# ---------------------------------------------------------------------------------
+#-------------------------- TOKEN CACHE TESTS -------------------------------------
+
+def token_response(access_token="77777777777777777777777", expires_in=3600, refresh_token=None):
+    class MockResponse:
+        status_code = 200
+        ok = True
+        content = b"TEST_CONTENT"
+        text = "TEST_CONTENT"
+        @property
+        def headers(self): return {}
+        def json(self):
+            payload = {"access_token": access_token, "expires_in": expires_in}
+            if refresh_token:
+                payload["refresh_token"] = refresh_token
+            return payload
+    return MockResponse()
+
+
+def error_response(*args, **kwargs):
+    class MockResponse:
+        status_code = 400
+        ok = False
+        content = b"Bad Request"
+        text = "Bad Request"
+        @property
+        def headers(self): return {}
+    return MockResponse()
+
+
+def test_token_is_cached_per_mode(test_creds):
+    with patch("requests.Session.request", return_value=token_response()) as request:
+        instance = Msgraph(credentials=test_creds)
+        assert instance.get_access_token("graph").is_ok
+        assert instance.get_access_token("graph").is_ok
+        assert request.call_count == 1
+        assert instance.get_access_token("outlook").is_ok
+        assert request.call_count == 2
+
+def test_token_close_to_expiry_is_refreshed(test_creds):
+    with patch("requests.Session.request", return_value=token_response(expires_in=60)) as request:
+        instance = Msgraph(credentials=test_creds)
+        instance.get_access_token("graph")
+        instance.get_access_token("graph")
+        assert request.call_count == 2
+
+def test_force_refresh_skips_cache(test_creds):
+    with patch("requests.Session.request", return_value=token_response()) as request:
+        instance = Msgraph(credentials=test_creds)
+        instance.get_access_token("graph")
+        instance.get_access_token("graph", force_refresh=True)
+        assert request.call_count == 2
+
+def test_failed_fetch_is_not_cached(test_creds):
+    with patch("requests.Session.request", side_effect=error_response):
+        instance = Msgraph(credentials=test_creds)
+        assert instance.get_access_token("graph").is_err
+    with patch("requests.Session.request", return_value=token_response()):
+        assert instance.get_access_token("graph").is_ok
+
+def test_rotated_refresh_token_is_used(test_creds):
+    with patch("requests.Session.request", return_value=token_response(refresh_token="ROTATED")) as request:
+        instance = Msgraph(credentials=test_creds)
+        instance.get_access_token("graph")
+        assert instance.refresh_token == "ROTATED"
+        instance.get_access_token("outlook")
+        assert request.call_args.kwargs["data"]["refresh_token"] == "ROTATED"
+
+def test_concurrent_callers_refresh_once():
+    with StubGraphServer(latency=0.05) as stub, stub.client() as instance:
+        start = threading.Barrier(16)
+        def fetch():
+            start.wait()
+            return instance.get_access_token("graph")
+        with ThreadPoolExecutor(16) as pool:
+            results = list(pool.map(lambda _: fetch(), range(16)))
+        assert all(result.is_ok for result in results)
+        assert stub.requests == 1
+
+def test_file_cache_is_shared_between_instances(test_creds, tmp_path):
+    path = str(tmp_path / "tokens.json")
+    with patch("requests.Session.request", return_value=token_response(refresh_token="ROTATED")) as request:
+        Msgraph(credentials=test_creds, token_cache_path=path).get_access_token("graph")
+        other = Msgraph(credentials=test_creds, token_cache_path=path)
+        assert other.get_access_token("graph").unwrap() == "77777777777777777777777"
+        assert other.refresh_token == "ROTATED"
+        assert request.call_count == 1
+    if os.name == "posix":
+        assert os.stat(path).st_mode & 0o077 == 0
+
+def test_corrupt_cache_file_is_ignored(tmp_path):
+    path = tmp_path / "tokens.json"
+    path.write_text("{not json")
+    cache = TokenCache(str(path))
+    assert cache.get("key") is None
+    cache.set("key", "token", 3600)
+    assert TokenCache(str(path)).get("key") == "token"
+
+def test_audiences_and_users_do_not_share_tokens():
+    cache = TokenCache()
+    with StubGraphServer() as stub:
+        def client(audience, refresh_token):
+            credentials = {**stub.credentials(), "audience": audience, "refresh_token": refresh_token}
+            return Msgraph(credentials, graph_url=stub.graph_url, login_url=stub.login_url, token_cache=cache)
+
+        assert client("a.sharepoint.com", "alice").get_access_token("audience").message == "Token retrieved successfully"
+        other_audience = client("b.sharepoint.com", "alice")
+        other_user = client("a.sharepoint.com", "bob")
+        assert other_user.refresh_token == "bob"  # Not the one rotated for alice.
+        assert other_audience.get_access_token("audience").message == "Token retrieved successfully"
+        assert other_user.get_access_token("audience").message == "Token retrieved successfully"
+        assert stub.requests == 3
+        again = client("a.sharepoint.com", "alice")
+        assert again.refresh_token == "stub-refresh-token"
+        assert again.get_access_token("audience").message == "Token retrieved from cache"
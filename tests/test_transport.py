@@ -0,0 +1,62 @@
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from msgraph.msgraph import RetryPolicy, build_session
+from msgraph.testing import StubGraphServer
+from msgraph.transport import Headers, HttpClientTransport, TransportError
+
+# ---------------------------------------------------------------------------------
+#-------------------------- TRANSPORT TESTS ---------------------------------------
+
+def test_importing_loads_no_http_library():
+    code = "import sys, msgraph.msgraph; print(sorted({'requests', 'urllib3', 'http.client', 'asyncio'} & set(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+def test_token_upload_and_download_over_http_client(tmp_path):
+    small, big = tmp_path / "small.txt", tmp_path / "big.bin"
+    small.write_text("hello")
+    big.write_bytes(os.urandom(700_000))
+    with StubGraphServer(redirect_downloads=True) as stub, stub.client(transport="http.client") as graph:
+        assert isinstance(graph.session, HttpClientTransport)
+        token = graph.get_access_token("graph").unwrap()
+        assert graph.upload_to_drive(token, "drive", str(small), "Reports/").is_ok
+        assert graph.upload_to_drive(token, "drive", str(big), "Reports/", large_file_threshold=1024, chunk_size=327_680).is_ok
+        assert stub.files["Reports/big.bin"] == big.read_bytes()
+        listing = graph.list_items_sharepoint(token, "site", "drive", "Reports").unwrap()
+        assert sorted(item.name for item in listing) == ["big.bin", "small.txt"]
+
+        (tmp_path / "out").mkdir()
+        assert graph.download_file_sharepoint(token, "site", "drive", "Reports/", "small.txt", str(tmp_path / "out")).is_ok
+        assert graph.download_file_sharepoint(token, "site", "drive", "Reports/", "big.bin", str(tmp_path / "out"), workers=3, range_size=100_000).is_ok
+        assert (tmp_path / "out" / "small.txt").read_text() == "hello"
+        assert (tmp_path / "out" / "big.bin").read_bytes() == big.read_bytes()
+        assert stub.connections <= 4  # Kept alive and reused, one per concurrent range at most.
+
+def test_responses_look_like_requests_ones():
+    with StubGraphServer() as stub, HttpClientTransport() as transport:
+        response = transport.request("POST", f"{stub.login_url}/tenant/oauth2/v2.0/token", data={"grant_type": "refresh_token"}, timeout=(5, 5))
+        assert response.ok and response.json()["access_token"]
+        assert response.headers["content-type"] == response.headers["Content-Type"]
+        assert response.request.headers["Content-Type"] == "application/x-www-form-urlencoded"
+        assert response.elapsed.total_seconds() > 0
+    headers = Headers([("Set-Cookie", "a"), ("set-cookie", "b")])
+    assert dict(headers) == {"Set-Cookie": "a, b"}
+
+def test_connection_failures_are_errors():
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        port = unused.getsockname()[1]
+    with HttpClientTransport() as transport, pytest.raises(TransportError):
+        transport.request("GET", f"http://127.0.0.1:{port}/", timeout=1)
+    with StubGraphServer() as stub:
+        pass  # Stopped: nothing listens there any more.
+    with stub.client(transport="http.client", retry_policy=RetryPolicy(max_retries=0)) as graph:
+        result = graph.get_access_token("graph")
+        assert result.is_err and "failed" in result.message
+    with pytest.raises(ValueError):
+        build_session(transport="pycurl")